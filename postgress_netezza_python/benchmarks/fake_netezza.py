@@ -0,0 +1,191 @@
+import csv
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from etl.netezza_connection import NetezzaConnection
+
+logger = logging.getLogger(__name__)
+
+EXTERNAL_TABLE_PATTERN = re.compile(
+    r"CREATE\s+EXTERNAL\s+TABLE\s+(?P<table>\S+)\s*\((?P<columns>.*?)\)\s*USING",
+    re.IGNORECASE | re.DOTALL,
+)
+DATAOBJECT_PATTERN = re.compile(r"DATAOBJECT\s*\(\s*'(?P<path>[^']*)'\s*\)", re.I)
+DELIMITER_PATTERN = re.compile(r"DELIMITER\s+'(?P<delimiter>[^']*)'", re.I)
+SKIPROWS_PATTERN = re.compile(r"SKIPROWS\s+(?P<rows>\d+)", re.I)
+COLUMN_DEF_PATTERN = re.compile(r'"[^"]+"\s+\w')
+CHUNK_FILTER_PATTERN = re.compile(r"WHERE MOD\(.*,\s*(\d+)\)\s*=\s*(\d+)\)\s*SRC", re.I)
+BITACORA_COLUMNS = [
+    "INICIO_CARGA",
+    "NOMBRE_TABLA",
+    "FIN_CARGA",
+    "CARGADO",
+    "ESTADO",
+    "OBSERVACION",
+    "CONTEO_BASE_ORIGEN",
+    "CONTEO_ARCHIVO",
+    "CONTEO_BASE_DESTINO",
+]
+
+
+class FakeCursor:
+    """Cursor mínimo con rowcount, como el que consulta NetezzaETLLoader."""
+
+    def __init__(self):
+        self.rowcount = -1
+
+    def close(self) -> None:
+        pass
+
+
+class FakeConnection:
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class FakeNetezzaConnection(NetezzaConnection):
+    """
+    Sustituto local de NetezzaConnection para benchmarks.
+    Registra cada sentencia con su duración y lee el archivo de la tabla externa como lo haría
+    Netezza (delimitador, SKIPROWS, número de columnas), de modo que la etapa de carga mida
+    el costo real de leer el CSV final.
+    """
+
+    def __init__(
+        self,
+        config_file: str,
+        esquema_postgres: str,
+        query_extracion: str,
+        production_columns: List[str],
+    ):
+        super().__init__(config_file=config_file)
+        self.esquema_postgres = esquema_postgres
+        self.query_extracion = query_extracion
+        self.production_columns = production_columns
+        self.statements: List[Tuple[float, str]] = []
+        self.tables: Set[str] = set()
+        self.comments: Dict[str, str] = {}
+        self.external: Dict[str, Any] = {}
+        self.tmp_rows = 0
+        self.merged_rows = 0
+        self.rejected_rows = 0
+
+    def connect(self) -> bool:
+        if not self.conn:
+            self.conn = FakeConnection()
+            self.cursor = FakeCursor()
+        return True
+
+    def close(self) -> None:
+        self.conn = None
+        self.cursor = None
+
+    def _record(self, sql: str, started: float) -> None:
+        self.statements.append((time.perf_counter() - started, sql.strip()))
+
+    def execute_query(self, query: str) -> Optional[List[Tuple]]:
+        with self._lock:
+            return self._fake_query(query)
+
+    def execute_command(self, command: str) -> bool:
+        with self._lock:
+            ok = self._fake_command(command)
+            self._confirmar_sentencia()
+            return ok
+
+    def _fake_query(self, query: str) -> List[Tuple]:
+        self.connect()
+        started = time.perf_counter()
+        sql = " ".join(query.split()).upper()
+        result: List[Tuple] = []
+        if "CONFIG_ETL_CARGAS" in sql:
+            result = [(self.esquema_postgres, self.query_extracion)]
+        elif "_V_RELATION_COLUMN" in sql and "DWH_BITACORA_CARGA_MIGRACION" in sql:
+            result = [(col,) for col in BITACORA_COLUMNS]
+        elif "_V_RELATION_COLUMN" in sql:
+            result = [(col,) for col in self.production_columns]
+        elif "SELECT DESCRIPTION FROM _V_TABLE" in sql:
+            result = [(comment,) for comment in self.comments.values()]
+        elif "_V_TABLE" in sql and "COUNT(*)" in sql:
+            name = re.search(r"TABLENAME\)?\s*=\s*'([^']+)'", sql)
+            exists = bool(name) and any(
+                t.upper().endswith(name.group(1)) for t in self.tables
+            )
+            result = [(1 if exists else 0,)]
+        elif "_V_FUNCTION" in sql:
+            # Funciones del SQL Extensions Toolkit (HASH4 del MERGE por bloques)
+            result = [(1,)]
+        elif "UPLOAD_DATE" in sql and "COUNT(*)" in sql:
+            result = [(self.merged_rows,)]
+        elif "COUNT(" in sql:
+            result = [(0,)]
+        self._record(query, started)
+        return result
+
+    def _load_external_file(self) -> int:
+        """Lee el archivo de la tabla externa con su delimitador y cuenta filas válidas."""
+        path = Path(self.external["path"])
+        expected_columns = self.external["columns"]
+        rows = 0
+        with open(path, encoding="utf-8", newline="") as f:
+            reader = csv.reader(f, delimiter=self.external["delimiter"])
+            for i, row in enumerate(reader):
+                if i < self.external["skiprows"]:
+                    continue
+                if len(row) != expected_columns:
+                    self.rejected_rows += 1
+                    continue
+                rows += 1
+        return rows
+
+    def _fake_command(self, command: str) -> bool:
+        self.connect()
+        started = time.perf_counter()
+        sql = " ".join(command.split())
+        sql_upper = sql.upper()
+        self.cursor.rowcount = -1
+        external = EXTERNAL_TABLE_PATTERN.search(command)
+        if external:
+            skiprows = SKIPROWS_PATTERN.search(command)
+            self.external = {
+                "path": DATAOBJECT_PATTERN.search(command).group("path"),
+                "delimiter": DELIMITER_PATTERN.search(command).group("delimiter"),
+                "skiprows": int(skiprows.group("rows")) if skiprows else 0,
+                "columns": len(COLUMN_DEF_PATTERN.findall(external.group("columns"))),
+            }
+            self.tables.add(external.group("table").replace('"', ""))
+        elif sql_upper.startswith("CREATE TABLE"):
+            self.tables.add(sql.split()[2].replace('"', ""))
+        elif "CREATE TABLE" in sql_upper:
+            # Script de _tmp: DROP ... IF EXISTS; CREATE TABLE ...
+            name = sql_upper.split("CREATE TABLE", 1)[1].split()[0]
+            self.tables.add(name.replace('"', ""))
+            self.tmp_rows = 0
+        elif sql_upper.startswith("COMMENT ON TABLE"):
+            self.comments[sql.split()[3]] = sql.split("'")[1]
+        elif sql_upper.startswith("TRUNCATE"):
+            self.tmp_rows = 0
+        elif sql_upper.startswith("INSERT INTO") and "_EXT" in sql_upper:
+            self.tmp_rows = self._load_external_file()
+            self.cursor.rowcount = self.tmp_rows
+        elif sql_upper.startswith("MERGE"):
+            chunk = CHUNK_FILTER_PATTERN.search(sql)
+            rows = self.tmp_rows
+            if chunk:
+                chunks, index = int(chunk.group(1)), int(chunk.group(2))
+                rows = self.tmp_rows // chunks + (
+                    1 if index < self.tmp_rows % chunks else 0
+                )
+            self.merged_rows += rows
+            self.cursor.rowcount = rows
+        self._record(command, started)
+        return True
@@ -0,0 +1,308 @@
+"""
+Benchmark de extremo a extremo de NetezzaETLLoader.
+
+Usa un PostgreSQL local real como origen y FakeNetezzaConnection como destino, y reporta
+por etapa filas/s, bytes/s y memoria pico. Ejecutar desde postgress_netezza_python:
+
+    python -m benchmarks.run_benchmarks --sizes 10k,1m,10m -c config.ini
+"""
+
+import argparse
+import functools
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from etl.etl_loader import NetezzaETLLoader
+from etl.logging_config import configurar_logging
+from etl.postgres_connection import PostgresConnection
+from etl.utils import peak_rss_mb
+
+from .fake_netezza import FakeNetezzaConnection
+from .synthetic import (
+    TEXT_CONTENT_SQL,
+    create_synthetic_table,
+    parse_size,
+    synthetic_columns,
+    write_excel_config,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _file_size(path: Optional[Any]) -> int:
+    try:
+        return os.path.getsize(path) if path else 0
+    except OSError:
+        return 0
+
+
+class StageRecorder:
+    """Envuelve métodos del pipeline para medir duración, bytes y memoria pico por etapa."""
+
+    def __init__(self, use_tracemalloc: bool = False):
+        self.use_tracemalloc = use_tracemalloc
+        self.stages: List[Dict[str, Any]] = []
+        self._patched: List[tuple] = []
+
+    def wrap(
+        self,
+        owner: type,
+        method_name: str,
+        stage: str,
+        bytes_fn: Callable[..., int] = lambda *args: 0,
+    ) -> None:
+        original = getattr(owner, method_name)
+        recorder = self
+
+        @functools.wraps(original)
+        def timed(instance, *args, **kwargs):
+            if recorder.use_tracemalloc:
+                tracemalloc.reset_peak()
+            started = time.perf_counter()
+            try:
+                return original(instance, *args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                traced_peak = (
+                    tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+                    if recorder.use_tracemalloc
+                    else None
+                )
+                recorder.stages.append(
+                    {
+                        "etapa": stage,
+                        "segundos": elapsed,
+                        "bytes": bytes_fn(instance, *args, **kwargs),
+                        "rss_pico_mb": peak_rss_mb(),
+                        "tracemalloc_pico_mb": traced_peak,
+                    }
+                )
+
+        setattr(owner, method_name, timed)
+        self._patched.append((owner, method_name, original))
+
+    def restore(self) -> None:
+        for owner, method_name, original in reversed(self._patched):
+            setattr(owner, method_name, original)
+        self._patched = []
+
+
+def instrument_pipeline(recorder: StageRecorder) -> None:
+    recorder.wrap(
+        PostgresConnection,
+        "execute_query_to_csv",
+        "extraccion",
+        lambda self, query, output_file, *a, **k: _file_size(output_file),
+    )
+    recorder.wrap(
+        NetezzaETLLoader,
+        "_convert_raw_to_final_csv",
+        "conversion",
+        lambda self, raw_file, final_file, *a, **k: _file_size(final_file),
+    )
+    recorder.wrap(
+        NetezzaETLLoader,
+        "load_data_from_external_to_tmp",
+        "carga_tmp",
+        lambda self, *a, **k: _file_size(self.final_csv_file),
+    )
+    recorder.wrap(NetezzaETLLoader, "execute_merge_to_production", "merge")
+    recorder.wrap(NetezzaETLLoader, "_conteo_base_origen", "conteo_origen")
+    recorder.wrap(
+        NetezzaETLLoader,
+        "_conteo_archivo",
+        "conteo_archivo",
+        lambda self, *a, **k: _file_size(self.final_csv_file),
+    )
+    recorder.wrap(NetezzaETLLoader, "_conteo_base_destino", "conteo_destino")
+
+
+def run_size(args: argparse.Namespace, rows: int, work_dir: Path) -> Dict[str, Any]:
+    table_name = f"bench_{rows}_w{args.text_columns}"
+    columns = synthetic_columns(args.text_columns, args.text_length)
+
+    pg = PostgresConnection(schema="public", config_file=args.config_file)
+    if not pg.connect():
+        raise ConnectionError("No se pudo conectar al PostgreSQL local.")
+    try:
+        create_synthetic_table(
+            pg.cursor,
+            table_name,
+            rows,
+            args.text_columns,
+            args.text_length,
+            args.text_content,
+            reuse=args.reuse_tables,
+        )
+        pg.conn.commit()
+    finally:
+        pg.close()
+
+    excel_path = work_dir / f"{table_name}.xlsx"
+    write_excel_config(excel_path, {table_name: columns})
+
+    recorder = StageRecorder(use_tracemalloc=args.tracemalloc)
+    instrument_pipeline(recorder)
+    try:
+        loader = NetezzaETLLoader(
+            target_table=table_name,
+            excel_config_path=str(excel_path),
+            output_dir=str(work_dir / "output"),
+            config_file=args.config_file,
+        )
+        fake_netezza = FakeNetezzaConnection(
+            config_file=args.config_file,
+            esquema_postgres="public",
+            query_extracion=f"SELECT * FROM {table_name}",
+            production_columns=[col["COLUMNAS"] for col in columns],
+        )
+        loader.netezza_db = fake_netezza
+        loader.bitacora_db = FakeNetezzaConnection(
+            config_file=args.config_file,
+            esquema_postgres="public",
+            query_extracion=f"SELECT * FROM {table_name}",
+            production_columns=[col["COLUMNAS"] for col in columns],
+        )
+        started = time.perf_counter()
+        success = loader.run()
+        total = time.perf_counter() - started
+    finally:
+        recorder.restore()
+
+    for stage in recorder.stages:
+        seconds = stage["segundos"] or 1e-9
+        stage["filas_s"] = rows / seconds
+        stage["mb_s"] = stage["bytes"] / (1024 * 1024) / seconds
+    if not args.keep_tables:
+        pg = PostgresConnection(schema="public", config_file=args.config_file)
+        if pg.connect():
+            pg.cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+            pg.conn.commit()
+            pg.close()
+    return {
+        "tabla": table_name,
+        "filas": rows,
+        "columnas_texto": args.text_columns,
+        "largo_texto": args.text_length,
+        "contenido": args.text_content,
+        "exito": success,
+        "segundos_total": total,
+        "sentencias_netezza": len(fake_netezza.statements),
+        "commits_netezza": fake_netezza.commits,
+        "filas_rechazadas": fake_netezza.rejected_rows,
+        "etapas": recorder.stages,
+    }
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    print(
+        f"\n{result['tabla']}: {result['filas']} filas, {result['columnas_texto']} columnas de texto "
+        f"({result['contenido']}, {result['largo_texto']} chars) - total {result['segundos_total']:.2f}s "
+        f"- {'OK' if result['exito'] else 'FALLÓ'}"
+    )
+    print(
+        f"{'etapa':<16}{'segundos':>10}{'filas/s':>14}{'MB/s':>10}{'RSS pico MB':>13}{'tracemalloc MB':>16}"
+    )
+    for stage in result["etapas"]:
+        traced = stage["tracemalloc_pico_mb"]
+        rss = stage["rss_pico_mb"]
+        print(
+            f"{stage['etapa']:<16}{stage['segundos']:>10.3f}{stage['filas_s']:>14,.0f}"
+            f"{stage['mb_s']:>10.2f}{(f'{rss:.1f}' if rss is not None else '-'):>13}"
+            f"{(f'{traced:.1f}' if traced is not None else '-'):>16}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark de NetezzaETLLoader con PostgreSQL local y un sustituto de Netezza.",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "--sizes",
+        default="10k,1m,10m",
+        help='Tamaños de tabla separados por coma (default: "10k,1m,10m").',
+    )
+    parser.add_argument(
+        "--text_columns",
+        type=int,
+        default=5,
+        help="Cantidad de columnas de texto (default: 5).",
+    )
+    parser.add_argument(
+        "--text_length",
+        type=int,
+        default=40,
+        help="Largo de cada columna de texto (default: 40).",
+    )
+    parser.add_argument(
+        "--text_content",
+        choices=sorted(TEXT_CONTENT_SQL),
+        default="ascii",
+        help="Contenido de las columnas de texto (default: ascii).",
+    )
+    parser.add_argument(
+        "-c",
+        "--config_file",
+        default="config.ini",
+        help='Archivo .ini con la sección [postgresql] local y opciones [etl] (default: "config.ini").',
+    )
+    parser.add_argument(
+        "--work_dir",
+        default=None,
+        help="Directorio para Excel y CSV del benchmark (default: directorio temporal).",
+    )
+    parser.add_argument(
+        "--reuse_tables",
+        action="store_true",
+        help="Reutiliza tablas sintéticas existentes con la misma cantidad de filas.",
+    )
+    parser.add_argument(
+        "--keep_tables",
+        action="store_true",
+        help="No elimina las tablas sintéticas al terminar.",
+    )
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="Mide la memoria pico de Python por etapa con tracemalloc (agrega overhead).",
+    )
+    parser.add_argument(
+        "--json",
+        default=None,
+        help="Guarda los resultados en este archivo JSON para comparar ejecuciones.",
+    )
+    args = parser.parse_args()
+
+    if not Path(args.config_file).exists():
+        print(
+            f"Error: El archivo de configuración '{args.config_file}' no fue encontrado."
+        )
+        sys.exit(2)
+    work_dir = Path(args.work_dir or tempfile.mkdtemp(prefix="etl_bench_"))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    results = []
+    for size in args.sizes.split(","):
+        result = run_size(args, parse_size(size), work_dir)
+        print_report(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"\nResultados guardados en '{args.json}'.")
+
+
+if __name__ == "__main__":
+    configurar_logging()
+    main()
@@ -0,0 +1,91 @@
+import logging
+from pathlib import Path
+from typing import Dict, List
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Expresiones SQL para el contenido de las columnas de texto sintéticas.
+# "separadores" incluye los primeros ALTERNATIVE_SEPARATORS para forzar la búsqueda de separador.
+TEXT_CONTENT_SQL = {
+    "ascii": "md5(g::text || '{i}')",
+    "unicode": "'ñandú € ' || md5(g::text || '{i}') || ' 丿Δ'",
+    "separadores": "md5(g::text || '{i}') || ' |ᛟ '",
+}
+
+
+def parse_size(value: str) -> int:
+    """Convierte tamaños como '10k', '1m' o '10000' a número de filas."""
+    value = value.strip().lower()
+    multipliers = {"k": 1_000, "m": 1_000_000}
+    if value and value[-1] in multipliers:
+        return int(float(value[:-1]) * multipliers[value[-1]])
+    return int(value)
+
+
+def synthetic_columns(text_columns: int, text_length: int) -> List[Dict[str, str]]:
+    """Definición de columnas de la tabla sintética, en el formato de las hojas del Excel."""
+    columns = [
+        {
+            "COLUMNAS": "id",
+            "TIPO": "BIGINT",
+            "NULLABLE": "NO",
+            "MERGE_KEY": "X",
+            "DISTRIBUTE": "X",
+        },
+        {"COLUMNAS": "fecha", "TIPO": "DATE"},
+        {"COLUMNAS": "monto", "TIPO": "NUMERIC(12,2)"},
+    ]
+    for i in range(1, text_columns + 1):
+        columns.append({"COLUMNAS": f"texto_{i}", "TIPO": f"VARCHAR({text_length})"})
+    columns.append({"COLUMNAS": "UPLOAD_DATE", "TIPO": "TIMESTAMP"})
+    return columns
+
+
+def create_synthetic_table(
+    pg_cursor,
+    table_name: str,
+    rows: int,
+    text_columns: int,
+    text_length: int,
+    text_content: str,
+    reuse: bool = False,
+) -> None:
+    """Crea y puebla en PostgreSQL una tabla sintética con generate_series."""
+    if reuse:
+        pg_cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (table_name,))
+        if pg_cursor.fetchone()[0]:
+            pg_cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+            if pg_cursor.fetchone()[0] == rows:
+                logger.info(f"Reutilizando tabla sintética existente '{table_name}'.")
+                return
+    text_template = TEXT_CONTENT_SQL[text_content]
+    text_defs = ", ".join(
+        f"texto_{i} VARCHAR({text_length})" for i in range(1, text_columns + 1)
+    )
+    text_values = ", ".join(
+        f"left(repeat({text_template.format(i=i)}, {text_length // 32 + 1}), {text_length})"
+        for i in range(1, text_columns + 1)
+    )
+    pg_cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+    pg_cursor.execute(
+        f"CREATE TABLE {table_name} (id BIGINT PRIMARY KEY, fecha DATE, monto NUMERIC(12,2)"
+        + (f", {text_defs}" if text_defs else "")
+        + ")"
+    )
+    logger.info(f"Generando {rows} filas en la tabla sintética '{table_name}'...")
+    pg_cursor.execute(
+        f"INSERT INTO {table_name} "
+        f"SELECT g, DATE '2020-01-01' + (g % 1500), (g % 100000) / 100.0"
+        + (f", {text_values}" if text_values else "")
+        + f" FROM generate_series(1, {rows}) AS g"
+    )
+    pg_cursor.execute(f"ANALYZE {table_name}")
+
+
+def write_excel_config(path: Path, sheets: Dict[str, List[Dict[str, str]]]) -> None:
+    """Escribe el Excel de configuración con una hoja por tabla sintética."""
+    with pd.ExcelWriter(path) as writer:
+        for sheet_name, columns in sheets.items():
+            pd.DataFrame(columns).to_excel(writer, sheet_name=sheet_name, index=False)
@@ -0,0 +1,365 @@
+import csv
+import logging
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: solo se usa con transform = arrow o Parquet
+    pa = None
+    pc = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+TYPE_PATTERN = re.compile(
+    r"^\s*(?P<base>[A-Z ]+?)\s*(?:\(\s*(?P<p1>\d+)\s*(?:,\s*(?P<p2>\d+)\s*)?\))?\s*$"
+)
+INTEGER_RANGES = {
+    "BYTEINT": (-(2**7), 2**7 - 1),
+    "INT1": (-(2**7), 2**7 - 1),
+    "SMALLINT": (-(2**15), 2**15 - 1),
+    "INT2": (-(2**15), 2**15 - 1),
+    "INTEGER": (-(2**31), 2**31 - 1),
+    "INT": (-(2**31), 2**31 - 1),
+    "INT4": (-(2**31), 2**31 - 1),
+    "BIGINT": (-(2**63), 2**63 - 1),
+    "INT8": (-(2**63), 2**63 - 1),
+}
+STRING_TYPES = {
+    "VARCHAR",
+    "CHAR",
+    "CHARACTER",
+    "CHARACTER VARYING",
+    "NVARCHAR",
+    "NCHAR",
+}
+DECIMAL_TYPES = {"NUMERIC", "DECIMAL"}
+FLOAT_TYPES = {"FLOAT", "DOUBLE", "DOUBLE PRECISION", "REAL", "FLOAT4", "FLOAT8"}
+DEFAULT_DATE_FORMATS = {"DATE": "%Y-%m-%d", "TIMESTAMP": "%Y-%m-%d %H:%M:%S"}
+
+
+def pyarrow_available() -> bool:
+    return pa is not None
+
+
+def parse_excel_type(col_type: str, col_format: Optional[str] = None) -> Dict[str, Any]:
+    """Interpreta la columna TIPO del Excel (p. ej. VARCHAR(50), NUMERIC(10,2), DATE)."""
+    match = TYPE_PATTERN.match(str(col_type).upper())
+    if not match:
+        return {"base": str(col_type).upper(), "kind": "other"}
+    base = match.group("base").strip()
+    p1 = int(match.group("p1")) if match.group("p1") else None
+    p2 = int(match.group("p2")) if match.group("p2") else None
+    spec: Dict[str, Any] = {"base": base, "kind": "other"}
+    if base in STRING_TYPES:
+        spec.update(kind="string", length=p1)
+    elif base in INTEGER_RANGES:
+        spec.update(kind="integer", range=INTEGER_RANGES[base])
+    elif base in DECIMAL_TYPES:
+        spec.update(kind="decimal", precision=p1 or 18, scale=p2 or 0)
+    elif base in FLOAT_TYPES:
+        spec.update(kind="float")
+    elif base == "DATE" or base.startswith("TIMESTAMP"):
+        kind = "date" if base == "DATE" else "timestamp"
+        spec.update(
+            kind=kind,
+            format=col_format or DEFAULT_DATE_FORMATS[kind.upper()],
+        )
+    elif base in ("BOOLEAN", "BOOL"):
+        spec.update(kind="boolean")
+    return spec
+
+
+def excel_arrow_type(spec: Dict[str, Any]) -> "pa.DataType":
+    """Tipo Arrow con que se archiva una columna según su TIPO del Excel."""
+    kind = spec["kind"]
+    if kind == "integer":
+        return pa.int64()
+    if kind == "decimal" and spec["precision"] <= 38:
+        return pa.decimal128(spec["precision"], spec["scale"])
+    if kind == "float":
+        return pa.float64()
+    if kind == "boolean":
+        return pa.bool_()
+    if kind == "date" and spec["format"] == DEFAULT_DATE_FORMATS["DATE"]:
+        return pa.date32()
+    # TIMESTAMP y fechas con FORMATO propio se archivan como texto para conservar
+    # exactamente el valor que se carga en Netezza
+    return pa.string()
+
+
+def rows_to_record_batch(
+    column_names: List[str], rows: Sequence[Tuple]
+) -> "pa.RecordBatch":
+    """Convierte un lote de filas (tuplas de psycopg2) en un RecordBatch columnar."""
+    columns = list(zip(*rows)) if rows else [() for _ in column_names]
+    arrays = []
+    for values in columns:
+        try:
+            arrays.append(pa.array(values))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Tipos mezclados en la columna: se conserva como texto y se valida después
+            arrays.append(
+                pa.array([None if v is None else str(v) for v in values], pa.string())
+            )
+    return pa.RecordBatch.from_arrays(arrays, names=list(column_names))
+
+
+def _invalid_mask_for_column(
+    array: "pa.Array", spec: Dict[str, Any]
+) -> Tuple[Optional["pa.Array"], str]:
+    """Devuelve la máscara de filas inválidas para la columna y el motivo, según el tipo del Excel."""
+    kind = spec["kind"]
+    not_null = pc.is_valid(array)
+    if kind == "string" and spec.get("length"):
+        lengths = pc.utf8_length(pc.cast(array, pa.string()))
+        return (
+            pc.and_(not_null, pc.greater(lengths, spec["length"])),
+            f"largo mayor a {spec['length']}",
+        )
+    if kind in ("integer", "decimal", "float"):
+        numeric = array
+        unparsable = None
+        if pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+            numeric = pc.cast(
+                pc.if_else(
+                    pc.match_substring_regex(
+                        array, r"^\s*[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$"
+                    ),
+                    array,
+                    pa.scalar(None, pa.string()),
+                ),
+                pa.float64(),
+            )
+            unparsable = pc.and_(not_null, pc.is_null(numeric))
+        elif not pa.types.is_floating(array.type) and not pa.types.is_integer(
+            array.type
+        ):
+            numeric = pc.cast(array, pa.float64(), safe=False)
+        if kind == "float":
+            return unparsable, "valor no numérico"
+        # Los enteros se comparan como enteros (pasar por float64 pierde precisión)
+        as_integer = pa.types.is_integer(numeric.type)
+        if kind == "integer":
+            low, high = spec["range"]
+            reason = f"entero fuera de rango [{low}, {high}]"
+            if not as_integer:
+                low, high = float(low), float(high)
+            out_of_range = pc.or_(pc.less(numeric, low), pc.greater(numeric, high))
+        else:
+            limit = 10 ** (spec["precision"] - spec["scale"])
+            reason = f"excede NUMERIC({spec['precision']},{spec['scale']})"
+            if as_integer and limit > 2**63 - 1:
+                return unparsable, f"{reason} o no numérico"
+            if not as_integer:
+                limit = float(limit)
+            out_of_range = pc.or_(
+                pc.greater_equal(numeric, limit), pc.less_equal(numeric, -limit)
+            )
+        out_of_range = pc.fill_null(out_of_range, False)
+        if unparsable is not None:
+            return pc.or_(out_of_range, unparsable), f"{reason} o no numérico"
+        return out_of_range, reason
+    if kind in ("date", "timestamp") and (
+        pa.types.is_string(array.type) or pa.types.is_large_string(array.type)
+    ):
+        parsed = pc.strptime(
+            array, format=spec["format"], unit="us", error_is_null=True
+        )
+        return (
+            pc.and_(not_null, pc.is_null(parsed)),
+            f"fecha con formato distinto a '{spec['format']}'",
+        )
+    return None, ""
+
+
+def validate_batch(
+    batch: "pa.RecordBatch",
+    specs: List[Dict[str, Any]],
+    column_names: List[str],
+    first_row_number: int,
+) -> Tuple["pa.RecordBatch", List[Dict[str, Any]]]:
+    """
+    Valida el lote contra los tipos del Excel en forma columnar.
+    Devuelve el lote sin las filas inválidas y la lista de rechazos (fila, columna, motivo, valor).
+    """
+    rejects: List[Dict[str, Any]] = []
+    invalid_rows = None
+    for index, spec in enumerate(specs):
+        mask, reason = _invalid_mask_for_column(batch.column(index), spec)
+        if mask is None or not pc.any(mask).as_py():
+            continue
+        positions = pc.indices_nonzero(mask).to_pylist()
+        values = batch.column(index).take(pa.array(positions)).to_pylist()
+        for position, value in zip(positions, values):
+            rejects.append(
+                {
+                    "fila": first_row_number + position,
+                    "columna": column_names[index],
+                    "motivo": reason,
+                    "valor": None if value is None else str(value)[:200],
+                }
+            )
+        invalid_rows = mask if invalid_rows is None else pc.or_(invalid_rows, mask)
+    if invalid_rows is None:
+        return batch, rejects
+    return batch.filter(pc.invert(invalid_rows)), rejects
+
+
+def choose_separator(batch: "pa.RecordBatch", candidates: List[str]) -> Optional[str]:
+    """Elige el primer separador candidato que no aparece en ninguna columna de texto del lote."""
+    text_columns = [
+        pc.cast(column, pa.string())
+        for column in batch.columns
+        if not pa.types.is_floating(column.type)
+        and not pa.types.is_integer(column.type)
+    ]
+    for separator in candidates:
+        if not any(
+            pc.any(pc.match_substring(column, separator)).as_py()
+            for column in text_columns
+        ):
+            return separator
+    return None
+
+
+class DelimitedArrowWriter:
+    """
+    Escribe lotes Arrow como texto delimitado, con las mismas reglas que csv.writer
+    (comillas solo cuando el valor contiene separador, comillas o saltos de línea),
+    pero construyendo las líneas con kernels columnares en lugar de fila por fila.
+    """
+
+    def __init__(self, path: Path, separator: str, column_names: List[str]):
+        self.separator = separator
+        self.rows_written = 0
+        self._needs_quotes = "[" + re.escape(separator + '"\r\n') + "]"
+        self._file = open(path, "wb")
+        header = self.separator.join(self._quote(name) for name in column_names)
+        self._file.write((header + "\r\n").encode("utf-8"))
+
+    def _quote(self, value: str) -> str:
+        if re.search(self._needs_quotes, value):
+            return '"' + value.replace('"', '""') + '"'
+        return value
+
+    def _format_column(self, array: "pa.Array") -> "pa.Array":
+        if pa.types.is_boolean(array.type):
+            text = pc.if_else(array, "True", "False")
+        else:
+            text = pc.cast(array, pa.string())
+        text = pc.fill_null(text, "")
+        needs_quotes = pc.match_substring_regex(text, self._needs_quotes)
+        quoted = pc.binary_join_element_wise(
+            '"', pc.replace_substring(text, '"', '""'), '"', ""
+        )
+        return pc.if_else(needs_quotes, quoted, text)
+
+    def write_batch(self, batch: "pa.RecordBatch") -> None:
+        if batch.num_rows == 0:
+            return
+        columns = [self._format_column(column) for column in batch.columns]
+        lines = pc.binary_join_element_wise(
+            pc.binary_join_element_wise(*columns, self.separator),
+            "\r\n",
+            "",
+        )
+        # Los valores de un StringArray están contiguos en su buffer de datos:
+        # ese tramo ya es el contenido del archivo para todo el lote.
+        offset_type = pa.int64() if pa.types.is_large_string(lines.type) else pa.int32()
+        offsets = pa.Array.from_buffers(
+            offset_type, len(lines) + 1, [None, lines.buffers()[1]], offset=lines.offset
+        )
+        start, end = offsets[0].as_py(), offsets[-1].as_py()
+        self._file.write(memoryview(lines.buffers()[2])[start:end])
+        self.rows_written += batch.num_rows
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _csv_to_parquet_with_types(
+    csv_path: Path,
+    parquet_path: Path,
+    separator: str,
+    schema: "pa.Schema",
+    compression: str,
+    batch_size: int = 65536,
+) -> int:
+    # csv.reader en lugar de pyarrow.csv: los separadores alternativos no son ASCII
+    rows = 0
+    with (
+        open(csv_path, "r", encoding="utf-8", newline="") as f,
+        pq.ParquetWriter(parquet_path, schema, compression=compression) as writer,
+    ):
+        reader = csv.reader(f, delimiter=separator)
+        next(reader, None)  # cabecera
+        while True:
+            lote = [row for _, row in zip(range(batch_size), reader)]
+            if not lote:
+                break
+            columns = zip(*lote)
+            arrays = [
+                pc.cast(pa.array([v or None for v in values], pa.string()), field.type)
+                for values, field in zip(columns, schema)
+            ]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            rows += len(lote)
+    return rows
+
+
+def csv_to_parquet(
+    csv_path: Path,
+    parquet_path: Path,
+    separator: str,
+    column_names: List[str],
+    specs: List[Dict[str, Any]],
+    metadata: Optional[Dict[str, str]] = None,
+    compression: str = "zstd",
+) -> int:
+    """
+    Convierte el CSV final en Parquet por lotes, con los tipos derivados del Excel.
+    Si algún valor no se puede convertir al tipo del Excel, archiva todas las columnas
+    como texto. Devuelve la cantidad de filas escritas.
+    """
+    schema = pa.schema(
+        [
+            pa.field(name, excel_arrow_type(spec))
+            for name, spec in zip(column_names, specs)
+        ],
+        metadata=metadata,
+    )
+    try:
+        return _csv_to_parquet_with_types(
+            csv_path, parquet_path, separator, schema, compression
+        )
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+        logger.warning(
+            f"No se pudo archivar '{csv_path}' con los tipos del Excel ({e}). Se archiva como texto."
+        )
+    schema = pa.schema(
+        [pa.field(name, pa.string()) for name in column_names], metadata=metadata
+    )
+    return _csv_to_parquet_with_types(
+        csv_path, parquet_path, separator, schema, compression
+    )
+
+
+def parquet_row_count(parquet_path: Path) -> int:
+    """Cantidad de filas de un archivo Parquet, leída de sus metadatos."""
+    return pq.ParquetFile(parquet_path).metadata.num_rows
+
+
+def parquet_metadata(parquet_path: Path) -> Dict[str, str]:
+    """Metadatos de usuario (clave/valor) guardados en el esquema del Parquet."""
+    raw = pq.ParquetFile(parquet_path).schema_arrow.metadata or {}
+    return {k.decode("utf-8"): v.decode("utf-8") for k, v in raw.items()}
+
+
+def iter_parquet_batches(parquet_path: Path, batch_size: int = 65536):
+    """Recorre un archivo Parquet por lotes, sin cargarlo completo en memoria."""
+    yield from pq.ParquetFile(parquet_path).iter_batches(batch_size=batch_size)
@@ -0,0 +1,147 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Columna del archivo de staging con la operación del cambio: U (alta/modificación) o D (baja)
+OP_CDC_COLUMN = "OP_CDC"
+OP_UPSERT = "U"
+OP_DELETE = "D"
+
+# Salida de test_decoding: "table public.pedidos: UPDATE: id[integer]:1 nombre[text]:'a'"
+CHANGE_PATTERN = re.compile(
+    r"^table (?P<tabla>.+?): (?P<op>INSERT|UPDATE|DELETE): (?P<resto>.*)$", re.S
+)
+VALUE_PATTERN = re.compile(
+    r'(?P<col>"(?:[^"]|"")+"|[^\s\[]+)\[(?P<tipo>[^\]]+)\]:(?P<valor>\'(?:[^\']|\'\')*\'|\S+)'
+)
+UNCHANGED_TOAST = "unchanged-toast-datum"
+
+
+@dataclass
+class CambioCDC:
+    """Un cambio de fila decodificado del slot de replicación lógica."""
+
+    tabla: str
+    operacion: str
+    valores: Dict[str, Optional[str]] = field(default_factory=dict)
+    anteriores: Dict[str, Optional[str]] = field(default_factory=dict)
+
+
+def _parsear_tupla(texto: str) -> Dict[str, Optional[str]]:
+    valores: Dict[str, Optional[str]] = {}
+    for match in VALUE_PATTERN.finditer(texto):
+        columna = match.group("col")
+        if columna.startswith('"'):
+            columna = columna[1:-1].replace('""', '"')
+        valor = match.group("valor")
+        if valor.startswith("'"):
+            valores[columna] = valor[1:-1].replace("''", "'")
+        elif valor == "null":
+            valores[columna] = None
+        else:
+            valores[columna] = valor
+    return valores
+
+
+def parsear_cambio_test_decoding(data: str) -> Optional[CambioCDC]:
+    """
+    Interpreta una línea de test_decoding. Devuelve None para BEGIN/COMMIT y mensajes que
+    no son cambios de fila. En UPDATE/DELETE, "old-key:" trae la clave anterior (o la fila
+    completa con REPLICA IDENTITY FULL) y "new-tuple:" la fila nueva.
+    """
+    match = CHANGE_PATTERN.match(data)
+    if not match:
+        return None
+    resto = match.group("resto")
+    anteriores: Dict[str, Optional[str]] = {}
+    if resto.startswith("old-key: "):
+        anterior, _, resto = resto[len("old-key: ") :].partition(" new-tuple: ")
+        anteriores = _parsear_tupla(anterior)
+    valores = _parsear_tupla(resto)
+    if match.group("op") == "DELETE" and not valores:
+        valores = anteriores
+    return CambioCDC(
+        tabla=match.group("tabla"),
+        operacion=match.group("op"),
+        valores=valores,
+        anteriores=anteriores,
+    )
+
+
+def _normalizar_nombre_tabla(nombre: str) -> str:
+    return nombre.replace('"', "").lower()
+
+
+def consolidar_cambios(
+    cambios: Iterable[CambioCDC],
+    tabla_origen: str,
+    columnas: List[str],
+    claves: List[str],
+) -> Tuple[List[List[Optional[str]]], int, int]:
+    """
+    Reduce los cambios de `tabla_origen` a una fila por clave (el último cambio gana), con
+    las `columnas` del Excel en orden más la operación (U o D). Un cambio de clave se
+    registra como baja de la clave anterior y alta de la nueva.
+    Devuelve las filas, la cantidad de altas/modificaciones y la cantidad de bajas.
+    """
+    tabla_origen = _normalizar_nombre_tabla(tabla_origen)
+    por_columna = {c.lower(): c for c in columnas}
+    claves_lower = [c.lower() for c in claves]
+    ultimos: Dict[Tuple, Tuple[str, Dict[str, Optional[str]]]] = {}
+
+    def clave_de(valores: Dict[str, Optional[str]]) -> Tuple:
+        return tuple(valores.get(c) for c in claves_lower)
+
+    for cambio in cambios:
+        if _normalizar_nombre_tabla(cambio.tabla) != tabla_origen:
+            continue
+        valores = {k.lower(): v for k, v in cambio.valores.items()}
+        anteriores = {k.lower(): v for k, v in cambio.anteriores.items()}
+        previo = ultimos.get(clave_de(valores))
+        for columna, valor in list(valores.items()):
+            if valor == UNCHANGED_TOAST:
+                # Se completa con la fila anterior completa (REPLICA IDENTITY FULL) o con
+                # un cambio previo de la misma clave en este lote
+                if columna not in anteriores and previo and previo[0] == OP_UPSERT:
+                    valores[columna] = previo[1].get(columna)
+                    continue
+                if columna not in anteriores:
+                    raise ValueError(
+                        f"La columna '{columna}' de '{cambio.tabla}' no viene en el cambio (TOAST sin modificar). Configure REPLICA IDENTITY FULL en la tabla de origen."
+                    )
+                valores[columna] = anteriores[columna]
+        if cambio.operacion == "DELETE":
+            ultimos[clave_de(valores)] = (OP_DELETE, valores)
+            continue
+        if cambio.operacion == "UPDATE" and anteriores:
+            clave_anterior = clave_de(anteriores)
+            if all(
+                v is not None for v in clave_anterior
+            ) and clave_anterior != clave_de(valores):
+                ultimos[clave_anterior] = (OP_DELETE, anteriores)
+        ultimos[clave_de(valores)] = (OP_UPSERT, valores)
+
+    faltantes = {
+        c for _, valores in ultimos.values() for c in valores if c not in por_columna
+    }
+    if faltantes:
+        logger.debug(
+            f"Columnas del origen que no están en el Excel (se ignoran): {sorted(faltantes)}"
+        )
+    filas = []
+    altas = bajas = 0
+    for operacion, valores in ultimos.values():
+        if operacion == OP_DELETE:
+            fila = [
+                valores.get(c.lower()) if c.lower() in claves_lower else None
+                for c in columnas
+            ]
+            bajas += 1
+        else:
+            fila = [valores.get(c.lower()) for c in columnas]
+            altas += 1
+        filas.append(fila + [operacion])
+    return filas, altas, bajas
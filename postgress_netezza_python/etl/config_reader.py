@@ -4,24 +4,7 @@ from typing import Any, Dict, List, Optional
 
 import pandas as pd
 
-# Configuración de logging
-logging.basicConfig(
-    level=logging.INFO,
-    filename="libraries.log",
-    filemode="w",
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-
-file_handler = logging.FileHandler("output.log", mode="w", encoding="utf-8")
-formatter = logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-)
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
-logger.propagate = False
 
 
 class ExcelTableConfigReader:
@@ -0,0 +1,136 @@
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Máximo de valores por lista IN en las consultas de buckets y en los DELETE
+MAX_VALORES_IN = 1000
+
+Consulta = Callable[[str], Optional[Sequence[Tuple]]]
+
+
+def _en_bloques(valores: Sequence[int], tamano: int = MAX_VALORES_IN) -> Iterable[str]:
+    for inicio in range(0, len(valores), tamano):
+        yield ", ".join(str(v) for v in valores[inicio : inicio + tamano])
+
+
+class DetectorBajas:
+    """
+    Detecta claves que existen en destino pero ya no en el origen sin transferir el conjunto
+    completo de claves. Cada lado calcula un hash BIGINT por fila (`hash_origen` y
+    `hash_destino` deben dar el mismo valor para la misma clave) y se comparan COUNT y SUM del
+    hash por bucket (MOD del hash). Los buckets distintos se subdividen nivel a nivel
+    (MOD buckets^nivel, al estilo de un árbol de Merkle) y solo en las hojas distintas se
+    traen los hashes de ambos lados para obtener los huérfanos.
+    """
+
+    def __init__(
+        self,
+        consultar_origen: Consulta,
+        consultar_destino: Consulta,
+        from_origen: str,
+        from_destino: str,
+        hash_origen: str,
+        hash_destino: str,
+        buckets: int = 1024,
+        niveles: int = 2,
+    ):
+        self.consultar_origen = consultar_origen
+        self.consultar_destino = consultar_destino
+        self.from_origen = from_origen
+        self.from_destino = from_destino
+        self.hash_origen = hash_origen
+        self.hash_destino = hash_destino
+        self.buckets = max(buckets, 2)
+        self.niveles = max(niveles, 1)
+        self.filas_destino = 0
+
+    def _agregados_sql(
+        self, from_sql: str, hash_sql: str, nivel: int, padres: Optional[str]
+    ) -> str:
+        filtro = (
+            f"WHERE MOD(H, {self.buckets ** (nivel - 1)}) IN ({padres})"
+            if padres
+            else ""
+        )
+        return f"""
+            SELECT MOD(H, {self.buckets ** nivel}) AS BUCKET, COUNT(*) AS FILAS,
+                   SUM(CAST(H AS NUMERIC(38,0))) AS SUMA
+            FROM (SELECT ABS({hash_sql}) AS H FROM {from_sql}) AS HQ
+            {filtro}
+            GROUP BY MOD(H, {self.buckets ** nivel})
+        """
+
+    def _agregados(
+        self, nivel: int, padres: Optional[List[int]]
+    ) -> Tuple[Dict[int, Tuple[int, int]], Dict[int, Tuple[int, int]]]:
+        origen: Dict[int, Tuple[int, int]] = {}
+        destino: Dict[int, Tuple[int, int]] = {}
+        bloques = list(_en_bloques(padres)) if padres else [None]
+        for bloque in bloques:
+            for resultado, consultar, from_sql, hash_sql in (
+                (origen, self.consultar_origen, self.from_origen, self.hash_origen),
+                (
+                    destino,
+                    self.consultar_destino,
+                    self.from_destino,
+                    self.hash_destino,
+                ),
+            ):
+                filas = consultar(
+                    self._agregados_sql(from_sql, hash_sql, nivel, bloque)
+                )
+                for bucket, cantidad, suma in filas or []:
+                    resultado[int(bucket)] = (int(cantidad), int(suma or 0))
+        return origen, destino
+
+    def buckets_distintos(self) -> List[int]:
+        """Hojas (buckets del último nivel necesario) cuyo COUNT/SUM difiere entre origen y destino."""
+        distintos: Optional[List[int]] = None
+        for nivel in range(1, self.niveles + 1):
+            origen, destino = self._agregados(nivel, distintos)
+            if nivel == 1:
+                self.filas_destino = sum(cantidad for cantidad, _ in destino.values())
+            distintos = sorted(
+                bucket
+                for bucket in set(origen) | set(destino)
+                if origen.get(bucket) != destino.get(bucket)
+            )
+            logger.info(
+                f"Detección de bajas nivel {nivel}: {len(distintos)} de {len(set(origen) | set(destino))} buckets con diferencias."
+            )
+            if not distintos:
+                break
+        return distintos or []
+
+    def _hashes(
+        self, consultar: Consulta, from_sql: str, hash_sql: str, hojas: List[int]
+    ) -> Set[int]:
+        modulo = self.buckets**self.niveles
+        hashes: Set[int] = set()
+        for bloque in _en_bloques(hojas):
+            filas = consultar(f"""
+                SELECT DISTINCT H FROM (SELECT ABS({hash_sql}) AS H FROM {from_sql}) AS HQ
+                WHERE MOD(H, {modulo}) IN ({bloque})
+                """)
+            hashes.update(int(fila[0]) for fila in filas or [])
+        return hashes
+
+    def hashes_huerfanos(self, hojas: List[int]) -> List[int]:
+        """Hashes presentes en destino y ausentes en el origen, dentro de las hojas indicadas."""
+        if not hojas:
+            return []
+        origen = self._hashes(
+            self.consultar_origen, self.from_origen, self.hash_origen, hojas
+        )
+        destino = self._hashes(
+            self.consultar_destino, self.from_destino, self.hash_destino, hojas
+        )
+        return sorted(destino - origen)
+
+    def sentencias_delete(self, tabla_destino: str, huerfanos: List[int]) -> List[str]:
+        """DELETE por bloques de hashes huérfanos: ninguna fila con esos hashes existe en el origen."""
+        return [
+            f"DELETE FROM {tabla_destino} WHERE ABS({self.hash_destino}) IN ({bloque});"
+            for bloque in _en_bloques(huerfanos)
+        ]
@@ -1,35 +1,31 @@
 # Si tienes helpers, puedes importar de .utils
 import configparser
 import csv
+import hashlib
 import logging
 import os
+import shutil
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from . import arrow_transform, cdc, profiling
 from .config_reader import ExcelTableConfigReader
+from .delete_detection import DetectorBajas
+from .extract_cache import ExtractCache
+from .logging_config import acortar_sql
 from .netezza_connection import NetezzaConnection
+from .pipeline import EjecutorPasos, PasoETL
 from .postgres_connection import PostgresConnection
+from .progress import ReporteProgreso
+from .utils import parsear_log_rechazos
 
-# Configuración de logging
-logging.basicConfig(
-    level=logging.INFO,
-    filename="libraries.log",
-    filemode="w",
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
-
-file_handler = logging.FileHandler("output.log", mode="w", encoding="utf-8")
-formatter = logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-)
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
-logger.propagate = False
 
 ALTERNATIVE_SEPARATORS = [
     "|",
@@ -39,6 +35,12 @@ ALTERNATIVE_SEPARATORS = [
     "‡",
 ]
 
+# Máximo de columnas admitidas por ORGANIZE ON en Netezza
+MAX_ORGANIZE_COLUMNS = 4
+
+# Prefijo del comentario con la huella DDL de la tabla temporal persistente (_tmp)
+TMP_FINGERPRINT_PREFIX = "ETL_DDL_SHA256:"
+
 
 class NetezzaETLLoader:
     """
@@ -51,21 +53,77 @@ class NetezzaETLLoader:
         excel_config_path: str,
         output_dir: str = "output",
         config_file: str = "config.ini",
+        parquet_source: Optional[str] = None,
+        profile: bool = False,
+        profile_memory: bool = False,
+        excel_reader: Optional[ExcelTableConfigReader] = None,
+        netezza_db: Optional[NetezzaConnection] = None,
+        shared_extract: Optional[str] = None,
+        bitacora_db: Optional[NetezzaConnection] = None,
+        batch_id: Optional[str] = None,
     ):
         self.target_table = target_table
         self.netezza_schema = "ADMIN"
         self.output_dir = Path(output_dir)
         self.config_file = config_file
+        self.etl_settings = self._load_etl_settings(config_file)
+        # Perfilado opcional de cada paso (cProfile / tracemalloc)
+        self.profile = profile
+        self.profile_memory = profile_memory
 
         self.upload_timestamp = datetime.now().replace(microsecond=0)
         self.inicio_carga = None  # Para guardar el timestamp de inicio
-        self.excel_reader = ExcelTableConfigReader(excel_config_path)
-        self.netezza_db = NetezzaConnection(config_file=self.config_file)
+        # El modo servicio inyecta el Excel ya leído y una conexión Netezza abierta,
+        # que en ese caso no se cierra al terminar la carga
+        self.excel_reader = (
+            excel_reader
+            or self._perfilar(
+                "configuracion", lambda: ExcelTableConfigReader(excel_config_path)
+            )()
+        )
+        self._owns_netezza_db = netezza_db is None
+        self.netezza_db = netezza_db or NetezzaConnection(config_file=self.config_file)
+        # Conexión aparte para la bitácora mientras la carga tiene su transacción abierta;
+        # si no se inyecta, se abre al primer uso y se cierra al terminar
+        self._owns_bitacora_db = bitacora_db is None
+        self.bitacora_db = bitacora_db
+        self._bitacora_db_lock = threading.Lock()
         self.postgres_db: Optional[PostgresConnection] = None
 
         self.raw_pg_file: Optional[Path] = None
         self.final_csv_file: Optional[Path] = None
+        # Re-carga desde un extracto archivado en Parquet, sin consultar PostgreSQL
+        self.parquet_source = Path(parquet_source) if parquet_source else None
+        self.parquet_file: Optional[Path] = None
+        # Fan-out: CSV final extraído una sola vez para varias tablas destino
+        self.shared_extract = Path(shared_extract) if shared_extract else None
+        # Lote en curso (ETLScheduler): acota la reutilización de la caché de extracciones
+        self.batch_id = batch_id
+        # Conteo de origen ya conocido (p. ej. filas del Parquet): evita re-consultar el origen
+        self.known_origin_count: Optional[int] = None
         self.etl_config: Optional[Dict[str, Any]] = None
+        self.dedup_removed = 0  # Filas duplicadas por MERGE_KEY eliminadas de _tmp
+        self.reject_dir: Optional[Path] = None
+        self.load_rejects: List[Dict[str, Any]] = []
+        self.reject_summary = ""
+        # Filas descartadas por la validación de tipos (transform = arrow)
+        self.transform_rejected = 0
+        # Filas afectadas por el MERGE (-1 si el driver no lo informa)
+        self.merge_rowcount = -1
+        # Bloques del MERGE por bloques ya confirmados: un error posterior no los deshace
+        self.merge_chunks_committed = 0
+        # Extracción CDC: bajas incluidas en el archivo y LSN a confirmar en el slot
+        self.cdc_deletes = 0
+        self._cdc_last_lsn: Optional[str] = None
+        # Filas eliminadas en destino por no existir ya en el origen (delete_detection)
+        self.source_deletes = 0
+        self._script_sql_create_tmp: Optional[str] = None
+        self._tmp_table_created = False
+        self._bitacora_columnas: Optional[List[str]] = None
+        # Estadísticas generadas tras la carga (none, columns o full) y su duración
+        self.statistics_mode = "none"
+        self.statistics_seconds: Optional[float] = None
+        self._cancel_event = threading.Event()  # Se activa si falla un paso del proceso
 
         self.output_dir.mkdir(parents=True, exist_ok=True)
         logger.info(
@@ -74,40 +132,227 @@ class NetezzaETLLoader:
         logger.info(f"Usando Excel de configuración: '{excel_config_path}'.")
         logger.info(f"Directorio de salida: '{self.output_dir}'.")
 
+    def _load_etl_settings(self, config_file: str) -> configparser.ConfigParser:
+        """
+        Lee las opciones del loader desde la sección [etl] del .ini.
+        Una sección [etl.<tabla>] permite sobreescribirlas para una tabla concreta.
+        """
+        parser = configparser.ConfigParser(interpolation=None)
+        parser.read(Path(config_file), encoding="utf-8")
+        return parser
+
+    def _get_etl_setting(
+        self, key: str, fallback: Optional[str] = None
+    ) -> Optional[str]:
+        """Obtiene una opción del loader, priorizando la sección específica de la tabla."""
+        for section in (f"etl.{self.target_table}", "etl"):
+            if self.etl_settings.has_option(section, key):
+                return self.etl_settings.get(section, key)
+        return fallback
+
+    def _get_etl_setting_bool(self, key: str, fallback: bool = False) -> bool:
+        value = self._get_etl_setting(key)
+        if value is None:
+            return fallback
+        return value.strip().upper() in ["1", "X", "YES", "TRUE", "SI", "ON"]
+
+    def _get_etl_setting_int(self, key: str, fallback: int = 0) -> int:
+        value = self._get_etl_setting(key)
+        try:
+            return int(value) if value is not None else fallback
+        except ValueError:
+            logger.warning(
+                f"Valor inválido para la opción '{key}': '{value}'. Usando {fallback}."
+            )
+            return fallback
+
+    def _get_etl_setting_float(self, key: str, fallback: float = 0.0) -> float:
+        value = self._get_etl_setting(key)
+        try:
+            return float(value) if value is not None else fallback
+        except ValueError:
+            logger.warning(
+                f"Valor inválido para la opción '{key}': '{value}'. Usando {fallback}."
+            )
+            return fallback
+
+    def _conteo_timeout(self, conteo: str) -> Optional[float]:
+        """Límite en segundos para un conteo (count_timeout_<conteo> o count_timeout); None = sin límite."""
+        timeout = self._get_etl_setting_float(
+            f"count_timeout_{conteo}", self._get_etl_setting_float("count_timeout", 0.0)
+        )
+        return timeout if timeout > 0 else None
+
     def _conteo_base_origen(self):
+        if self.known_origin_count is not None:
+            logger.info(f"Conteo origen ya conocido: {self.known_origin_count}.")
+            return self.known_origin_count
+        # Otra conexión puede elegir otra réplica, con otra posición de replay: si la
+        # extracción leyó de una réplica, el conteo origen son las filas que leyó
+        if (
+            self.postgres_db is not None
+            and self.postgres_db.on_replica
+            and self.postgres_db.last_row_count is not None
+        ):
+            logger.info(
+                f"Conteo origen tomado de la extracción en la réplica {self.postgres_db.connected_host}: {self.postgres_db.last_row_count}."
+            )
+            return self.postgres_db.last_row_count
         # Usa el mismo query de extracción, pero con COUNT(*)
         # query = ""
         query = self.etl_config["query_extracion"]
         clean_query = query[:-1] if query.endswith(";") else query
         count_query = f"SELECT COUNT(*) FROM ({clean_query}) AS subq"
-        logger.info(f"Ejecutando conteo de registros en PostgreSQL: {count_query}")
-        # Usa PostgresConnection para ejecutar el conteo
-        self.postgres_db = PostgresConnection(
-            schema=self.etl_config["esquema_postgres"], config_file=self.config_file
+        logger.info(
+            f"Ejecutando conteo de registros en PostgreSQL: {acortar_sql(count_query)}"
+        )
+        # Conexión propia: el conteo puede correr en paralelo con los demás
+        postgres_db = PostgresConnection(
+            schema=self.etl_config["esquema_postgres"],
+            config_file=self.config_file,
+            use_replica=True,
         )
-        self.postgres_db.connect()
-        self.postgres_db.cursor.execute(count_query)
-        result = self.postgres_db.cursor.fetchone()
-        self.postgres_db.close()
+        try:
+            postgres_db.connect()
+            timeout = self._conteo_timeout("origen")
+            if timeout:
+                # El servidor cancela el conteo si excede el límite
+                postgres_db.cursor.execute(
+                    f"SET statement_timeout = {int(timeout * 1000)}"
+                )
+            postgres_db.cursor.execute(count_query)
+            result = postgres_db.cursor.fetchone()
+        finally:
+            postgres_db.close()
         return result[0] if result else 0
 
     def _conteo_archivo(self):
         # Cuenta las líneas del archivo CSV final, menos la cabecera
         if not self.final_csv_file or not self.final_csv_file.exists():
             return 0
-        with open(self.final_csv_file, "r", encoding="utf-8") as f:
-            return sum(1 for _ in f) - 1  # menos la cabecera
+        lineas = 0
+        ultimo_bloque = b""
+        with open(self.final_csv_file, "rb") as f:
+            # Lectura binaria por bloques: evita decodificar UTF-8 línea a línea
+            for bloque in iter(lambda: f.read(8 * 1024 * 1024), b""):
+                lineas += bloque.count(b"\n")
+                ultimo_bloque = bloque
+        if ultimo_bloque and not ultimo_bloque.endswith(b"\n"):
+            lineas += 1  # última línea sin salto final
+        return lineas - 1  # menos la cabecera
 
     def _conteo_base_destino(self):
-        # Usa el timestamp de la carga actual
+        # Cada fila insertada o actualizada por el MERGE recibe el UPLOAD_DATE de esta
+        # carga, así que su rowcount equivale al conteo y evita recorrer la tabla
+        modo = (self._get_etl_setting("destination_count", "rowcount") or "").lower()
+        # Con CDC el rowcount también incluye las bajas, que no quedan con UPLOAD_DATE
+        if modo == "rowcount" and self.merge_rowcount >= 0 and not self._cdc_enabled():
+            logger.info(
+                f"Conteo destino tomado del rowcount del MERGE: {self.merge_rowcount}."
+            )
+            return self.merge_rowcount
+        # Predicado tipado sobre UPLOAD_DATE para que Netezza use los zone maps
         upload_col = "UPLOAD_DATE"
         query = f"""
             SELECT COUNT(*) FROM "{self.netezza_schema}"."{self.target_table}"
-            WHERE {upload_col} = '{self.upload_timestamp}'
+            WHERE {upload_col} = CAST('{self.upload_timestamp}' AS TIMESTAMP)
         """
         result = self.netezza_db.execute_query(query)
         return result[0][0] if result else 0
 
+    def _ejecutar_conteos(self) -> Tuple[Dict[str, Optional[int]], List[str]]:
+        """
+        Ejecuta en paralelo los conteos de origen, archivo y destino, cada uno con su límite
+        de tiempo. Devuelve los conteos (None si el conteo falló o excedió el límite) y
+        los mensajes de error correspondientes.
+        """
+        conteos_funciones = {
+            "origen": self._conteo_base_origen,
+            "archivo": self._conteo_archivo,
+            "destino": self._conteo_base_destino,
+        }
+        # El conteo origen lo cancela PostgreSQL (statement_timeout) y el de archivo no
+        # retiene conexiones; el destino retiene la conexión de la carga hasta abortarlo
+        cancelaciones = {"destino": self._abortar_conteo_destino}
+        conteos: Dict[str, Optional[int]] = {}
+        errores: List[str] = []
+        # Con --profile cada conteo se perfila en su hilo y corren de a uno: cProfile y
+        # tracemalloc no admiten perfiles simultáneos
+        perfilado = self.profile or self.profile_memory
+        iniciados = {nombre: threading.Event() for nombre in conteos_funciones}
+        lanzamientos: Dict[str, float] = {}
+
+        def lanzar(nombre: str, funcion: Callable[[], Optional[int]]):
+            funcion = self._perfilar(f"conteo_{nombre}", funcion)
+
+            def ejecutar() -> Optional[int]:
+                lanzamientos[nombre] = time.monotonic()
+                iniciados[nombre].set()
+                return funcion()
+
+            return ejecutar
+
+        executor = ThreadPoolExecutor(
+            max_workers=1 if perfilado else len(conteos_funciones),
+            thread_name_prefix="conteo",
+        )
+        try:
+            futuros = {
+                nombre: executor.submit(lanzar(nombre, funcion))
+                for nombre, funcion in conteos_funciones.items()
+            }
+            for nombre, futuro in futuros.items():
+                timeout = self._conteo_timeout(nombre)
+                # Cada límite cuenta desde que el conteo arrancó, no desde que terminó el
+                # anterior
+                iniciados[nombre].wait()
+                restante = (
+                    None
+                    if timeout is None
+                    else max(lanzamientos[nombre] + timeout - time.monotonic(), 0.0)
+                )
+                try:
+                    conteos[nombre] = futuro.result(timeout=restante)
+                except FuturesTimeoutError:
+                    conteos[nombre] = None
+                    errores.append(
+                        f"El conteo {nombre} no terminó en {timeout:g} segundos."
+                    )
+                    logger.error(errores[-1])
+                    if nombre in cancelaciones:
+                        cancelaciones[nombre]()
+                except Exception as e:
+                    conteos[nombre] = None
+                    errores.append(f"Falló el conteo {nombre}: {e}")
+                    logger.error(errores[-1], exc_info=True)
+        finally:
+            # No espera a los conteos que excedieron su límite
+            executor.shutdown(wait=False)
+        return conteos, errores
+
+    def _abortar_conteo_destino(self) -> None:
+        """
+        Aborta en Netezza el conteo destino que excedió su límite: mientras corre retiene la
+        conexión de la carga, cuya transacción se deshace de todos modos por el error.
+        """
+        if self.netezza_db.abortar_sesion():
+            logger.warning(
+                f"Se abortó en Netezza el conteo destino de '{self.target_table}' y con él la transacción de la carga."
+            )
+
+    def _bitacora_tiene_columna(self, columna: str) -> bool:
+        """Indica si la bitácora tiene una columna opcional (el catálogo se consulta una vez)."""
+        if self._bitacora_columnas is None:
+            columnas = self._get_netezza_table_columns(
+                self.netezza_schema, "DWH_BITACORA_CARGA_MIGRACION"
+            )
+            self._bitacora_columnas = [c.upper() for c in columnas or []]
+        return columna.upper() in self._bitacora_columnas
+
+    def _bitacora_tiene_nombre_tabla(self) -> bool:
+        """Indica si la bitácora tiene la columna opcional NOMBRE_TABLA."""
+        return self._bitacora_tiene_columna("NOMBRE_TABLA")
+
     def _bitacora_insert_inicio(self):
         config_path = Path(self.config_file)
         parser = configparser.ConfigParser()
@@ -124,14 +369,38 @@ class NetezzaETLLoader:
         parser.read(config_path)
         database_name = parser.get("netezza", "database")
         self.inicio_carga = datetime.now().replace(microsecond=0)
-        sql = f"""
-        INSERT INTO "{database_name}"."{self.netezza_schema}"."DWH_BITACORA_CARGA_MIGRACION"
-        (INICIO_CARGA, CARGADO, ESTADO, OBSERVACION)
-        VALUES ('{self.inicio_carga}', 2, 'PASO 1', 'Paso 1: Extrayendo datos desde PostgreSQL')
-        """
-        logger.info(f"Insertando registro de inicio en bitácora, con el query {sql}")
+        if self._bitacora_tiene_nombre_tabla():
+            sql = f"""
+            INSERT INTO "{database_name}"."{self.netezza_schema}"."DWH_BITACORA_CARGA_MIGRACION"
+            (INICIO_CARGA, NOMBRE_TABLA, CARGADO, ESTADO, OBSERVACION)
+            VALUES ('{self.inicio_carga}', '{self.target_table}', 2, 'PASO 1', 'Paso 1: Extrayendo datos desde PostgreSQL')
+            """
+        else:
+            sql = f"""
+            INSERT INTO "{database_name}"."{self.netezza_schema}"."DWH_BITACORA_CARGA_MIGRACION"
+            (INICIO_CARGA, CARGADO, ESTADO, OBSERVACION)
+            VALUES ('{self.inicio_carga}', 2, 'PASO 1', 'Paso 1: Extrayendo datos desde PostgreSQL')
+            """
+        logger.debug(
+            f"Insertando registro de inicio en bitácora, con el query {acortar_sql(sql)}"
+        )
         self.netezza_db.execute_command(sql)
 
+    def _conexion_bitacora(self) -> NetezzaConnection:
+        """
+        Conexión para actualizar la bitácora. Con la transacción de la carga abierta, los avances
+        de pasos y progreso van por una conexión aparte que confirma cada sentencia: quedan
+        visibles de inmediato y no retienen la bitácora, compartida por las cargas simultáneas.
+        La carga nunca escribe la bitácora dentro de su transacción: la fila ya actualizada por
+        la otra conexión provocaría un conflicto de serialización al confirmarla.
+        """
+        if not self.netezza_db.en_transaccion:
+            return self.netezza_db
+        with self._bitacora_db_lock:
+            if self.bitacora_db is None:
+                self.bitacora_db = NetezzaConnection(config_file=self.config_file)
+            return self.bitacora_db
+
     def _bitacora_update(self, **kwargs):
         config_path = Path(self.config_file)
         parser = configparser.ConfigParser()
@@ -163,13 +432,23 @@ class NetezzaETLLoader:
             else:
                 set_clauses.append(f"{k} = {v}")
         set_sql = ", ".join(set_clauses)
+        # Con NOMBRE_TABLA, cargas de distintas tablas que inician en el mismo segundo
+        # (ejecución por lotes) no se pisan en la bitácora
+        filtro_tabla = (
+            f" AND NOMBRE_TABLA = '{self.target_table}'"
+            if self._bitacora_tiene_nombre_tabla()
+            else ""
+        )
         sql = f"""
         UPDATE "{database_name}"."{self.netezza_schema}"."DWH_BITACORA_CARGA_MIGRACION"
         SET {set_sql}
-        WHERE INICIO_CARGA = '{self.inicio_carga}'
+        WHERE INICIO_CARGA = '{self.inicio_carga}'{filtro_tabla}
         """
-        logger.info(f"Actualizando registro de bitácora con el query {sql}..")
-        self.netezza_db.execute_command(sql)
+        # Se ejecuta en cada paso y en cada evento de progreso: solo en DEBUG
+        logger.debug(
+            f"Actualizando registro de bitácora con el query {acortar_sql(sql)}.."
+        )
+        self._conexion_bitacora().execute_command(sql)
 
     def _drop_external_table_if_exists(self) -> bool:
         """
@@ -248,7 +527,11 @@ class NetezzaETLLoader:
             return None
 
     def _convert_raw_to_final_csv(
-        self, raw_file: Path, final_file: Path, final_separator: str
+        self,
+        raw_file: Path,
+        final_file: Path,
+        final_separator: str,
+        progreso: Optional[ReporteProgreso] = None,
     ) -> bool:
         """Convierte el archivo raw (delimitado por tabs) al formato CSV final con el separador elegido."""
         try:
@@ -262,6 +545,10 @@ class NetezzaETLLoader:
                 for row in reader:
                     writer.writerow(row)
                     count += 1
+                    if progreso is not None and count % 10000 == 0:
+                        progreso.avanzar(10000)
+                if progreso is not None:
+                    progreso.avanzar(count % 10000)
             logger.info(
                 f"Archivo raw '{raw_file}' convertido a CSV final '{final_file}' con separador '{final_separator}'. {count} filas procesadas."
             )
@@ -274,9 +561,21 @@ class NetezzaETLLoader:
         if not self.get_etl_config_from_netezza():
             return False
         assert self.etl_config is not None, "etl_config no debería ser None aquí."
+        # Los slots de replicación lógica solo existen en el primario
         self.postgres_db = PostgresConnection(
-            schema=self.etl_config["esquema_postgres"], config_file=self.config_file
+            schema=self.etl_config["esquema_postgres"],
+            config_file=self.config_file,
+            use_replica=not self._cdc_enabled(),
         )
+        self.postgres_db.cancel_event = self._cancel_event
+        if self._cdc_enabled():
+            return self._extract_cdc_changes()
+        if (self._get_etl_setting("transform", "csv") or "csv").lower() == "arrow":
+            if self._get_etl_setting_bool("extract_cache"):
+                logger.info(
+                    "extract_cache solo aplica con transform = csv; se extrae sin caché."
+                )
+            return self._extract_with_arrow_transform()
         temp_file_obj_raw_pg = tempfile.NamedTemporaryFile(
             mode="w+", delete=False, encoding="utf-8", suffix="_pg_raw.tmp", newline=""
         )
@@ -285,15 +584,15 @@ class NetezzaETLLoader:
         logger.info(
             f"Archivo temporal para datos crudos de PostgreSQL: '{self.raw_pg_file}'"
         )
-        if not self.postgres_db.execute_query_to_csv(
-            self.etl_config["query_extracion"],
-            str(self.raw_pg_file),
-            "\t",
-        ):
+        if not self._extract_raw_with_cache():
             logger.error(
                 "Fallo en la extracción de datos (execute_query_to_csv) desde PostgreSQL."
             )
             return False
+        return self._finalize_raw_extract()
+
+    def _finalize_raw_extract(self) -> bool:
+        """Convierte el archivo raw extraído al CSV final con un separador que no aparezca en los datos."""
         final_csv_separator = self._determine_csv_separator(self.raw_pg_file)
         if not final_csv_separator:
             logger.error(
@@ -302,170 +601,876 @@ class NetezzaETLLoader:
             return False
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.final_csv_file = self.output_dir / f"{self.target_table}_{timestamp}.csv"
-        if not self._convert_raw_to_final_csv(
-            self.raw_pg_file, self.final_csv_file, final_csv_separator
-        ):
-            return False
+        filas_extraidas = self.postgres_db.last_row_count
+        if filas_extraidas is None:
+            filas_extraidas = self.known_origin_count
+        with self._crear_reporte_progreso(
+            "conversión", filas_extraidas + 1 if filas_extraidas is not None else None
+        ) as progreso:
+            if not self._convert_raw_to_final_csv(
+                self.raw_pg_file, self.final_csv_file, final_csv_separator, progreso
+            ):
+                return False
         logger.info(
             f"Datos de PostgreSQL extraídos y guardados en CSV final: '{self.final_csv_file}'"
         )
         return True
 
-    def generate_tmp_table_script(self) -> Optional[str]:
-        """Genera el script SQL para crear la tabla temporal en Netezza, basado en el Excel."""
-        table_config_excel = self.excel_reader.get_table_config(self.target_table)
-        if not table_config_excel:
+    def _cdc_enabled(self) -> bool:
+        """Extracción desde un slot de replicación lógica (extraction = cdc) en lugar de query_extracion."""
+        if self.parquet_source or self.shared_extract:
+            return False
+        return (
+            self._get_etl_setting("extraction", "query") or "query"
+        ).lower() == "cdc"
+
+    def _extract_cdc_changes(self) -> bool:
+        """
+        Lee los cambios pendientes del slot de replicación lógica de la tabla de origen y los
+        deja en el archivo raw, una fila por clave con su último estado y la columna OP_CDC
+        (U = alta o modificación, D = baja). El MERGE aplica luego altas, modificaciones y
+        bajas. El slot se avanza recién cuando la carga termina OK: si falla, la próxima
+        ejecución vuelve a leer los mismos cambios.
+        """
+        if (self._get_etl_setting("transform", "csv") or "csv").lower() == "arrow":
+            logger.info("transform = arrow no aplica con extraction = cdc; se usa csv.")
+        _, merge_keys, _ = self._get_merge_columns()
+        if not merge_keys:
             logger.error(
-                f"No se encontró configuración para la tabla '{self.target_table}' en el Excel. No se puede generar script SQL."
+                f"La extracción CDC requiere columnas MERGE_KEY para '{self.target_table}'."
             )
-            return None
-        distribute_col = None
-        column_defs_sql = []
-        for col_excel in table_config_excel:
-            col_name = col_excel.get("COLUMNAS")
-            if col_name.upper() == "UPLOAD_DATE":
-                continue  # No incluir columna de fecha de carga en la tabla temporal
-            col_type = col_excel.get("TIPO")
-            nullable_val = str(col_excel.get("NULLABLE", "YES")).upper()
-            not_null_clause = "NOT NULL" if nullable_val in ["NO", "N", "FALSE"] else ""
-            if not col_name or not col_type:
-                logger.error(
-                    f"Definición de columna incompleta en Excel para tabla '{self.target_table}': falta 'COLUMNAS' o 'TIPO'. Col: {col_excel}"
-                )
-                return None
-            column_defs_sql.append(
-                f'    "{col_name}" {col_type} {not_null_clause}'.strip()
+            return False
+        column_names_excel, _ = self._excel_load_columns()
+        slot = self._get_etl_setting("cdc_slot", f"etl_{self.target_table.lower()}")
+        tabla_origen = self._get_etl_setting(
+            "cdc_table", f"{self.etl_config['esquema_postgres']}.{self.target_table}"
+        )
+        if self._get_etl_setting_bool(
+            "cdc_create_slot", True
+        ) and not self.postgres_db.ensure_logical_slot(slot):
+            return False
+        try:
+            lineas, self._cdc_last_lsn = self.postgres_db.peek_logical_changes(
+                slot, self._get_etl_setting_int("cdc_max_changes", 1000000)
             )
-            distribute_marker = str(col_excel.get("DISTRIBUTE", "")).upper()
-            if distribute_marker in ["X", "YES", "TRUE"]:
-                if distribute_col:
-                    logger.warning(
-                        f"Múltiples columnas marcadas para DISTRIBUTE ON para tabla '{self.target_table}'. Usando la primera: '{distribute_col}'."
-                    )
-                else:
-                    distribute_col = f'"{col_name}"'
-        if not column_defs_sql:
+            cambios = (cdc.parsear_cambio_test_decoding(linea) for linea in lineas)
+            filas, altas, self.cdc_deletes = cdc.consolidar_cambios(
+                (cambio for cambio in cambios if cambio is not None),
+                tabla_origen,
+                column_names_excel,
+                [key.strip('"') for key in merge_keys],
+            )
+        except Exception as e:
             logger.error(
-                f"No se pudieron generar definiciones de columna para tabla temporal '{self.target_table}_tmp'."
+                f"Error al leer los cambios del slot de replicación '{slot}': {e}",
+                exc_info=True,
             )
-            return None
-        tmp_table_name = f'"{self.netezza_schema}"."{self.target_table}_tmp"'
-        script_lines = [
-            f"-- Script generado desde Excel para {tmp_table_name}",
-            f"DROP TABLE {tmp_table_name} IF EXISTS;",
-            f"CREATE TABLE {tmp_table_name}",
-            "(",
-            ",\n".join(column_defs_sql),
-            ")",
-        ]
-        if distribute_col:
-            script_lines.append(f"DISTRIBUTE ON ({distribute_col});")
-        else:
-            script_lines.append("DISTRIBUTE ON RANDOM;")
-        full_script = "\n".join(script_lines)
-        logger.debug(
-            f"Script SQL para tabla temporal '{tmp_table_name}' generado:\n{full_script}"
+            return False
+        finally:
+            self.postgres_db.close()
+        logger.info(
+            f"Slot '{slot}': {len(lineas)} mensajes leídos, {altas} altas/modificaciones y {self.cdc_deletes} bajas de '{tabla_origen}' a aplicar."
         )
-        return full_script
+        temp_file_obj_raw_pg = tempfile.NamedTemporaryFile(
+            mode="w", delete=False, encoding="utf-8", suffix="_pg_raw.tmp", newline=""
+        )
+        self.raw_pg_file = Path(temp_file_obj_raw_pg.name)
+        with temp_file_obj_raw_pg as f:
+            writer = csv.writer(f, delimiter="\t")
+            writer.writerow(column_names_excel + [cdc.OP_CDC_COLUMN])
+            writer.writerows(filas)
+        self.known_origin_count = len(filas)
+        return self._finalize_raw_extract()
 
-    def update_production_table(self) -> bool:
-        """Asegura que la tabla de producción en Netezza exista y tenga todas las columnas del Excel."""
-        logger.info(
-            f"Verificando/Actualizando estructura de tabla de producción Netezza: '{self.netezza_schema}.{self.target_table}'..."
+    def _confirm_cdc_changes(self) -> None:
+        """Avanza el slot tras una carga OK. Si falla, los cambios se vuelven a aplicar (idempotente)."""
+        if not self._cdc_enabled() or not self._cdc_last_lsn:
+            return
+        slot = self._get_etl_setting("cdc_slot", f"etl_{self.target_table.lower()}")
+        postgres_db = PostgresConnection(
+            schema=self.etl_config["esquema_postgres"], config_file=self.config_file
         )
-        table_config_excel = self.excel_reader.get_table_config(self.target_table)
-        if not table_config_excel:
-            logger.error(
-                f"No hay configuración en Excel para '{self.target_table}', no se puede actualizar/crear."
-            )
-            return False
-        prod_table_fqn = f'"{self.netezza_schema}"."{self.target_table}"'
-        check_table_exists_sql = f"""
-        SELECT COUNT(*) FROM _V_TABLE 
-        WHERE SCHEMA = '{self.netezza_schema.upper()}' AND TABLENAME = '{self.target_table.upper()}'
+        try:
+            postgres_db.advance_logical_slot(slot, self._cdc_last_lsn)
+        finally:
+            postgres_db.close()
+
+    def _excel_load_columns(self) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Columnas del Excel que viajan en el CSV final (sin UPLOAD_DATE) y sus tipos interpretados."""
+        table_config = self.excel_reader.get_table_config(self.target_table) or []
+        columns_excel = [
+            col
+            for col in table_config
+            if col.get("COLUMNAS") and col["COLUMNAS"].upper() != "UPLOAD_DATE"
+        ]
+        column_names_excel = [col["COLUMNAS"] for col in columns_excel]
+        specs = [
+            arrow_transform.parse_excel_type(col.get("TIPO"), col.get("FORMATO"))
+            for col in columns_excel
+        ]
+        return column_names_excel, specs
+
+    def _detect_final_csv_separator(
+        self, archivo: Optional[Path] = None
+    ) -> Optional[str]:
+        """Detecta el separador del CSV final (o de `archivo`) a partir de su cabecera."""
+        with open(archivo or self.final_csv_file, "r", encoding="utf-8") as f:
+            first_line = f.readline()
+        return next((s for s in ALTERNATIVE_SEPARATORS if s in first_line), None)
+
+    def archive_extract_to_parquet(self) -> bool:
         """
-        result = self.netezza_db.execute_query(check_table_exists_sql)
-        table_exists = result and result[0][0] > 0
-        if not table_exists:
-            logger.info(
-                f"Tabla de producción {prod_table_fqn} no existe. Intentando crearla..."
+        Archiva el CSV final como Parquet (archive_format = parquet | both) con los tipos
+        del Excel, para auditorías y re-cargas sin volver a consultar PostgreSQL.
+        Un fallo del archivado no detiene la carga: se conserva el CSV.
+        """
+        if not arrow_transform.pyarrow_available():
+            logger.warning(
+                "archive_format requiere pyarrow instalado. Se conserva solo el CSV final."
             )
-            distribute_col_prod = None
-            column_defs_prod_sql = []
-            for col_excel in table_config_excel:
-                col_name = col_excel["COLUMNAS"]
-                col_type = col_excel["TIPO"]
-                not_null_clause = (
-                    "NOT NULL"
-                    if str(col_excel.get("NULLABLE", "YES")).upper()
-                    in ["NO", "N", "FALSE"]
-                    else ""
+            return True
+        try:
+            separator = self._detect_final_csv_separator()
+            if not separator:
+                logger.warning(
+                    "No se pudo detectar el separador del CSV final. No se archiva en Parquet."
                 )
-                column_defs_prod_sql.append(
-                    f'    "{col_name}" {col_type} {not_null_clause}'.strip()
+                return True
+            with open(self.final_csv_file, "r", encoding="utf-8", newline="") as f:
+                header = next(csv.reader(f, delimiter=separator))
+            column_names_excel, specs = self._excel_load_columns()
+            if len(header) != len(specs):
+                logger.warning(
+                    f"El CSV final tiene {len(header)} columnas y el Excel define {len(specs)}. Se archiva como texto."
                 )
-                if (
-                    str(col_excel.get("DISTRIBUTE", "")).upper() in ["X", "YES", "TRUE"]
-                    and not distribute_col_prod
-                ):
-                    distribute_col_prod = f'"{col_name}"'
-            create_prod_sql_lines = [
-                f"CREATE TABLE {prod_table_fqn}",
-                "(",
-                ",\n".join(column_defs_prod_sql),
-                ")",
-            ]
-            create_prod_sql_lines.append(
-                f"DISTRIBUTE ON ({distribute_col_prod});"
-                if distribute_col_prod
-                else "DISTRIBUTE ON RANDOM;"
+                specs = [{"kind": "string"} for _ in header]
+            parquet_file = self.final_csv_file.with_suffix(".parquet")
+            metadata = {
+                "etl_tabla": self.target_table,
+                "etl_upload_date": str(self.upload_timestamp),
+                "etl_columnas_excel": ",".join(column_names_excel),
+            }
+            rows = arrow_transform.csv_to_parquet(
+                self.final_csv_file,
+                parquet_file,
+                separator,
+                header,
+                specs,
+                metadata=metadata,
+                compression=self._get_etl_setting("archive_compression", "zstd"),
             )
-            create_prod_sql = "\n".join(create_prod_sql_lines)
-            if self.netezza_db.execute_command(create_prod_sql):
-                logger.info(
-                    f"Tabla de producción {prod_table_fqn} creada exitosamente."
-                )
-            else:
-                logger.error(f"Fallo al crear tabla de producción {prod_table_fqn}.")
-                return False
-        else:
-            logger.info(
-                f"Tabla de producción {prod_table_fqn} existe. Verificando columnas..."
+        except Exception as e:
+            logger.warning(
+                f"No se pudo archivar el extracto en Parquet: {e}. Se conserva el CSV final.",
+                exc_info=True,
             )
-            current_columns_db = self._get_netezza_table_columns(
-                self.netezza_schema, self.target_table
+            return True
+        self.parquet_file = parquet_file
+        logger.info(
+            f"Extracto archivado en Parquet: '{self.parquet_file}' ({rows} filas, {self.parquet_file.stat().st_size} bytes; CSV: {self.final_csv_file.stat().st_size} bytes)."
+        )
+        return True
+
+    def restage_from_parquet(self) -> bool:
+        """
+        Genera el CSV final desde un extracto archivado en Parquet, sin consultar PostgreSQL.
+        El conteo de origen se toma de los metadatos del Parquet.
+        """
+        if not arrow_transform.pyarrow_available():
+            logger.error(
+                "La re-carga desde Parquet requiere pyarrow instalado. Abortando."
             )
-            if current_columns_db is None:
-                return False
-            current_columns_db_set = {col.upper() for col in current_columns_db}
-            for col_excel in table_config_excel:
-                col_name_excel = col_excel["COLUMNAS"]
-                if col_name_excel.upper() not in current_columns_db_set:
-                    col_type_excel = col_excel["TIPO"]
-                    not_null_clause = (
-                        "NOT NULL"
-                        if str(col_excel.get("NULLABLE", "YES")).upper()
-                        in ["NO", "N", "FALSE"]
-                        else ""
+            return False
+        if not self.parquet_source.exists():
+            logger.error(f"No existe el archivo Parquet '{self.parquet_source}'.")
+            return False
+        metadata = arrow_transform.parquet_metadata(self.parquet_source)
+        tabla_archivada = metadata.get("etl_tabla")
+        if tabla_archivada and tabla_archivada != self.target_table:
+            logger.warning(
+                f"El Parquet '{self.parquet_source}' fue archivado para la tabla '{tabla_archivada}', no para '{self.target_table}'."
+            )
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.final_csv_file = self.output_dir / f"{self.target_table}_{timestamp}.csv"
+        writer = None
+        try:
+            for batch in arrow_transform.iter_parquet_batches(self.parquet_source):
+                if self._cancel_event.is_set():
+                    logger.warning("Re-carga desde Parquet cancelada.")
+                    return False
+                if writer is None:
+                    separator = arrow_transform.choose_separator(
+                        batch, ALTERNATIVE_SEPARATORS
                     )
-                    if not_null_clause:
-                        logger.warning(
-                            f"Intentando añadir columna '{col_name_excel}' como NOT NULL a tabla existente {prod_table_fqn}. Esto podría fallar si la tabla tiene datos y no hay DEFAULT."
-                        )
-                    alter_sql = f'ALTER TABLE {prod_table_fqn} ADD COLUMN "{col_name_excel}" {col_type_excel} {not_null_clause}'.strip()
-                    if self.netezza_db.execute_command(alter_sql):
-                        logger.info(
-                            f"Columna '{col_name_excel}' agregada a tabla de producción {prod_table_fqn}."
-                        )
-                    else:
+                    if not separator:
                         logger.error(
-                            f"Fallo al agregar columna '{col_name_excel}' a {prod_table_fqn}."
+                            "No se pudo determinar un separador para el archivo CSV final."
                         )
                         return False
-        return True
-
-    def _get_netezza_table_columns(
-        self, schema: str, table: str
+                    writer = arrow_transform.DelimitedArrowWriter(
+                        self.final_csv_file, separator, batch.schema.names
+                    )
+                writer.write_batch(batch)
+        except Exception as e:
+            logger.error(
+                f"Error al generar el CSV final desde '{self.parquet_source}': {e}",
+                exc_info=True,
+            )
+            return False
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            logger.error(f"El archivo Parquet '{self.parquet_source}' no tiene datos.")
+            return False
+        self.known_origin_count = arrow_transform.parquet_row_count(self.parquet_source)
+        logger.info(
+            f"CSV final '{self.final_csv_file}' generado desde Parquet '{self.parquet_source}' (extracción original: {metadata.get('etl_upload_date', 'desconocida')}). {writer.rows_written} filas."
+        )
+        return True
+
+    def extract_for_fanout(self) -> bool:
+        """
+        Solo extrae el CSV final desde PostgreSQL, sin cargarlo, para repartirlo entre varias
+        tablas destino (fan-out). Deja en known_origin_count las filas extraídas.
+        """
+        if self._cdc_enabled():
+            logger.error(
+                "extraction = cdc no admite fan-out: el slot se confirma en cada carga."
+            )
+            return False
+        try:
+            if not self.extract_data_from_postgres():
+                return False
+            if self.known_origin_count is None:
+                self.known_origin_count = (
+                    self.postgres_db.last_row_count
+                    if self.postgres_db.last_row_count is not None
+                    else self._conteo_archivo() + self.transform_rejected
+                )
+            return True
+        finally:
+            if self._owns_netezza_db and self.netezza_db.conn:
+                self.netezza_db.close()
+            if self.postgres_db and self.postgres_db.conn:
+                self.postgres_db.close()
+            if self.raw_pg_file and self.raw_pg_file.exists():
+                os.remove(self.raw_pg_file)
+
+    def _shared_extract_columns(
+        self, header: List[str]
+    ) -> Optional[Tuple[List[int], List[str]]]:
+        """
+        Posiciones en el extracto compartido de las columnas de esta tabla y sus nombres. Cada
+        columna del Excel se busca por COLUMNA_ORIGEN (o por su nombre); si la hoja no usa
+        COLUMNA_ORIGEN y tiene tantas columnas como el extracto, se toman por posición.
+        """
+        columnas, _ = self._excel_load_columns()
+        table_config = self.excel_reader.get_table_config(self.target_table) or []
+        origenes = {}
+        for col in table_config:
+            origen = str(col.get("COLUMNA_ORIGEN") or "").strip()
+            if col.get("COLUMNAS") and origen.upper() not in ("", "NAN", "NONE"):
+                origenes[col["COLUMNAS"]] = origen
+        if not origenes and len(columnas) == len(header):
+            return list(range(len(header))), columnas
+        posiciones = {nombre.lower(): i for i, nombre in enumerate(header)}
+        indices = []
+        for columna in columnas:
+            origen = origenes.get(columna, columna)
+            if origen.lower() not in posiciones:
+                logger.error(
+                    f"La columna '{origen}' de '{self.target_table}' no está en el extracto compartido (columnas: {', '.join(header)})."
+                )
+                return None
+            indices.append(posiciones[origen.lower()])
+        return indices, columnas
+
+    def restage_from_shared_extract(self) -> bool:
+        """
+        Genera el CSV final de esta tabla desde el extracto compartido de un fan-out, sin
+        consultar PostgreSQL. Si la tabla usa todas las columnas en el mismo orden, el CSV
+        final es un enlace al extracto; si no, se escribe una copia con sus columnas.
+        """
+        if not self.shared_extract.exists():
+            logger.error(f"No existe el extracto compartido '{self.shared_extract}'.")
+            return False
+        separator = self._detect_final_csv_separator(self.shared_extract)
+        if not separator:
+            logger.error(
+                f"No se pudo detectar el separador del extracto compartido '{self.shared_extract}'."
+            )
+            return False
+        with open(self.shared_extract, "r", encoding="utf-8", newline="") as f:
+            header = next(csv.reader(f, delimiter=separator))
+        proyeccion = self._shared_extract_columns(header)
+        if proyeccion is None:
+            return False
+        indices, columnas = proyeccion
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.final_csv_file = self.output_dir / f"{self.target_table}_{timestamp}.csv"
+        if indices == list(range(len(header))):
+            try:
+                os.link(self.shared_extract, self.final_csv_file)
+            except OSError:
+                shutil.copyfile(self.shared_extract, self.final_csv_file)
+            logger.info(
+                f"CSV final '{self.final_csv_file}' tomado del extracto compartido '{self.shared_extract}' (mismas columnas)."
+            )
+            return True
+        try:
+            with (
+                open(self.shared_extract, "r", encoding="utf-8", newline="") as fin,
+                open(self.final_csv_file, "w", encoding="utf-8", newline="") as fout,
+            ):
+                reader = csv.reader(fin, delimiter=separator)
+                writer = csv.writer(fout, delimiter=separator)
+                next(reader)
+                writer.writerow(columnas)
+                count = 0
+                for row in reader:
+                    if count % 10000 == 0 and self._cancel_event.is_set():
+                        logger.warning("Proyección del extracto compartido cancelada.")
+                        return False
+                    writer.writerow([row[i] for i in indices])
+                    count += 1
+        except Exception as e:
+            logger.error(
+                f"Error al generar el CSV final desde el extracto compartido '{self.shared_extract}': {e}",
+                exc_info=True,
+            )
+            return False
+        logger.info(
+            f"CSV final '{self.final_csv_file}' generado desde el extracto compartido '{self.shared_extract}' con {len(indices)} de {len(header)} columnas. {count} filas."
+        )
+        return True
+
+    def _get_extract_cache(self) -> Optional[ExtractCache]:
+        """Caché de extracciones compartida entre tablas (extract_cache = true)."""
+        if not self._get_etl_setting_bool("extract_cache"):
+            return None
+        return ExtractCache(
+            Path(self._get_etl_setting("extract_cache_dir", "cache_extracciones")),
+            max_bytes=self._get_etl_setting_int("extract_cache_max_mb", 10240)
+            * 1024
+            * 1024,
+            lock_timeout=self._get_etl_setting_float(
+                "extract_cache_lock_timeout", 3600.0
+            ),
+        )
+
+    def _extract_cache_watermark(self) -> Optional[str]:
+        """
+        Marca de vigencia de la caché: el resultado de extract_cache_watermark_query en
+        PostgreSQL (p. ej. el máximo de una columna de actualización) o, si no se define, el
+        lote en curso, de modo que un reintento o una carga posterior vuelven a extraer.
+        None si no hay ninguna de las dos: la carga no usa la caché.
+        """
+        watermark_query = self._get_etl_setting("extract_cache_watermark_query")
+        if watermark_query:
+            self.postgres_db.connect()
+            self.postgres_db.cursor.execute(watermark_query)
+            result = self.postgres_db.cursor.fetchone()
+            return str(result[0]) if result and result[0] is not None else None
+        if self.batch_id:
+            return f"lote {self.batch_id}"
+        return None
+
+    def _crear_reporte_progreso(
+        self,
+        etapa: str,
+        total_estimado: Optional[int] = None,
+        avisar_bloqueo: bool = True,
+    ) -> ReporteProgreso:
+        """
+        Reporte de progreso de una etapa, configurado con las opciones progress_* de [etl].
+        Con avisar_bloqueo=False no se avisa de etapas sin filas nuevas (sentencias únicas
+        que solo informan filas al terminar).
+        """
+
+        def al_reportar(mensaje: str) -> None:
+            self._bitacora_update(OBSERVACION=mensaje)
+
+        return ReporteProgreso(
+            self.target_table,
+            etapa,
+            total_estimado=total_estimado,
+            intervalo=self._get_etl_setting_float("progress_interval", 30.0),
+            segundos_sin_avance=(
+                self._get_etl_setting_float("progress_stall_seconds", 600.0)
+                if avisar_bloqueo
+                else 0.0
+            ),
+            textfile_dir=self._get_etl_setting("progress_textfile_dir"),
+            al_reportar=(
+                al_reportar
+                if self._get_etl_setting_bool("progress_bitacora", True)
+                else None
+            ),
+        )
+
+    def _estimar_filas_origen(self) -> Optional[int]:
+        """
+        Filas esperadas de la extracción: el conteo de origen de la última carga OK de la
+        tabla (bitácora con NOMBRE_TABLA) o, si no hay, la estimación del planificador de PostgreSQL.
+        """
+        if self._bitacora_tiene_nombre_tabla():
+            result = self.netezza_db.execute_query(f"""
+                SELECT CONTEO_BASE_ORIGEN FROM "{self.netezza_schema}"."DWH_BITACORA_CARGA_MIGRACION"
+                WHERE NOMBRE_TABLA = '{self.target_table}' AND ESTADO = 'OK'
+                AND CONTEO_BASE_ORIGEN IS NOT NULL
+                ORDER BY INICIO_CARGA DESC LIMIT 1
+                """)
+            if result:
+                return int(result[0][0])
+        return self.postgres_db.estimate_row_count(self.etl_config["query_extracion"])
+
+    def _execute_query_to_raw_with_progress(self, query: str) -> bool:
+        """Ejecuta la extracción al archivo raw reportando progreso periódico."""
+        with self._crear_reporte_progreso(
+            "extracción", self._estimar_filas_origen()
+        ) as progreso:
+            self.postgres_db.progress = progreso.avanzar
+            try:
+                return self.postgres_db.execute_query_to_csv(
+                    query, str(self.raw_pg_file), "\t"
+                )
+            finally:
+                self.postgres_db.progress = None
+
+    def _extract_raw_with_cache(self) -> bool:
+        """
+        Extrae el archivo raw de PostgreSQL o lo reutiliza desde la caché de extracciones
+        si otra tabla ya ejecutó la misma query (normalizada) con la misma vigencia.
+        """
+        query = self.etl_config["query_extracion"]
+        cache = self._get_extract_cache()
+        watermark = self._extract_cache_watermark() if cache is not None else None
+        if cache is not None and watermark is None:
+            logger.info(
+                "extract_cache sin marca de vigencia (extract_cache_watermark_query o ejecución por lotes): se extrae sin caché."
+            )
+        if cache is None or watermark is None:
+            return self._execute_query_to_raw_with_progress(query)
+        key = cache.key(query, self.etl_config["esquema_postgres"], watermark)
+        with cache.lock(key):
+            entry = cache.lookup(key)
+            if entry and cache.materialize(key, self.raw_pg_file):
+                # El conteo de origen corresponde a la extracción reutilizada
+                self.known_origin_count = entry["filas"]
+                logger.info(
+                    f"Extracción reutilizada desde caché '{key[:12]}' ({entry['filas']} filas, creada {entry.get('creado')} para '{entry.get('tabla')}')."
+                )
+                return True
+            logger.info(f"Extracción no encontrada en caché '{key[:12]}'.")
+            if not self._execute_query_to_raw_with_progress(query):
+                return False
+            cache.store(
+                key,
+                self.raw_pg_file,
+                {
+                    "filas": self.postgres_db.last_row_count,
+                    "tabla": self.target_table,
+                    "esquema": self.etl_config["esquema_postgres"],
+                },
+            )
+        return True
+
+    def _extract_with_arrow_transform(self) -> bool:
+        """
+        Extrae de PostgreSQL por lotes Arrow, valida y castea cada lote en forma columnar
+        contra los tipos del Excel (largo de VARCHAR, precisión NUMERIC, rangos enteros, formato
+        de fechas) y escribe el CSV final directamente desde Arrow, sin archivo raw intermedio.
+        Las filas inválidas se descartan antes de la carga y quedan en un reporte de rechazos.
+        """
+        if not arrow_transform.pyarrow_available():
+            logger.error(
+                "La opción transform = arrow requiere pyarrow instalado. Abortando extracción."
+            )
+            return False
+        assert self.etl_config is not None and self.postgres_db is not None
+        column_names_excel, specs = self._excel_load_columns()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.final_csv_file = self.output_dir / f"{self.target_table}_{timestamp}.csv"
+        rejects_file = (
+            self.output_dir / f"{self.final_csv_file.stem}_rechazos_transformacion.csv"
+        )
+        writer = None
+        rejects_writer = None
+        rejects_handle = None
+        rejected_rows = set()
+        next_row_number = 1
+        progreso = self._crear_reporte_progreso(
+            "extracción", self._estimar_filas_origen()
+        ).iniciar()
+        try:
+            for column_names, rows in self.postgres_db.iter_query_batches(
+                self.etl_config["query_extracion"]
+            ):
+                if len(column_names) != len(specs):
+                    logger.error(
+                        f"La query de extracción devuelve {len(column_names)} columnas y el Excel define {len(specs)} para '{self.target_table}'."
+                    )
+                    return False
+                batch = arrow_transform.rows_to_record_batch(column_names, rows)
+                if writer is None:
+                    separator = arrow_transform.choose_separator(
+                        batch, ALTERNATIVE_SEPARATORS
+                    )
+                    if not separator:
+                        logger.error(
+                            "No se pudo determinar un separador para el archivo CSV final."
+                        )
+                        return False
+                    logger.info(
+                        f"Separador seleccionado para CSV final: '{separator}' (no encontrado en el primer lote)"
+                    )
+                    writer = arrow_transform.DelimitedArrowWriter(
+                        self.final_csv_file, separator, list(column_names)
+                    )
+                valid_batch, rejects = arrow_transform.validate_batch(
+                    batch, specs, column_names_excel, next_row_number
+                )
+                next_row_number += batch.num_rows
+                if rejects:
+                    if rejects_writer is None:
+                        rejects_handle = open(
+                            rejects_file, "w", newline="", encoding="utf-8"
+                        )
+                        rejects_writer = csv.DictWriter(
+                            rejects_handle, fieldnames=list(rejects[0].keys())
+                        )
+                        rejects_writer.writeheader()
+                    rejects_writer.writerows(rejects)
+                    rejected_rows.update(reject["fila"] for reject in rejects)
+                writer.write_batch(valid_batch)
+                progreso.avanzar(batch.num_rows, batch.nbytes)
+        except Exception as e:
+            logger.error(
+                f"Error en la extracción/transformación Arrow desde PostgreSQL: {e}",
+                exc_info=True,
+            )
+            return False
+        finally:
+            progreso.finalizar()
+            if writer is not None:
+                writer.close()
+            if rejects_handle is not None:
+                rejects_handle.close()
+            self.postgres_db.close()
+        # Filas leídas del origen (válidas y descartadas), como en execute_query_to_csv
+        self.postgres_db.last_row_count = next_row_number - 1
+        self.transform_rejected = len(rejected_rows)
+        if self.transform_rejected:
+            logger.warning(
+                f"La validación de tipos descartó {self.transform_rejected} filas de '{self.target_table}'. Reporte: '{rejects_file}'"
+            )
+        logger.info(
+            f"Datos de PostgreSQL ({writer.rows_written if writer else 0} filas válidas) transformados con Arrow y guardados en CSV final: '{self.final_csv_file}'"
+        )
+        return True
+
+    def generate_tmp_table_script(self) -> Optional[str]:
+        """Genera el script SQL para crear la tabla temporal en Netezza, basado en el Excel."""
+        table_config_excel = self.excel_reader.get_table_config(self.target_table)
+        if not table_config_excel:
+            logger.error(
+                f"No se encontró configuración para la tabla '{self.target_table}' en el Excel. No se puede generar script SQL."
+            )
+            return None
+        distribute_col = None
+        column_defs_sql = []
+        tmp_columns = []
+        cdc_mode = self._cdc_enabled()
+        for col_excel in table_config_excel:
+            col_name = col_excel.get("COLUMNAS")
+            if col_name.upper() == "UPLOAD_DATE":
+                continue  # No incluir columna de fecha de carga en la tabla temporal
+            tmp_columns.append(col_name)
+            col_type = col_excel.get("TIPO")
+            nullable_val = str(col_excel.get("NULLABLE", "YES")).upper()
+            not_null_clause = "NOT NULL" if nullable_val in ["NO", "N", "FALSE"] else ""
+            merge_key_marker = str(col_excel.get("MERGE_KEY", "")).upper()
+            if cdc_mode and merge_key_marker not in ["X", "PK", "YES", "TRUE"]:
+                # Las bajas CDC solo traen la clave: el resto de las columnas llega vacío
+                not_null_clause = ""
+            if not col_name or not col_type:
+                logger.error(
+                    f"Definición de columna incompleta en Excel para tabla '{self.target_table}': falta 'COLUMNAS' o 'TIPO'. Col: {col_excel}"
+                )
+                return None
+            column_defs_sql.append(
+                f'    "{col_name}" {col_type} {not_null_clause}'.strip()
+            )
+            distribute_marker = str(col_excel.get("DISTRIBUTE", "")).upper()
+            if distribute_marker in ["X", "YES", "TRUE"]:
+                if distribute_col:
+                    logger.warning(
+                        f"Múltiples columnas marcadas para DISTRIBUTE ON para tabla '{self.target_table}'. Usando la primera: '{distribute_col}'."
+                    )
+                else:
+                    distribute_col = f'"{col_name}"'
+        if not column_defs_sql:
+            logger.error(
+                f"No se pudieron generar definiciones de columna para tabla temporal '{self.target_table}_tmp'."
+            )
+            return None
+        if cdc_mode:
+            column_defs_sql.append(f'    "{cdc.OP_CDC_COLUMN}" CHAR(1) NOT NULL')
+        if self._get_etl_setting_bool("align_tmp_distribution", True):
+            distribute_col = self._resolve_tmp_distribution(distribute_col, tmp_columns)
+        tmp_table_name = f'"{self.netezza_schema}"."{self.target_table}_tmp"'
+        script_lines = [
+            f"-- Script generado desde Excel para {tmp_table_name}",
+            f"DROP TABLE {tmp_table_name} IF EXISTS;",
+            f"CREATE TABLE {tmp_table_name}",
+            "(",
+            ",\n".join(column_defs_sql),
+            ")",
+        ]
+        if distribute_col:
+            script_lines.append(f"DISTRIBUTE ON ({distribute_col});")
+        else:
+            script_lines.append("DISTRIBUTE ON RANDOM;")
+        full_script = "\n".join(script_lines)
+        logger.debug(
+            f"Script SQL para tabla temporal '{tmp_table_name}' generado:\n{acortar_sql(full_script)}"
+        )
+        return full_script
+
+    def _resolve_tmp_distribution(
+        self, excel_distribute_col: Optional[str], tmp_columns: List[str]
+    ) -> Optional[str]:
+        """
+        Alinea la distribución de la tabla temporal con la distribución real de producción,
+        para que el MERGE sobre las MERGE_KEY se resuelva sin redistribuir _tmp entre SPUs.
+        Devuelve la cláusula de columnas para DISTRIBUTE ON, o None para RANDOM.
+        """
+        prod_dist_cols = self._get_netezza_distribution_columns(
+            self.netezza_schema, self.target_table
+        )
+        if prod_dist_cols is None:
+            logger.warning(
+                f"No se pudo leer la distribución de producción de '{self.target_table}'. Se usa la distribución del Excel para _tmp."
+            )
+            return excel_distribute_col
+        _, merge_keys, _ = self._get_merge_columns()
+        merge_keys_upper = {key.strip('"').upper() for key in merge_keys or []}
+        suggestion = ", ".join(merge_keys or [])
+        if not prod_dist_cols:
+            if merge_keys_upper:
+                logger.warning(
+                    f"La tabla de producción '{self.target_table}' está distribuida RANDOM: cada MERGE redistribuirá los datos. Sugerencia: DISTRIBUTE ON ({suggestion})."
+                )
+            return excel_distribute_col
+        tmp_columns_by_upper = {col.upper(): col for col in tmp_columns}
+        missing = [
+            col for col in prod_dist_cols if col.upper() not in tmp_columns_by_upper
+        ]
+        if missing:
+            logger.warning(
+                f"Columnas de distribución de producción {missing} no existen en _tmp. Se usa la distribución del Excel."
+            )
+            return excel_distribute_col
+        prod_distribute_col = ", ".join(
+            f'"{tmp_columns_by_upper[col.upper()]}"' for col in prod_dist_cols
+        )
+        if merge_keys_upper and not {col.upper() for col in prod_dist_cols}.issubset(
+            merge_keys_upper
+        ):
+            logger.warning(
+                f"La distribución de producción ({prod_distribute_col}) no está contenida en las MERGE_KEY ({suggestion}) de '{self.target_table}': el MERGE redistribuirá los datos. Sugerencia: DISTRIBUTE ON ({suggestion})."
+            )
+        if excel_distribute_col and excel_distribute_col != prod_distribute_col:
+            logger.info(
+                f"DISTRIBUTE del Excel ({excel_distribute_col}) difiere de producción; _tmp se distribuye como producción ({prod_distribute_col})."
+            )
+        return prod_distribute_col
+
+    def update_production_table(self) -> bool:
+        """Asegura que la tabla de producción en Netezza exista y tenga todas las columnas del Excel."""
+        logger.info(
+            f"Verificando/Actualizando estructura de tabla de producción Netezza: '{self.netezza_schema}.{self.target_table}'..."
+        )
+        table_config_excel = self.excel_reader.get_table_config(self.target_table)
+        if not table_config_excel:
+            logger.error(
+                f"No hay configuración en Excel para '{self.target_table}', no se puede actualizar/crear."
+            )
+            return False
+        prod_table_fqn = f'"{self.netezza_schema}"."{self.target_table}"'
+        check_table_exists_sql = f"""
+        SELECT COUNT(*) FROM _V_TABLE 
+        WHERE SCHEMA = '{self.netezza_schema.upper()}' AND TABLENAME = '{self.target_table.upper()}'
+        """
+        result = self.netezza_db.execute_query(check_table_exists_sql)
+        table_exists = result and result[0][0] > 0
+        if not table_exists:
+            logger.info(
+                f"Tabla de producción {prod_table_fqn} no existe. Intentando crearla..."
+            )
+            distribute_col_prod = None
+            column_defs_prod_sql = []
+            for col_excel in table_config_excel:
+                col_name = col_excel["COLUMNAS"]
+                col_type = col_excel["TIPO"]
+                not_null_clause = (
+                    "NOT NULL"
+                    if str(col_excel.get("NULLABLE", "YES")).upper()
+                    in ["NO", "N", "FALSE"]
+                    else ""
+                )
+                column_defs_prod_sql.append(
+                    f'    "{col_name}" {col_type} {not_null_clause}'.strip()
+                )
+                if (
+                    str(col_excel.get("DISTRIBUTE", "")).upper() in ["X", "YES", "TRUE"]
+                    and not distribute_col_prod
+                ):
+                    distribute_col_prod = f'"{col_name}"'
+            create_prod_sql_lines = [
+                f"CREATE TABLE {prod_table_fqn}",
+                "(",
+                ",\n".join(column_defs_prod_sql),
+                ")",
+            ]
+            create_prod_sql_lines.append(
+                f"DISTRIBUTE ON ({distribute_col_prod})"
+                if distribute_col_prod
+                else "DISTRIBUTE ON RANDOM"
+            )
+            organize_cols = self._excel_organize_columns()[:MAX_ORGANIZE_COLUMNS]
+            if organize_cols:
+                # Tabla base organizada (CBT): GROOM agrupa las filas por estas columnas
+                create_prod_sql_lines.append(
+                    f"ORGANIZE ON ({', '.join(organize_cols)})"
+                )
+            create_prod_sql = "\n".join(create_prod_sql_lines) + ";"
+            if self.netezza_db.execute_command(create_prod_sql):
+                logger.info(
+                    f"Tabla de producción {prod_table_fqn} creada exitosamente."
+                )
+            else:
+                logger.error(f"Fallo al crear tabla de producción {prod_table_fqn}.")
+                return False
+        else:
+            logger.info(
+                f"Tabla de producción {prod_table_fqn} existe. Verificando columnas..."
+            )
+            current_columns_db = self._get_netezza_table_columns(
+                self.netezza_schema, self.target_table
+            )
+            if current_columns_db is None:
+                return False
+            current_columns_db_set = {col.upper() for col in current_columns_db}
+            for col_excel in table_config_excel:
+                col_name_excel = col_excel["COLUMNAS"]
+                if col_name_excel.upper() not in current_columns_db_set:
+                    col_type_excel = col_excel["TIPO"]
+                    not_null_clause = (
+                        "NOT NULL"
+                        if str(col_excel.get("NULLABLE", "YES")).upper()
+                        in ["NO", "N", "FALSE"]
+                        else ""
+                    )
+                    if not_null_clause:
+                        logger.warning(
+                            f"Intentando añadir columna '{col_name_excel}' como NOT NULL a tabla existente {prod_table_fqn}. Esto podría fallar si la tabla tiene datos y no hay DEFAULT."
+                        )
+                    alter_sql = f'ALTER TABLE {prod_table_fqn} ADD COLUMN "{col_name_excel}" {col_type_excel} {not_null_clause}'.strip()
+                    if self.netezza_db.execute_command(alter_sql):
+                        logger.info(
+                            f"Columna '{col_name_excel}' agregada a tabla de producción {prod_table_fqn}."
+                        )
+                    else:
+                        logger.error(
+                            f"Fallo al agregar columna '{col_name_excel}' a {prod_table_fqn}."
+                        )
+                        return False
+            if not self._sync_production_organize(prod_table_fqn):
+                return False
+        return True
+
+    def _excel_organize_columns(self) -> List[str]:
+        """
+        Columnas de la columna ORGANIZE (o SORT) del Excel, entre comillas. Un número fija la
+        posición (1, 2, ...); las marcadas con X/YES/TRUE van después, en el orden del Excel.
+        """
+        table_config_excel = self.excel_reader.get_table_config(self.target_table) or []
+        numeradas = []
+        marcadas = []
+        for col_excel in table_config_excel:
+            # Las celdas vacías del Excel llegan como NaN
+            marcadores = [
+                str(col_excel.get(columna, "") or "").strip()
+                for columna in ("ORGANIZE", "SORT")
+            ]
+            marker = next(
+                (m for m in marcadores if m.upper() not in ("", "NAN", "NONE")), ""
+            )
+            if not marker or not col_excel.get("COLUMNAS"):
+                continue
+            col_sql = f'"{col_excel["COLUMNAS"]}"'
+            try:
+                numeradas.append((float(marker), col_sql))
+            except ValueError:
+                if marker.upper() in ["X", "YES", "TRUE"]:
+                    marcadas.append(col_sql)
+        columnas = [col_sql for _, col_sql in sorted(numeradas)] + marcadas
+        if len(columnas) > MAX_ORGANIZE_COLUMNS:
+            logger.warning(
+                f"ORGANIZE ON admite hasta {MAX_ORGANIZE_COLUMNS} columnas; '{self.target_table}' marca {len(columnas)}. Se usan las primeras."
+            )
+        return columnas
+
+    def _get_netezza_organize_columns(
+        self, schema: str, table: str
+    ) -> Optional[List[str]]:
+        """Columnas de ORGANIZE ON de una tabla en Netezza (vacía si no es CBT); None si falla la consulta."""
+        sql = f"""
+        SELECT ATTNAME
+        FROM _V_TABLE_ORGANIZE_COLUMN
+        WHERE UPPER(SCHEMA) = '{schema.upper()}' AND UPPER(TABLENAME) = '{table.upper()}'
+        ORDER BY ORGSEQNO;
+        """
+        result = self.netezza_db.execute_query(sql)
+        if result is None:
+            return None
+        return [row[0] for row in result]
+
+    def _sync_production_organize(self, prod_table_fqn: str) -> bool:
+        """
+        Aplica a la tabla de producción existente el ORGANIZE ON del Excel si difiere del
+        catálogo. Las filas ya cargadas se reorganizan en el siguiente GROOM TABLE.
+        """
+        organize_cols = self._excel_organize_columns()[:MAX_ORGANIZE_COLUMNS]
+        if not organize_cols:
+            return True
+        actuales = self._get_netezza_organize_columns(
+            self.netezza_schema, self.target_table
+        )
+        if actuales is None:
+            logger.warning(
+                f"No se pudo leer el ORGANIZE ON actual de {prod_table_fqn}; no se modifica."
+            )
+            return True
+        if [c.upper() for c in actuales] == [
+            c.strip('"').upper() for c in organize_cols
+        ]:
+            return True
+        alter_sql = (
+            f"ALTER TABLE {prod_table_fqn} ORGANIZE ON ({', '.join(organize_cols)});"
+        )
+        if not self.netezza_db.execute_command(alter_sql):
+            logger.error(f"Fallo al cambiar ORGANIZE ON de {prod_table_fqn}.")
+            return False
+        logger.info(
+            f"ORGANIZE ON de {prod_table_fqn} cambiado de {actuales or 'ninguno'} a {organize_cols}."
+        )
+        return True
+
+    def _get_netezza_table_columns(
+        self, schema: str, table: str
     ) -> Optional[List[str]]:
         """Obtiene las columnas actuales de una tabla en Netezza."""
         sql = f"""
@@ -482,11 +1487,80 @@ class NetezzaETLLoader:
             return None
         return [row[0] for row in result]
 
+    def _ddl_fingerprint(self, script_sql: str) -> str:
+        """Huella (SHA-256) de la definición de la tabla temporal, sin líneas de comentario."""
+        ddl_lines = [
+            line.strip()
+            for line in script_sql.splitlines()
+            if line.strip() and not line.strip().startswith("--")
+        ]
+        return hashlib.sha256("\n".join(ddl_lines).encode("utf-8")).hexdigest()[:32]
+
+    def _get_tmp_table_fingerprint(self) -> Optional[str]:
+        """
+        Lee la huella DDL guardada como comentario de la tabla temporal persistente.
+        Devuelve None si la tabla no existe o no tiene huella.
+        """
+        sql = f"""
+        SELECT DESCRIPTION FROM _V_TABLE
+        WHERE UPPER(SCHEMA) = '{self.netezza_schema.upper()}' AND UPPER(TABLENAME) = '{self.target_table.upper()}_TMP'
+        """
+        result = self.netezza_db.execute_query(sql)
+        if not result or not result[0][0]:
+            return None
+        description = str(result[0][0])
+        if not description.startswith(TMP_FINGERPRINT_PREFIX):
+            return None
+        return description[len(TMP_FINGERPRINT_PREFIX) :].strip()
+
+    def _get_netezza_distribution_columns(
+        self, schema: str, table: str
+    ) -> Optional[List[str]]:
+        """
+        Obtiene las columnas de distribución de una tabla en Netezza.
+        Lista vacía si la tabla está distribuida RANDOM; None si falla la consulta.
+        """
+        sql = f"""
+        SELECT ATTNAME
+        FROM _V_TABLE_DIST_MAP
+        WHERE UPPER(SCHEMA) = '{schema.upper()}' AND UPPER(TABLENAME) = '{table.upper()}'
+        ORDER BY DISTSEQNO;
+        """
+        result = self.netezza_db.execute_query(sql)
+        if result is None:
+            return None
+        return [row[0] for row in result]
+
     def create_tmp_table(self, script_sql_create_tmp: str) -> bool:
-        """Crea la tabla temporal en Netezza."""
+        """
+        Crea la tabla temporal en Netezza.
+        Con la opción persistent_tmp la tabla se conserva entre ejecuciones: si su huella DDL
+        coincide con la del Excel solo se vacía con TRUNCATE, evitando DROP/CREATE en el catálogo.
+        """
         tmp_table_name = f'"{self.netezza_schema}"."{self.target_table}_tmp"'
-        logger.info(f"Creando tabla temporal {tmp_table_name} en Netezza...")
-        return self.netezza_db.execute_command(script_sql_create_tmp)
+        if not self._get_etl_setting_bool("persistent_tmp"):
+            logger.info(f"Creando tabla temporal {tmp_table_name} en Netezza...")
+            return self.netezza_db.execute_command(script_sql_create_tmp)
+
+        fingerprint = self._ddl_fingerprint(script_sql_create_tmp)
+        stored_fingerprint = self._get_tmp_table_fingerprint()
+        if stored_fingerprint == fingerprint:
+            logger.info(
+                f"Tabla temporal persistente {tmp_table_name} vigente (huella {fingerprint}). Vaciándola con TRUNCATE..."
+            )
+            return self.netezza_db.execute_command(f"TRUNCATE TABLE {tmp_table_name};")
+
+        logger.info(
+            f"Huella DDL de {tmp_table_name} cambió ({stored_fingerprint} -> {fingerprint}). Reconstruyendo tabla temporal persistente..."
+        )
+        if not self.netezza_db.execute_command(script_sql_create_tmp):
+            return False
+        comment_sql = f"COMMENT ON TABLE {tmp_table_name} IS '{TMP_FINGERPRINT_PREFIX}{fingerprint}';"
+        if not self.netezza_db.execute_command(comment_sql):
+            logger.warning(
+                f"No se pudo guardar la huella DDL en {tmp_table_name}. Se reconstruirá en la próxima ejecución."
+            )
+        return True
 
     def create_external_table(self) -> bool:
         """
@@ -516,12 +1590,10 @@ class NetezzaETLLoader:
                 logger.error(f"Columna inválida en configuración Excel: {col}")
                 return False
             column_defs.append(f'"{col_name}" {col_type}')
+        if self._cdc_enabled():
+            column_defs.append(f'"{cdc.OP_CDC_COLUMN}" CHAR(1)')
         try:
-            with open(self.final_csv_file, "r", encoding="utf-8") as f:
-                first_line = f.readline()
-                separator = next(
-                    (s for s in ALTERNATIVE_SEPARATORS if s in first_line), None
-                )
+            separator = self._detect_final_csv_separator()
         except Exception as e:
             logger.error(f"No se pudo abrir el archivo CSV final: {e}")
             return False
@@ -529,6 +1601,11 @@ class NetezzaETLLoader:
             logger.error("No se pudo detectar separador válido en el archivo CSV.")
             return False
         ruta_csv_netezza = str(self.final_csv_file).replace("\\", "/")
+        # Directorio propio de la ejecución para los .nzlog/.nzbad de la carga
+        self.reject_dir = self.output_dir / f"{self.final_csv_file.stem}_rechazos"
+        self.reject_dir.mkdir(parents=True, exist_ok=True)
+        ruta_logdir_netezza = str(self.reject_dir.resolve()).replace("\\", "/")
+        max_errors = self._get_etl_setting_int("max_errors", 10)
 
         if not self._drop_external_table_if_exists():
             logger.error(
@@ -546,8 +1623,9 @@ class NetezzaETLLoader:
             REMOTESOURCE 'python'
             ENCODING 'internal'
             CTRLCHARS 'yes'
-            MAXERRORS 10
-            LOGDIR '/tmp'
+            SKIPROWS 1
+            MAXERRORS {max_errors}
+            LOGDIR '{ruta_logdir_netezza}'
         );
         """.strip()
         logger.info(
@@ -580,9 +1658,128 @@ class NetezzaETLLoader:
             return self.netezza_db.execute_command(insert_sql)
         except Exception as e:
             logger.error(
-                f"Fallo al insertar desde la tabla externa a TMP: {e}", exc_info=True
+                f"Fallo al insertar desde la tabla externa a TMP: {e}", exc_info=True
+            )
+            return False
+
+    def _get_dedup_order_clause(self) -> str:
+        """
+        Construye el ORDER BY para elegir la fila a conservar en la deduplicación de _tmp.
+        Columna 'DEDUP_ORDER' en Excel: 'X'/'DESC' conserva el valor mayor, 'ASC' el menor.
+        Sin columna marcada se conserva la última fila cargada (ROWID mayor).
+        """
+        table_config_excel = self.excel_reader.get_table_config(self.target_table) or []
+        order_parts = []
+        for col_excel in table_config_excel:
+            col_name = col_excel.get("COLUMNAS")
+            marker = str(col_excel.get("DEDUP_ORDER", "")).upper()
+            if not col_name or col_name.upper() == "UPLOAD_DATE":
+                continue
+            if marker in ["X", "YES", "TRUE", "DESC"]:
+                order_parts.append(f'"{col_name}" DESC')
+            elif marker == "ASC":
+                order_parts.append(f'"{col_name}" ASC')
+        order_parts.append("ROWID DESC")
+        return ", ".join(order_parts)
+
+    def deduplicate_tmp_table(self) -> bool:
+        """
+        Elimina de _tmp las filas repetidas por MERGE_KEY antes del MERGE, conservando
+        una sola fila por clave según DEDUP_ORDER. Guarda en self.dedup_removed cuántas eliminó.
+        """
+        _, merge_keys, _ = self._get_merge_columns()
+        if not merge_keys:
+            logger.error(
+                f"No hay MERGE_KEY para deduplicar la tabla temporal de '{self.target_table}'."
             )
             return False
+        tmp_fqn = f'"{self.netezza_schema}"."{self.target_table}_tmp"'
+        partition_by = ", ".join(merge_keys)
+        order_by = self._get_dedup_order_clause()
+        dedup_sql = f"""
+        DELETE FROM {tmp_fqn}
+        WHERE ROWID IN (
+            SELECT FILA_ID FROM (
+                SELECT ROWID AS FILA_ID,
+                       ROW_NUMBER() OVER (PARTITION BY {partition_by} ORDER BY {order_by}) AS RN
+                FROM {tmp_fqn}
+            ) DUP
+            WHERE DUP.RN > 1
+        );
+        """
+        logger.info(
+            f"Deduplicando {tmp_fqn} por MERGE_KEY ({partition_by}) ordenando por {order_by}..."
+        )
+        if not self.netezza_db.execute_command(dedup_sql):
+            return False
+        rowcount = getattr(self.netezza_db.cursor, "rowcount", -1)
+        self.dedup_removed = rowcount if rowcount and rowcount > 0 else 0
+        if self.dedup_removed:
+            logger.warning(
+                f"Se eliminaron {self.dedup_removed} filas duplicadas por MERGE_KEY de {tmp_fqn}."
+            )
+        else:
+            logger.info(f"No se encontraron duplicados por MERGE_KEY en {tmp_fqn}.")
+        return True
+
+    def collect_load_rejects(self) -> None:
+        """
+        Recoge los .nzlog/.nzbad generados por la carga de la tabla externa, los convierte en un
+        reporte CSV de rechazos (fila, columna, motivo) y deja un resumen en self.reject_summary.
+        """
+        self.load_rejects = []
+        self.reject_summary = ""
+        if not self.reject_dir or not self.reject_dir.exists():
+            return
+        table_config = self.excel_reader.get_table_config(self.target_table) or []
+        column_names = [
+            col.get("COLUMNAS")
+            for col in table_config
+            if col.get("COLUMNAS") and col.get("COLUMNAS").upper() != "UPLOAD_DATE"
+        ]
+        for log_path in sorted(self.reject_dir.glob("*.nzlog")):
+            try:
+                self.load_rejects.extend(parsear_log_rechazos(log_path, column_names))
+            except OSError as e:
+                logger.warning(f"No se pudo leer el log de rechazos '{log_path}': {e}")
+        bad_files = sorted(self.reject_dir.glob("*.nzbad"))
+        if not self.load_rejects and not bad_files:
+            logger.info("La carga desde la tabla externa no generó filas rechazadas.")
+            return
+        report_path = self.output_dir / f"{self.reject_dir.name}.csv"
+        fieldnames = [
+            "archivo_log",
+            "rechazo",
+            "fila",
+            "offset",
+            "campo",
+            "columna",
+            "tipo",
+            "motivo",
+            "texto",
+        ]
+        with open(report_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(self.load_rejects)
+        por_columna: Dict[str, int] = {}
+        for rechazo in self.load_rejects:
+            columna = rechazo["columna"] or f"campo {rechazo['campo']}"
+            por_columna[columna] = por_columna.get(columna, 0) + 1
+        detalle = ", ".join(
+            f"{columna}: {cantidad}"
+            for columna, cantidad in sorted(
+                por_columna.items(), key=lambda item: item[1], reverse=True
+            )[:5]
+        )
+        primer_motivo = self.load_rejects[0]["motivo"] if self.load_rejects else ""
+        self.reject_summary = (
+            f" Filas rechazadas en la carga: {len(self.load_rejects)} ({detalle})."
+            f" Primer motivo: {primer_motivo[:100]}. Reporte: {report_path}."
+        )
+        logger.warning(
+            f"Carga de '{self.target_table}' con {len(self.load_rejects)} filas rechazadas. Reporte: '{report_path}', archivos: {[p.name for p in bad_files]}"
+        )
 
     def _get_merge_columns(
         self,
@@ -622,8 +1819,13 @@ class NetezzaETLLoader:
             all_columns_sql,
         )
 
-    def _generate_merge_statement(self) -> Optional[str]:
-        """Genera la sentencia SQL MERGE para Netezza."""
+    def _generate_merge_statement(
+        self, source_filter: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Genera la sentencia SQL MERGE para Netezza.
+        Con source_filter el MERGE solo toma las filas de _tmp que cumplen el filtro (MERGE por bloques).
+        """
         _, merge_keys, all_cols = self._get_merge_columns()
         if merge_keys is None or all_cols is None:
             logger.error(
@@ -681,28 +1883,156 @@ class NetezzaETLLoader:
         database_name = f'"{database_name}"'
 
         merge_sql = f"MERGE INTO {database_name}.{target_fqn} TGT\n"
-        merge_sql += f"USING {database_name}.{tmp_fqn} SRC\n"
+        if source_filter:
+            merge_sql += f"USING (SELECT * FROM {database_name}.{tmp_fqn} WHERE {source_filter}) SRC\n"
+        else:
+            merge_sql += f"USING {database_name}.{tmp_fqn} SRC\n"
         merge_sql += f"ON ({on_clause})\n"
+        cdc_mode = self._cdc_enabled()
+        op_delete = f"SRC.\"{cdc.OP_CDC_COLUMN}\" = '{cdc.OP_DELETE}'"
+        if cdc_mode:
+            # Bajas capturadas por CDC: se eliminan en destino si existen
+            merge_sql += f"WHEN MATCHED AND {op_delete} THEN\n"
+            merge_sql += "  DELETE\n"
         if set_clauses:
             merge_sql += "WHEN MATCHED THEN\n"
             merge_sql += f"  UPDATE SET {', '.join(set_clauses)}\n"
-        merge_sql += "WHEN NOT MATCHED THEN\n"
+        if cdc_mode:
+            merge_sql += f"WHEN NOT MATCHED AND NOT {op_delete} THEN\n"
+        else:
+            merge_sql += "WHEN NOT MATCHED THEN\n"
         merge_sql += f"  INSERT ({', '.join(insert_cols)})\n"
         merge_sql += f"  VALUES ({', '.join(insert_values)});"
 
         logger.info(f"Sentencia MERGE generada para '{self.target_table}'.")
-        logger.debug(f"SQL MERGE:\n{merge_sql}")
-
-        # Opcional: GROOM TABLE después del MERGE
-        groom_table = f'GROOM TABLE {database_name}."{self.netezza_schema}"."{self.target_table}";'
-        self.netezza_db.execute_command(groom_table)
+        logger.debug(f"SQL MERGE:\n{acortar_sql(merge_sql)}")
         return merge_sql
 
+    def _groom_production_table(self) -> bool:
+        """GROOM TABLE de producción; no puede correr dentro de una transacción, va tras el COMMIT."""
+        config_path = Path(self.config_file)
+        parser = configparser.ConfigParser()
+        parser.read(config_path)
+        database_name = parser.get("netezza", "database", fallback="system")
+        groom_table = f'GROOM TABLE "{database_name}"."{self.netezza_schema}"."{self.target_table}";'
+        return self.netezza_db.execute_command(groom_table)
+
+    def _merge_chunk_hash_function(self) -> str:
+        return self._get_etl_setting("merge_chunk_hash_function", "HASH4").strip()
+
+    def _merge_chunk_hash_disponible(self) -> bool:
+        """
+        Verifica en el catálogo que exista la función de hash del MERGE por bloques. HASH4 no
+        es nativa de Netezza: la instala el SQL Extensions Toolkit. Un nombre calificado
+        (BASE..HASH4) se busca en el catálogo de esa base.
+        """
+        funcion = self._merge_chunk_hash_function()
+        base, _, nombre = funcion.rpartition(".")
+        base = base.rstrip(".")
+        nombre = nombre.strip('"').upper()
+        catalogo = f"{base}.._V_FUNCTION" if base else "_V_FUNCTION"
+        result = self.netezza_db.execute_query(
+            f"SELECT COUNT(*) FROM {catalogo} WHERE UPPER(FUNCTION) = '{nombre}'"
+        )
+        return bool(result and result[0][0])
+
+    def _merge_chunk_hash(self, merge_keys: List[str]) -> str:
+        """
+        Expresión no negativa por fila para repartir _tmp en bloques: hash de las MERGE_KEY.
+        A diferencia de DATASLICEID, cada bloque abarca todos los data slices y el MERGE de
+        cada bloque usa todas las SPU. La función (HASH4 del SQL Extensions Toolkit por
+        defecto) recibe texto y devuelve INTEGER; cada hash se pasa a BIGINT antes de ABS y
+        de sumar, para que no desborde.
+        """
+        funcion = self._merge_chunk_hash_function()
+        return " + ".join(
+            f"ABS(CAST({funcion}(CAST({key} AS VARCHAR(1000))) AS BIGINT))"
+            for key in merge_keys
+        )
+
+    def _execute_chunked_merge(self, chunks: int) -> bool:
+        """
+        Ejecuta el MERGE en `chunks` bloques disjuntos de _tmp por hash de las MERGE_KEY
+        (ver _merge_chunk_hash), cada uno en su propia transacción para acotar la duración de los bloqueos; el avance
+        se registra en la bitácora al confirmar cada bloque. Un bloque fallido se reintenta
+        sin repetir los bloques ya confirmados.
+        """
+        retries = max(self._get_etl_setting_int("merge_chunk_retries", 1), 0)
+        _, merge_keys, _ = self._get_merge_columns()
+        if not merge_keys:
+            logger.error(
+                f"El MERGE por bloques requiere columnas MERGE_KEY para '{self.target_table}'."
+            )
+            return False
+        chunk_hash = self._merge_chunk_hash(merge_keys)
+        # La carga a _tmp se confirma antes: cada bloque es una transacción aparte
+        if not self.netezza_db.confirmar_transaccion():
+            logger.error(
+                "No se pudo confirmar la carga de la tabla temporal antes del MERGE por bloques."
+            )
+            return False
+        self.merge_rowcount = 0
+        rowcount_conocido = True
+        for chunk in range(chunks):
+            source_filter = f"MOD({chunk_hash}, {chunks}) = {chunk}"
+            merge_sql = self._generate_merge_statement(source_filter=source_filter)
+            if not merge_sql:
+                logger.error(
+                    "Fallo al generar sentencia MERGE por bloques. Abortando operación de merge."
+                )
+                return False
+            for attempt in range(1, retries + 2):
+                logger.info(
+                    f"Ejecutando MERGE bloque {chunk + 1}/{chunks} (intento {attempt}) para tabla '{self.target_table}'."
+                )
+                with self.netezza_db.transaccion() as transaccion:
+                    merge_ok = self.netezza_db.execute_command(merge_sql)
+                    if merge_ok:
+                        chunk_rowcount = getattr(self.netezza_db.cursor, "rowcount", -1)
+                if merge_ok and transaccion.confirmada:
+                    self.merge_chunks_committed += 1
+                    acumulado = self.merge_rowcount + max(chunk_rowcount or 0, 0)
+                    self._bitacora_update(
+                        OBSERVACION=f"Paso 6: MERGE bloque {chunk + 1}/{chunks} completado. Filas del bloque: {max(chunk_rowcount or 0, 0)}, acumulado: {acumulado}.",
+                    )
+                    break
+                logger.warning(
+                    f"Falló el MERGE del bloque {chunk + 1}/{chunks} (intento {attempt}) para tabla '{self.target_table}'."
+                )
+            else:
+                logger.error(
+                    f"MERGE del bloque {chunk + 1}/{chunks} falló tras {retries + 1} intentos. Los bloques anteriores quedaron confirmados."
+                )
+                return False
+            if chunk_rowcount is None or chunk_rowcount < 0:
+                rowcount_conocido = False
+            elif chunk_rowcount > 0:
+                self.merge_rowcount += chunk_rowcount
+        if not rowcount_conocido:
+            self.merge_rowcount = -1
+        return True
+
     def execute_merge_to_production(self) -> bool:
         """Ejecuta la sentencia MERGE para actualizar la tabla de producción Netezza."""
         logger.info(
             f"Iniciando MERGE para tabla Netezza '{self.netezza_schema}.{self.target_table}' desde tabla temporal."
         )
+        chunks = self._get_etl_setting_int("merge_chunks", 1)
+        if chunks > 1 and not self._merge_chunk_hash_disponible():
+            logger.warning(
+                f"La función {self._merge_chunk_hash_function()} del MERGE por bloques no existe en Netezza (SQL Extensions Toolkit): se ejecuta un solo MERGE para '{self.target_table}'."
+            )
+            chunks = 1
+        if chunks > 1:
+            if not self._execute_chunked_merge(chunks):
+                logger.error(
+                    f"Error al ejecutar MERGE por bloques en Netezza para tabla '{self.target_table}'."
+                )
+                return False
+            logger.info(
+                f"MERGE por bloques ({chunks}) completado exitosamente para tabla '{self.target_table}'. Filas afectadas: {self.merge_rowcount}."
+            )
+            return True
         merge_sql = self._generate_merge_statement()
         if not merge_sql:
             logger.error(
@@ -716,7 +2046,7 @@ class NetezzaETLLoader:
             if self.netezza_db.cursor and hasattr(self.netezza_db.cursor, "rowcount"):
                 self.merge_rowcount = self.netezza_db.cursor.rowcount
             else:
-                self.merge_rowcount = 0
+                self.merge_rowcount = -1
             logger.info(
                 f"MERGE en Netezza completado exitosamente para tabla '{self.target_table}'."
             )
@@ -728,148 +2058,555 @@ class NetezzaETLLoader:
             )
             return False
 
-    def run(self) -> bool:
-        """Ejecuta el proceso ETL completo."""
-        tmp_table_created = False
+    def _delete_detection_hashes(
+        self, merge_keys: List[str]
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Expresiones BIGINT por clave en PostgreSQL y Netezza para la detección de bajas. Se
+        configuran con delete_hash_postgres / delete_hash_netezza; con una sola MERGE_KEY entera
+        la propia clave sirve de hash en ambos lados.
+        """
+        hash_origen = self._get_etl_setting("delete_hash_postgres")
+        hash_destino = self._get_etl_setting("delete_hash_netezza")
+        if hash_origen and hash_destino:
+            return hash_origen, hash_destino
+        if len(merge_keys) == 1:
+            clave = merge_keys[0].strip('"')
+            table_config = self.excel_reader.get_table_config(self.target_table) or []
+            tipo = next(
+                (
+                    col.get("TIPO")
+                    for col in table_config
+                    if col.get("COLUMNAS") == clave
+                ),
+                None,
+            )
+            spec = arrow_transform.parse_excel_type(tipo) if tipo else {"kind": ""}
+            if spec["kind"] == "integer" or (
+                spec["kind"] == "decimal" and spec["scale"] == 0
+            ):
+                return f"CAST({clave} AS BIGINT)", f'CAST("{clave}" AS BIGINT)'
+        logger.error(
+            f"La detección de bajas de '{self.target_table}' requiere delete_hash_postgres y delete_hash_netezza (la MERGE_KEY no es una sola columna entera)."
+        )
+        return None, None
+
+    def propagate_source_deletes(self) -> bool:
+        """
+        Elimina de la tabla de producción las claves que ya no existen en el origen. Compara
+        COUNT/SUM de un hash de la clave por buckets en ambos lados y solo trae los hashes de los
+        buckets distintos, de modo que no se transfiere el conjunto completo de claves.
+        """
+        if not self._get_etl_setting_bool("delete_detection"):
+            return True
+        if self._cdc_enabled():
+            logger.info(
+                "delete_detection no aplica con extraction = cdc: las bajas llegan por el slot."
+            )
+            return True
+        _, merge_keys, _ = self._get_merge_columns()
+        if not merge_keys:
+            logger.error(
+                f"La detección de bajas requiere columnas MERGE_KEY para '{self.target_table}'."
+            )
+            return False
+        hash_origen, hash_destino = self._delete_detection_hashes(merge_keys)
+        if not hash_origen or not hash_destino:
+            return False
+        # La query de claves debe devolver todas las claves vigentes del origen, no solo las
+        # modificadas: query_extracion solo sirve si se declara como extracción completa
+        query = self._get_etl_setting("delete_source_query")
+        if not query and not self._get_etl_setting_bool("delete_full_extract"):
+            logger.error(
+                f"La detección de bajas de '{self.target_table}' requiere delete_source_query, o delete_full_extract = true si query_extracion devuelve todas las filas del origen."
+            )
+            return False
+        # Re-cargas desde Parquet o un extracto compartido no leen config_etl_cargas
+        if self.etl_config is None and not self.get_etl_config_from_netezza():
+            logger.warning(
+                f"Sin configuración ETL de '{self.target_table}' no se puede consultar el origen: se omite la detección de bajas."
+            )
+            return True
+        query = (query or self.etl_config["query_extracion"]).strip()
+        clean_query = query[:-1] if query.endswith(";") else query
+        target_fqn = f'"{self.netezza_schema}"."{self.target_table}"'
+        postgres_db = PostgresConnection(
+            schema=self.etl_config["esquema_postgres"],
+            config_file=self.config_file,
+            use_replica=True,
+        )
+
+        def consultar_origen(sql: str) -> List[Tuple]:
+            if not postgres_db.connect():
+                raise ConnectionError("No se pudo conectar a PostgreSQL.")
+            postgres_db.cursor.execute(sql)
+            return postgres_db.cursor.fetchall()
+
+        def consultar_destino(sql: str) -> List[Tuple]:
+            # execute_query devuelve None si falla: no debe confundirse con "sin claves"
+            result = self.netezza_db.execute_query(sql)
+            if result is None:
+                raise RuntimeError("Falló la consulta de claves en Netezza.")
+            return result
+
+        detector = DetectorBajas(
+            consultar_origen=consultar_origen,
+            consultar_destino=consultar_destino,
+            from_origen=f"({clean_query}) AS SRC",
+            from_destino=target_fqn,
+            hash_origen=hash_origen,
+            hash_destino=hash_destino,
+            buckets=self._get_etl_setting_int("delete_buckets", 1024),
+            niveles=self._get_etl_setting_int("delete_levels", 2),
+        )
         try:
+            huerfanos = detector.hashes_huerfanos(detector.buckets_distintos())
+        except Exception as e:
+            logger.error(
+                f"Error al comparar las claves de origen y destino de '{self.target_table}': {e}",
+                exc_info=True,
+            )
+            return False
+        finally:
+            postgres_db.close()
+        if not huerfanos:
             logger.info(
-                f"--- INICIO DEL PROCESO ETL PARA TABLA DESTINO NETEZZA: {self.netezza_schema}.{self.target_table} ---"
+                f"No hay filas eliminadas en el origen para '{self.target_table}'."
             )
-            # Se inserta el inicio de carga en la bitácora
-            self._bitacora_insert_inicio()
+            return True
+        # Protección ante una query de claves incompleta: no se borra una fracción grande
+        max_fraction = self._get_etl_setting_float("delete_max_fraction", 0.1)
+        if (
+            detector.filas_destino
+            and len(huerfanos) > max_fraction * detector.filas_destino
+        ):
+            logger.error(
+                f"Se detectaron {len(huerfanos)} claves huérfanas de {detector.filas_destino} filas en '{self.target_table}', más que delete_max_fraction = {max_fraction:g}. No se elimina nada."
+            )
+            return False
+        if self._get_etl_setting_bool("delete_dry_run"):
             logger.info(
-                "PASO 0: Verificando/Actualizando estructura de tabla de PRODUCCIÓN Netezza..."
+                f"delete_dry_run: {len(huerfanos)} claves de '{self.target_table}' ya no existen en el origen (no se eliminan)."
             )
-            if not self.update_production_table():
-                self._bitacora_update(
-                    CARGADO=1,
-                    ESTADO="ERROR",
-                    OBSERVACION="Fallo crítico al verificar/actualizar la tabla de producción Netezza. No se puede continuar.",
-                )
+            return True
+        for delete_sql in detector.sentencias_delete(target_fqn, huerfanos):
+            if not self.netezza_db.execute_command(delete_sql):
                 logger.error(
-                    "Fallo crítico al verificar/actualizar la tabla de producción Netezza. No se puede continuar."
+                    f"Falló la eliminación de filas huérfanas en '{self.target_table}'."
                 )
                 return False
+        self.source_deletes = len(huerfanos)
+        logger.info(
+            f"Se eliminaron de '{self.target_table}' {self.source_deletes} claves que ya no existen en el origen."
+        )
+        return True
+
+    def _statistics_plan(self, filas_cambiadas: int) -> Tuple[str, List[str]]:
+        """
+        Decide qué estadísticas generar tras la carga: full (toda la tabla), columns (claves de
+        MERGE, distribución, UPLOAD_DATE y columnas marcadas con X en STATS del Excel) o none.
+        Un valor FULL, COLUMNS, NONE o AUTO en la columna STATS del Excel fija el modo de la
+        tabla; si no, se usa la opción statistics. En auto se compara la cantidad de filas
+        cambiadas con RELTUPLES de la tabla.
+        """
+        table_config = self.excel_reader.get_table_config(self.target_table) or []
+        modo = None
+        columnas_excel = []
+        for col in table_config:
+            marker = str(col.get("STATS", "") or "").strip().upper()
+            if marker in ("FULL", "COLUMNS", "NONE", "AUTO"):
+                modo = modo or marker.lower()
+            elif marker in ("X", "YES", "TRUE") and col.get("COLUMNAS"):
+                columnas_excel.append(f'"{col["COLUMNAS"]}"')
+        modo = modo or (self._get_etl_setting("statistics", "auto") or "auto").lower()
+        if modo == "auto":
+            if filas_cambiadas <= 0:
+                modo = "none"
+            else:
+                result = self.netezza_db.execute_query(f"""
+                    SELECT RELTUPLES FROM _V_TABLE
+                    WHERE SCHEMA = '{self.netezza_schema}' AND TABLENAME = '{self.target_table.upper()}'
+                    """)
+                reltuples = int(result[0][0] or 0) if result else 0
+                fraccion = filas_cambiadas / reltuples if reltuples > 0 else 1.0
+                if fraccion >= self._get_etl_setting_float(
+                    "statistics_full_fraction", 0.2
+                ):
+                    modo = "full"
+                elif fraccion >= self._get_etl_setting_float(
+                    "statistics_columns_fraction", 0.01
+                ):
+                    modo = "columns"
+                else:
+                    modo = "none"
+                logger.info(
+                    f"Estadísticas de '{self.target_table}': {filas_cambiadas} filas cambiadas sobre RELTUPLES {reltuples} ({fraccion:.2%}) → {modo}."
+                )
+        if modo != "columns":
+            return modo, []
+        _, merge_keys, _ = self._get_merge_columns()
+        distribucion = self._get_netezza_distribution_columns(
+            self.netezza_schema, self.target_table
+        )
+        columnas: List[str] = []
+        for col_sql in (
+            list(merge_keys or [])
+            + [f'"{col}"' for col in distribucion or []]
+            + ['"UPLOAD_DATE"']
+            + columnas_excel
+        ):
+            if col_sql not in columnas:
+                columnas.append(col_sql)
+        return modo, columnas
+
+    def generate_statistics(self, filas_cambiadas: int) -> bool:
+        """Genera las estadísticas del optimizador de Netezza para la tabla de producción según _statistics_plan."""
+        self.statistics_mode, columnas = self._statistics_plan(filas_cambiadas)
+        if self.statistics_mode not in ("full", "columns"):
+            self.statistics_mode = "none"
+            return True
+        config_path = Path(self.config_file)
+        parser = configparser.ConfigParser()
+        parser.read(config_path)
+        database_name = parser.get("netezza", "database", fallback="system")
+        sql = f'GENERATE STATISTICS ON "{database_name}"."{self.netezza_schema}"."{self.target_table}"'
+        if columnas:
+            sql += f" ({', '.join(columnas)})"
+        inicio = time.monotonic()
+        ok = self.netezza_db.execute_command(f"{sql};")
+        self.statistics_seconds = round(time.monotonic() - inicio, 1)
+        if ok:
             logger.info(
-                "Estructura de tabla de PRODUCCIÓN Netezza verificada/actualizada."
+                f"Estadísticas ({self.statistics_mode}) generadas para '{self.target_table}' en {self.statistics_seconds} s."
             )
-            # Se actualiza la bitácora con el estado inicial
-            self._bitacora_update(
-                ESTADO="PASO 1",
-                OBSERVACION="Paso 1: Extrayendo datos desde PostgreSQL...",
+        else:
+            logger.warning(
+                f"No se pudieron generar las estadísticas de '{self.target_table}'."
             )
-            logger.info("PASO 1: Extrayendo datos desde PostgreSQL...")
-            if not self.extract_data_from_postgres():
-                self._bitacora_update(
-                    CARGADO=1,
-                    ESTADO="ERROR",
-                    OBSERVACION="Fallo en la extracción de datos desde PostgreSQL.",
+        return ok
+
+    def _paso_script_tmp(self) -> bool:
+        self._script_sql_create_tmp = self.generate_tmp_table_script()
+        return bool(self._script_sql_create_tmp)
+
+    def _paso_tabla_tmp(self) -> bool:
+        if not self._script_sql_create_tmp:
+            return False
+        if not self.create_tmp_table(self._script_sql_create_tmp):
+            return False
+        self._tmp_table_created = True
+        return True
+
+    def _paso_carga_tmp(self) -> bool:
+        # Carga a _tmp, deduplicación, MERGE y bajas se confirman juntos
+        # (ver run): la tabla de producción no queda a medio actualizar
+        if not self.netezza_db.iniciar_transaccion():
+            return False
+        # El INSERT es una sola sentencia que retiene la conexión: el progreso muestra el
+        # tiempo transcurrido y, al terminar, las filas cargadas. Sin filas intermedias no se
+        # avisa de bloqueos, y la bitácora va por su conexión aparte (ver _conexion_bitacora)
+        with self._crear_reporte_progreso("carga", avisar_bloqueo=False) as progreso:
+            load_ok = self.load_data_from_external_to_tmp()
+            if load_ok:
+                progreso.avanzar(
+                    max(getattr(self.netezza_db.cursor, "rowcount", 0) or 0, 0)
                 )
-                logger.error("Fallo en la extracción de datos desde PostgreSQL.")
-                return False
-            # Se actualiza la bitácora con el estado de la carga
-            self._bitacora_update(
-                ESTADO="PASO 2",
-                OBSERVACION="Paso 2: Generando script SQL para tabla TEMPORAL Netezza...",
+        self.collect_load_rejects()
+        return load_ok
+
+    def _archive_format(self) -> str:
+        """Formato en que se conserva el extracto: csv, parquet o both."""
+        return (self._get_etl_setting("archive_format", "csv") or "csv").lower()
+
+    def _build_pipeline_steps(self) -> List[PasoETL]:
+        """
+        Define los pasos del proceso hasta el MERGE y sus dependencias.
+        La tabla temporal solo depende de la tabla de producción, por lo que en modo
+        paralelo su DDL se ejecuta mientras dura la extracción desde PostgreSQL.
+        """
+        if self.shared_extract:
+            paso_extraccion = PasoETL(
+                nombre="extraccion",
+                funcion=self.restage_from_shared_extract,
+                observacion=f"Paso 1: Tomando las columnas de la tabla del extracto compartido '{self.shared_extract}'...",
+                error=f"Fallo al tomar las columnas del extracto compartido '{self.shared_extract}'.",
+                estado="PASO 1",
             )
-            logger.info("PASO 2: Generando script SQL para tabla TEMPORAL Netezza...")
-            script_sql_create_tmp = self.generate_tmp_table_script()
-            if not script_sql_create_tmp:
-                self._bitacora_update(
-                    CARGADO=1,
-                    ESTADO="ERROR",
-                    OBSERVACION="Fallo al generar el script SQL para la tabla TEMPORAL Netezza.",
+        elif self.parquet_source:
+            paso_extraccion = PasoETL(
+                nombre="extraccion",
+                funcion=self.restage_from_parquet,
+                observacion=f"Paso 1: Leyendo datos archivados desde Parquet '{self.parquet_source}'...",
+                error=f"Fallo al leer los datos archivados desde Parquet '{self.parquet_source}'.",
+                estado="PASO 1",
+            )
+        else:
+            paso_extraccion = PasoETL(
+                nombre="extraccion",
+                funcion=self.extract_data_from_postgres,
+                observacion="Paso 1: Extrayendo datos desde PostgreSQL...",
+                error="Fallo en la extracción de datos desde PostgreSQL.",
+                estado="PASO 1",
+            )
+        pasos = [
+            PasoETL(
+                nombre="produccion",
+                funcion=self.update_production_table,
+                observacion="PASO 0: Verificando/Actualizando estructura de tabla de PRODUCCIÓN Netezza...",
+                error="Fallo crítico al verificar/actualizar la tabla de producción Netezza. No se puede continuar.",
+            ),
+            paso_extraccion,
+            PasoETL(
+                nombre="script_tmp",
+                funcion=self._paso_script_tmp,
+                observacion="Paso 2: Generando script SQL para tabla TEMPORAL Netezza...",
+                error="Fallo al generar el script SQL para la tabla TEMPORAL Netezza.",
+                estado="PASO 2",
+                depende_de=("produccion",),
+            ),
+            PasoETL(
+                nombre="tabla_tmp",
+                funcion=self._paso_tabla_tmp,
+                observacion="Paso 3: Creando tabla TEMPORAL en Netezza...",
+                error="Fallo al crear la tabla TEMPORAL Netezza.",
+                estado="PASO 3",
+                depende_de=("script_tmp",),
+            ),
+            PasoETL(
+                nombre="tabla_externa",
+                funcion=self.create_external_table,
+                observacion="Paso 4: Creando tabla EXTERNA en Netezza apuntando al CSV...",
+                error="Fallo al crear la tabla EXTERNA Netezza.",
+                estado="PASO 4",
+                depende_de=("extraccion",),
+            ),
+            PasoETL(
+                nombre="carga_tmp",
+                funcion=self._paso_carga_tmp,
+                observacion="Paso 5: Cargando datos desde la tabla EXTERNA hacia la tabla TEMPORAL...",
+                error="Fallo al cargar datos desde la tabla EXTERNA hacia la tabla TEMPORAL.",
+                estado="PASO 5",
+                depende_de=("tabla_tmp", "tabla_externa"),
+            ),
+        ]
+        if self._cdc_enabled() and self._archive_format() in ("parquet", "both"):
+            logger.info(
+                "archive_format parquet no aplica con extraction = cdc: el archivo de cambios no es un extracto completo."
+            )
+        elif not self.parquet_source and self._archive_format() in (
+            "parquet",
+            "both",
+        ):
+            pasos.append(
+                PasoETL(
+                    nombre="archivo_parquet",
+                    funcion=self.archive_extract_to_parquet,
+                    observacion="Archivando el extracto en Parquet...",
+                    error="Fallo al archivar el extracto en Parquet.",
+                    depende_de=("extraccion",),
                 )
-                logger.error(
-                    "Fallo al generar el script SQL para la tabla TEMPORAL Netezza."
+            )
+        paso_previo_merge = "carga_tmp"
+        if self._get_etl_setting_bool("dedup_tmp"):
+            pasos.append(
+                PasoETL(
+                    nombre="deduplicacion",
+                    funcion=self.deduplicate_tmp_table,
+                    observacion="Paso 5: Deduplicando la tabla TEMPORAL por MERGE_KEY...",
+                    error="Fallo al deduplicar la tabla TEMPORAL por MERGE_KEY.",
+                    estado="PASO 5",
+                    depende_de=("carga_tmp",),
                 )
-                return False
-            # Se actualiza la bitácora con el estado de la carga
-            self._bitacora_update(
-                ESTADO="PASO 3",
-                OBSERVACION="Paso 3: Creando tabla TEMPORAL en Netezza...",
             )
-            logger.info("PASO 3: Creando tabla TEMPORAL en Netezza...")
-            if not self.create_tmp_table(script_sql_create_tmp):
+            paso_previo_merge = "deduplicacion"
+        pasos.append(
+            PasoETL(
+                nombre="merge",
+                funcion=self.execute_merge_to_production,
+                observacion="Paso 6: Ejecutando MERGE hacia la tabla de PRODUCCIÓN Netezza...",
+                error="Fallo durante la operación MERGE a la tabla de PRODUCCIÓN Netezza.",
+                estado="PASO 6",
+                depende_de=(paso_previo_merge,),
+            )
+        )
+        return pasos
+
+    def _perfilar(self, nombre: str, funcion: Callable[[], Any]) -> Callable[[], Any]:
+        """Envuelve un paso para perfilarlo si se pidió --profile / --profile_memory."""
+        if not (self.profile or self.profile_memory):
+            return funcion
+        ruta_base = (
+            self.output_dir
+            / f"{self.target_table}_{self.upload_timestamp.strftime('%Y%m%d_%H%M%S')}_perfil_{nombre}"
+        )
+        return profiling.perfilar(
+            funcion, ruta_base, cpu=self.profile, memoria=self.profile_memory
+        )
+
+    def _deshacer_carga(self) -> str:
+        """
+        Deshace la transacción de la carga si sigue abierta (antes de registrar un error en la
+        bitácora). Devuelve el detalle para la observación: con MERGE por bloques, los bloques
+        ya confirmados no se deshacen y quedan en producción.
+        """
+        detalle = ""
+        if self.netezza_db.en_transaccion:
+            self.netezza_db.deshacer_transaccion()
+            logger.warning(
+                f"Se deshizo la transacción de la carga de '{self.target_table}': los cambios no confirmados en Netezza se descartaron."
+            )
+            detalle = " Se deshicieron los cambios no confirmados de la carga."
+        if self.merge_chunks_committed:
+            logger.warning(
+                f"Los {self.merge_chunks_committed} bloques del MERGE ya confirmados de '{self.target_table}' quedan en producción."
+            )
+            detalle += f" Los {self.merge_chunks_committed} bloques del MERGE ya confirmados quedan en producción."
+        return detalle
+
+    def _al_iniciar_paso(self, paso: PasoETL) -> None:
+        """Registra el inicio de un paso en el log y, si corresponde, en la bitácora."""
+        logger.info(paso.observacion)
+        if paso.estado:
+            self._bitacora_update(ESTADO=paso.estado, OBSERVACION=paso.observacion)
+
+    def run(self) -> bool:
+        """Ejecuta el proceso ETL completo."""
+        self._tmp_table_created = False
+        self.merge_rowcount = -1
+        self.merge_chunks_committed = 0
+        commits_inicio = self.netezza_db.commits
+        segundos_commit_inicio = self.netezza_db.segundos_commit
+        try:
+            logger.info(
+                f"--- INICIO DEL PROCESO ETL PARA TABLA DESTINO NETEZZA: {self.netezza_schema}.{self.target_table} ---"
+            )
+            # Se inserta el inicio de carga en la bitácora
+            self._bitacora_insert_inicio()
+            paralelo = self._get_etl_setting_bool("parallel_steps")
+            pasos = self._build_pipeline_steps()
+            if self.profile or self.profile_memory:
+                for paso in pasos:
+                    paso.funcion = self._perfilar(paso.nombre, paso.funcion)
+                if paralelo:
+                    # tracemalloc es global al proceso: cada paso se mide por separado
+                    logger.info(
+                        "Perfilado activo: los pasos se ejecutan en secuencia para medirlos por separado."
+                    )
+                    paralelo = False
+            if paralelo:
+                logger.info(
+                    "Ejecutando pasos independientes en paralelo (parallel_steps = true)."
+                )
+            ejecutor = EjecutorPasos(
+                pasos,
+                paralelo=paralelo,
+                max_workers=self._get_etl_setting_int("parallel_workers", 3),
+                al_iniciar=self._al_iniciar_paso,
+                cancel_event=self._cancel_event,
+            )
+            paso_fallido = ejecutor.ejecutar()
+            if paso_fallido:
+                detalle_rollback = self._deshacer_carga()
                 self._bitacora_update(
                     CARGADO=1,
                     ESTADO="ERROR",
-                    OBSERVACION="Fallo al crear la tabla TEMPORAL Netezza.",
+                    OBSERVACION=f"{paso_fallido.error}{detalle_rollback}{self.reject_summary}",
                 )
-                logger.error("Fallo al crear la tabla TEMPORAL Netezza.")
+                logger.error(paso_fallido.error)
                 return False
-            tmp_table_created = True
-            # Se actualiza la bitácora con el estado de la carga
-            self._bitacora_update(
-                ESTADO="PASO 4",
-                OBSERVACION="Paso 4: Creando tabla EXTERNA en Netezza apuntando al CSV...",
+            logger.info(
+                f"--- PROCESO ETL PARA TABLA {self.netezza_schema}.{self.target_table} COMPLETADO EXITOSAMENTE ---"
             )
-            logger.info("PASO 4: Creando tabla EXTERNA en Netezza apuntando al CSV...")
-            if not self.create_external_table():
+            # Con MERGE por bloques los bloques ya se confirmaron: lo posterior al MERGE va
+            # en una transacción nueva
+            if (
+                not self.netezza_db.en_transaccion
+                and not self.netezza_db.iniciar_transaccion()
+            ):
                 self._bitacora_update(
                     CARGADO=1,
                     ESTADO="ERROR",
-                    OBSERVACION="Fallo al crear la tabla EXTERNA Netezza.",
+                    OBSERVACION=f"No se pudo iniciar la transacción posterior al MERGE en Netezza.{self._deshacer_carga()}{self.reject_summary}",
+                    FIN_CARGA=datetime.now().replace(microsecond=0),
                 )
-                logger.error("Fallo al crear la tabla EXTERNA Netezza.")
                 return False
-            # Se actualiza la bitácora con el estado de la carga
-            self._bitacora_update(
-                ESTADO="PASO 5",
-                OBSERVACION="Paso 5: Cargando datos desde la tabla EXTERNA hacia la tabla TEMPORAL...",
-            )
-            logger.info(
-                "PASO 5: Cargando datos desde la tabla EXTERNA hacia la tabla TEMPORAL..."
-            )
-            if not self.load_data_from_external_to_tmp():
+
+            # Obtén los conteos (en paralelo):
+            conteos, errores_conteo = self._ejecutar_conteos()
+            conteo_origen = conteos["origen"]
+            conteo_archivo = conteos["archivo"]
+            conteo_destino = conteos["destino"]
+            if errores_conteo:
+                detalle_rollback = self._deshacer_carga()
                 self._bitacora_update(
-                    CARGADO=1,
+                    CARGADO=2,
                     ESTADO="ERROR",
-                    OBSERVACION="Fallo al cargar datos desde la tabla EXTERNA hacia la tabla TEMPORAL.",
+                    OBSERVACION=f"Error en la validación de los conteos. {' '.join(errores_conteo)}{detalle_rollback}{self.reject_summary}",
+                    CONTEO_BASE_ORIGEN=conteo_origen,
+                    CONTEO_ARCHIVO=conteo_archivo,
+                    CONTEO_BASE_DESTINO=conteo_destino,
+                    FIN_CARGA=datetime.now().replace(microsecond=0),
                 )
-                logger.error("Fallo al insertar desde tabla EXTERNA hacia TMP.")
                 return False
-            # Se actualiza la bitácora con el estado de la carga
-            self._bitacora_update(
-                ESTADO="PASO 6",
-                OBSERVACION="Paso 6: Ejecutando MERGE hacia la tabla de PRODUCCIÓN Netezza...",
+
+            # Validación de conteos (los duplicados eliminados de _tmp no llegan a destino)
+            conteo_destino_esperado = (
+                conteo_archivo - self.dedup_removed - self.cdc_deletes
             )
-            logger.info(
-                "PASO 6: Ejecutando MERGE hacia la tabla de PRODUCCIÓN Netezza..."
+            detalle_dedup = (
+                f" Duplicados eliminados en _tmp: {self.dedup_removed}."
+                if self.dedup_removed
+                else ""
             )
-            if not self.execute_merge_to_production():
+            if self.cdc_deletes:
+                detalle_dedup += f" Bajas CDC aplicadas: {self.cdc_deletes}."
+
+            if self.transform_rejected:
+                detalle_dedup += f" Filas descartadas por validación de tipos: {self.transform_rejected}."
+            if (
+                conteo_origen - self.transform_rejected != conteo_archivo
+                or conteo_destino_esperado != conteo_destino
+            ):
+                detalle_rollback = self._deshacer_carga()
                 self._bitacora_update(
-                    CARGADO=1,
+                    CARGADO=2,
                     ESTADO="ERROR",
-                    OBSERVACION="Fallo durante la operación MERGE a la tabla de PRODUCCIÓN Netezza.",
-                )
-                logger.error(
-                    "Fallo durante la operación MERGE a la tabla de PRODUCCIÓN Netezza."
+                    OBSERVACION=f"Error en la validación de los conteos. Origen: {conteo_origen}, Archivo: {conteo_archivo}, Destino: {conteo_destino}.{detalle_dedup}{detalle_rollback}{self.reject_summary}",
+                    CONTEO_BASE_ORIGEN=conteo_origen,
+                    CONTEO_ARCHIVO=conteo_archivo,
+                    CONTEO_BASE_DESTINO=conteo_destino,
+                    FIN_CARGA=datetime.now().replace(microsecond=0),
                 )
                 return False
-            logger.info(
-                f"--- PROCESO ETL PARA TABLA {self.netezza_schema}.{self.target_table} COMPLETADO EXITOSAMENTE ---"
-            )
 
-            # Obtén los conteos:
-            conteo_origen = self._conteo_base_origen()
-            conteo_archivo = self._conteo_archivo()
-            conteo_destino = self._conteo_base_destino()
-
-            # Validación de conteos
-            if conteo_origen != conteo_archivo or conteo_archivo != conteo_destino:
+            # Bajas del origen: solo tras una carga validada
+            if not self._perfilar("bajas", self.propagate_source_deletes)():
+                detalle_rollback = self._deshacer_carga()
                 self._bitacora_update(
-                    CARGADO=2,
+                    CARGADO=1,
                     ESTADO="ERROR",
-                    OBSERVACION=f"Error en la validación de los conteos. Origen: {conteo_origen}, Archivo: {conteo_archivo}, Destino: {conteo_destino}",
+                    OBSERVACION=f"Fallo en la detección de filas eliminadas en el origen.{detalle_dedup}{detalle_rollback}{self.reject_summary}",
                     CONTEO_BASE_ORIGEN=conteo_origen,
                     CONTEO_ARCHIVO=conteo_archivo,
                     CONTEO_BASE_DESTINO=conteo_destino,
                     FIN_CARGA=datetime.now().replace(microsecond=0),
                 )
                 return False
+            if self.source_deletes:
+                detalle_dedup += f" Filas eliminadas por no existir en el origen: {self.source_deletes}."
 
-            # Si todo OK:
+            if not self.netezza_db.confirmar_transaccion():
+                self._bitacora_update(
+                    CARGADO=1,
+                    ESTADO="ERROR",
+                    OBSERVACION=f"No se pudo confirmar la transacción de la carga en Netezza.{self._deshacer_carga()}{self.reject_summary}",
+                    FIN_CARGA=datetime.now().replace(microsecond=0),
+                )
+                return False
+            # Si todo OK: la bitácora final se escribe tras el COMMIT, fuera de la transacción
+            observacion_ok = (
+                f"El proceso de migración finalizó correctamente.{detalle_dedup}"
+            )
             self._bitacora_update(
                 FIN_CARGA=datetime.now().replace(microsecond=0),
                 CARGADO=0,
@@ -877,8 +2614,37 @@ class NetezzaETLLoader:
                 CONTEO_BASE_ORIGEN=conteo_origen,
                 CONTEO_ARCHIVO=conteo_archivo,
                 CONTEO_BASE_DESTINO=conteo_destino,
-                OBSERVACION="El proceso de migración finalizó correctamente.",
+                OBSERVACION=f"{observacion_ok}{self.reject_summary}",
             )
+            self._confirm_cdc_changes()
+
+            # GROOM y estadísticas no pueden correr dentro de una transacción: van tras el
+            # COMMIT y no invalidan una carga ya confirmada
+            self._groom_production_table()
+            # El rowcount del MERGE ya incluye las bajas CDC
+            filas_cambiadas = (
+                self.merge_rowcount
+                if self.merge_rowcount >= 0
+                else conteo_destino + self.cdc_deletes
+            ) + self.source_deletes
+            detalle_estadisticas = ""
+            bitacora_estadisticas = {}
+            if self._perfilar(
+                "estadisticas", lambda: self.generate_statistics(filas_cambiadas)
+            )():
+                if self.statistics_mode != "none":
+                    detalle_estadisticas = f" Estadísticas ({self.statistics_mode}) generadas en {self.statistics_seconds} s."
+                    if self._bitacora_tiene_columna("SEGUNDOS_ESTADISTICAS"):
+                        bitacora_estadisticas["SEGUNDOS_ESTADISTICAS"] = (
+                            self.statistics_seconds
+                        )
+            else:
+                detalle_estadisticas = " No se pudieron generar las estadísticas."
+            if detalle_estadisticas:
+                self._bitacora_update(
+                    OBSERVACION=f"{observacion_ok}{detalle_estadisticas}{self.reject_summary}",
+                    **bitacora_estadisticas,
+                )
 
             return True
         except Exception as e:
@@ -887,7 +2653,16 @@ class NetezzaETLLoader:
             )
             return False
         finally:
-            if tmp_table_created:
+            if self.netezza_db.en_transaccion:
+                self._deshacer_carga()
+            logger.info(
+                f"Commits en Netezza: {self.netezza_db.commits - commits_inicio} ({self.netezza_db.segundos_commit - segundos_commit_inicio:.3f} s)."
+            )
+            if self._tmp_table_created and self._get_etl_setting_bool("persistent_tmp"):
+                logger.info(
+                    f'Tabla temporal Netezza persistente "{self.netezza_schema}"."{self.target_table}_tmp" conservada para la próxima ejecución.'
+                )
+            elif self._tmp_table_created:
                 tmp_table_fqn = f'"{self.netezza_schema}"."{self.target_table}_tmp"'
                 drop_tmp_sql = f"DROP TABLE {tmp_table_fqn} IF EXISTS;"
                 logger.info(
@@ -899,8 +2674,10 @@ class NetezzaETLLoader:
                     logger.warning(
                         f"No se pudo eliminar la tabla temporal Netezza {tmp_table_fqn}. Podría requerir limpieza manual."
                     )
-            if self.netezza_db and self.netezza_db.conn:
+            if self._owns_netezza_db and self.netezza_db and self.netezza_db.conn:
                 self.netezza_db.close()
+            if self._owns_bitacora_db and self.bitacora_db and self.bitacora_db.conn:
+                self.bitacora_db.close()
             if self.postgres_db and self.postgres_db.conn:
                 self.postgres_db.close()
             if self.raw_pg_file and self.raw_pg_file.exists():
@@ -913,6 +2690,23 @@ class NetezzaETLLoader:
                     logger.warning(
                         f"No se pudo eliminar el archivo temporal '{self.raw_pg_file}': {e_os}"
                     )
+            if (
+                self._archive_format() == "parquet"
+                and self.parquet_file
+                and self.parquet_file.exists()
+                and self.final_csv_file
+                and self.final_csv_file.exists()
+            ):
+                # El Parquet reemplaza al CSV final como archivo del extracto
+                try:
+                    os.remove(self.final_csv_file)
+                    logger.info(
+                        f"CSV final '{self.final_csv_file}' eliminado; el extracto queda archivado en '{self.parquet_file}'."
+                    )
+                except OSError as e_os:
+                    logger.warning(
+                        f"No se pudo eliminar el CSV final '{self.final_csv_file}': {e_os}"
+                    )
             # Si quieres borrar el CSV final, descomenta aquí
             # if self.final_csv_file and self.final_csv_file.exists():
             #     try:
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Literales entre comillas simples (con '' escapadas) y tramos de comentarios y espacios
+# en blanco, que se reducen a un solo espacio
+SQL_TOKEN_PATTERN = re.compile(r"('(?:[^']|'')*')|((?:\s|--[^\n]*|/\*.*?\*/)+)", re.S)
+
+
+def normalizar_query(query: str) -> str:
+    """
+    Normaliza el texto de una query para usarlo como clave: elimina comentarios,
+    colapsa los espacios en blanco y quita el ';' final. Los literales no se modifican.
+    """
+
+    def reemplazo(match: re.Match) -> str:
+        if match.group(1):
+            return match.group(1)
+        return " "
+
+    normalizada = SQL_TOKEN_PATTERN.sub(reemplazo, query).strip()
+    while normalizada.endswith(";"):
+        normalizada = normalizada[:-1].rstrip()
+    return normalizada
+
+
+class ExtractCache:
+    """
+    Caché en disco de extracciones crudas de PostgreSQL, direccionada por contenido:
+    la clave es el hash de la query normalizada, el esquema y la marca de vigencia
+    (watermark). Cuando supera max_bytes se eliminan las entradas menos usadas.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, lock_timeout: float = 3600.0):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.lock_timeout = lock_timeout
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def key(self, query: str, schema: str, watermark: str) -> str:
+        contenido = f"{schema}\n{normalizar_query(query)}\n{watermark}"
+        return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+    def _data_path(self, key: str) -> Path:
+        return self.directory / f"{key}.tsv"
+
+    def _meta_path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    @contextmanager
+    def lock(self, key: str, poll_seconds: float = 1.0) -> Iterator[None]:
+        """
+        Bloqueo exclusivo por clave entre procesos (archivo .lock). Un segundo loader con
+        la misma clave espera a que el primero termine de extraer y reutiliza su resultado.
+        """
+        lock_path = self.directory / f"{key}.lock"
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, str(os.getpid()).encode("ascii"))
+                os.close(fd)
+                break
+            except FileExistsError:
+                try:
+                    antiguedad = time.time() - lock_path.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                if antiguedad > self.lock_timeout:
+                    logger.warning(
+                        f"Bloqueo de caché '{lock_path}' abandonado hace {antiguedad:.0f} s. Se elimina."
+                    )
+                    lock_path.unlink(missing_ok=True)
+                    continue
+                logger.info(
+                    f"Esperando a que otra carga termine la extracción en caché '{key[:12]}'..."
+                )
+                time.sleep(poll_seconds)
+        try:
+            yield
+        finally:
+            lock_path.unlink(missing_ok=True)
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Devuelve los metadatos de la entrada si existe y la marca como usada recientemente."""
+        data_path = self._data_path(key)
+        meta_path = self._meta_path(key)
+        if not data_path.exists() or not meta_path.exists():
+            return None
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Metadatos de caché ilegibles '{meta_path}': {e}")
+            return None
+        os.utime(data_path)  # LRU por fecha de modificación
+        return meta
+
+    @staticmethod
+    def _link_or_copy(source: Path, destination: Path) -> None:
+        destination.unlink(missing_ok=True)
+        try:
+            os.link(source, destination)
+        except OSError:
+            # Otro sistema de archivos o sin soporte de hardlinks
+            shutil.copyfile(source, destination)
+
+    def materialize(self, key: str, destination: Path) -> bool:
+        """Deja la extracción en caché en `destination` (hardlink si es posible, si no copia)."""
+        try:
+            self._link_or_copy(self._data_path(key), Path(destination))
+            return True
+        except OSError as e:
+            logger.warning(f"No se pudo reutilizar la entrada de caché '{key}': {e}")
+            return False
+
+    def store(self, key: str, source: Path, meta: Dict[str, Any]) -> None:
+        """Guarda una extracción en la caché y aplica la política de tamaño."""
+        data_path = self._data_path(key)
+        tmp_path = self.directory / f"{key}.tsv.tmp"
+        try:
+            self._link_or_copy(Path(source), tmp_path)
+            os.replace(tmp_path, data_path)
+            meta = dict(meta, creado=datetime.now().isoformat(timespec="seconds"))
+            self._meta_path(key).write_text(
+                json.dumps(meta, ensure_ascii=False), encoding="utf-8"
+            )
+        except OSError as e:
+            logger.warning(f"No se pudo guardar la extracción en caché '{key}': {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+        logger.info(
+            f"Extracción guardada en caché '{data_path}' ({data_path.stat().st_size} bytes)."
+        )
+        self.evict(keep=key)
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Elimina las entradas menos usadas hasta que la caché quede bajo max_bytes."""
+        entradas = []
+        for data_path in self.directory.glob("*.tsv"):
+            try:
+                stat = data_path.stat()
+            except FileNotFoundError:
+                continue
+            entradas.append((stat.st_mtime, stat.st_size, data_path))
+        total = sum(size for _, size, _ in entradas)
+        for _, size, data_path in sorted(entradas):
+            if total <= self.max_bytes:
+                break
+            if data_path.stem == keep:
+                continue
+            data_path.unlink(missing_ok=True)
+            self._meta_path(data_path.stem).unlink(missing_ok=True)
+            total -= size
+            logger.info(
+                f"Entrada de caché '{data_path.name}' eliminada por tamaño ({size} bytes)."
+            )
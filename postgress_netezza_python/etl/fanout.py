@@ -0,0 +1,171 @@
+import configparser
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .config_reader import ExcelTableConfigReader
+from .etl_loader import NetezzaETLLoader
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DestinoFanOut:
+    """Una tabla destino del fan-out y el .ini de su conexión a Netezza."""
+
+    tabla: str
+    config_file: str
+
+    @property
+    def nombre(self) -> str:
+        return f"{self.tabla} ({self.config_file})"
+
+
+def parsear_destinos(valores: Iterable[str], config_file: str) -> List[DestinoFanOut]:
+    """Destinos como `tabla` (Netezza de config_file) o `tabla:otro.ini` (otra base o servidor)."""
+    destinos = []
+    for valor in valores:
+        for parte in valor.split(","):
+            tabla, _, ini = parte.strip().partition(":")
+            if tabla:
+                destinos.append(
+                    DestinoFanOut(tabla.strip(), ini.strip() or config_file)
+                )
+    return destinos
+
+
+class ETLFanOut:
+    """
+    Extrae una sola vez la query de `tabla_origen` (config_etl_cargas) y la carga en varias
+    tablas destino a la vez. Cada destino usa su hoja del Excel (columnas por COLUMNA_ORIGEN),
+    sus tablas _ext/_tmp, su MERGE y su bitácora, con su propia conexión a Netezza. El conteo
+    de origen de todos los destinos es el de la extracción compartida.
+    """
+
+    def __init__(
+        self,
+        tabla_origen: str,
+        excel_config_path: str,
+        output_dir: str = "output",
+        config_file: str = "config.ini",
+        destinos: Optional[List[str]] = None,
+        loader_factory: Optional[
+            Callable[[DestinoFanOut, Optional[str]], NetezzaETLLoader]
+        ] = None,
+    ):
+        self.tabla_origen = tabla_origen
+        self.excel_config_path = excel_config_path
+        self.output_dir = output_dir
+        self.config_file = config_file
+        self.settings = self._load_fanout_settings(config_file)
+        self.destinos = parsear_destinos(
+            destinos or [self.settings["targets"]], config_file
+        )
+        self.loader_factory = loader_factory or self._crear_loader
+        self.excel_reader: Optional[ExcelTableConfigReader] = None
+        self.resultados: Dict[str, str] = {}
+
+    def _load_fanout_settings(self, config_file: str) -> Dict[str, object]:
+        parser = configparser.ConfigParser(interpolation=None)
+        parser.read(Path(config_file), encoding="utf-8")
+        return {
+            "max_workers": parser.getint("fanout", "max_workers", fallback=4),
+            "targets": parser.get(
+                f"fanout.{self.tabla_origen}", "targets", fallback=""
+            ),
+        }
+
+    def _crear_loader(
+        self, destino: DestinoFanOut, shared_extract: Optional[str]
+    ) -> NetezzaETLLoader:
+        # Destinos con otro .ini escriben en un subdirectorio: la misma tabla puede cargarse
+        # en dos bases con el mismo nombre de CSV
+        output_dir = Path(self.output_dir)
+        if destino.config_file != self.config_file:
+            output_dir = output_dir / Path(destino.config_file).stem
+        return NetezzaETLLoader(
+            target_table=destino.tabla,
+            excel_config_path=self.excel_config_path,
+            output_dir=str(output_dir),
+            config_file=destino.config_file,
+            excel_reader=self.excel_reader,
+            shared_extract=shared_extract,
+        )
+
+    def _cargar_destino(
+        self, destino: DestinoFanOut, extractor: NetezzaETLLoader
+    ) -> bool:
+        loader = self.loader_factory(destino, str(extractor.final_csv_file))
+        loader.known_origin_count = extractor.known_origin_count
+        loader.transform_rejected = extractor.transform_rejected
+        # Query y esquema de origen, p. ej. para la detección de bajas
+        loader.etl_config = extractor.etl_config
+        return loader.run()
+
+    def ejecutar(self) -> bool:
+        """Extrae y carga todos los destinos. Devuelve True si todos cargaron bien."""
+        if not self.destinos:
+            logger.error(
+                f"No hay destinos para el fan-out de '{self.tabla_origen}' (--destinos o targets en [fanout.{self.tabla_origen}])."
+            )
+            return False
+        nombres = [d.nombre for d in self.destinos]
+        if len(set(nombres)) != len(nombres):
+            logger.error(f"Destinos repetidos en el fan-out: {', '.join(nombres)}.")
+            return False
+        self.excel_reader = ExcelTableConfigReader(self.excel_config_path)
+        extractor = self.loader_factory(
+            DestinoFanOut(self.tabla_origen, self.config_file), None
+        )
+        logger.info(
+            f"Fan-out de '{self.tabla_origen}': una extracción para {len(self.destinos)} destinos ({', '.join(nombres)})."
+        )
+        if not extractor.extract_for_fanout():
+            logger.error(f"Falló la extracción compartida de '{self.tabla_origen}'.")
+            for destino in self.destinos:
+                self.resultados[destino.nombre] = "OMITIDA"
+            return False
+        # Nombre propio: el CSV final de un destino con el mismo nombre de tabla no lo pisa
+        extractor.final_csv_file = extractor.final_csv_file.rename(
+            extractor.final_csv_file.with_name(
+                f"{extractor.final_csv_file.stem}_compartido.csv"
+            )
+        )
+        logger.info(
+            f"Extracción compartida '{extractor.final_csv_file}': {extractor.known_origin_count} filas."
+        )
+        try:
+            with ThreadPoolExecutor(
+                max_workers=max(1, int(self.settings["max_workers"])),
+                thread_name_prefix="etl-fanout",
+            ) as pool:
+                futuros = {
+                    pool.submit(self._cargar_destino, destino, extractor): destino
+                    for destino in self.destinos
+                }
+                for futuro in as_completed(futuros):
+                    destino = futuros[futuro]
+                    try:
+                        ok = futuro.result()
+                    except Exception as e:
+                        logger.error(
+                            f"Excepción en la carga de '{destino.nombre}': {e}",
+                            exc_info=True,
+                        )
+                        ok = False
+                    self.resultados[destino.nombre] = "OK" if ok else "ERROR"
+                    logger.info(
+                        f"Fan-out '{self.tabla_origen}': '{destino.nombre}' terminó con {self.resultados[destino.nombre]}."
+                    )
+        finally:
+            # Cada destino conserva su propio CSV final (enlace o copia)
+            if extractor.final_csv_file and extractor.final_csv_file.exists():
+                os.remove(extractor.final_csv_file)
+        logger.info(
+            f"Resumen del fan-out de '{self.tabla_origen}': "
+            + ", ".join(f"{n}={e}" for n, e in self.resultados.items())
+        )
+        return all(e == "OK" for e in self.resultados.values())
@@ -0,0 +1,116 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import threading
+from typing import Optional
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Loggers de la aplicación (van a output.log); el resto (nzpy, psycopg2, ...) va a libraries.log
+LOGGERS_PROPIOS = ("etl", "__main__", "benchmarks")
+
+# Largo máximo de un texto SQL en el log
+MAX_SQL_LOG_CHARS = 2000
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_lock = threading.Lock()
+
+
+class _FiltroLoggersPropios(logging.Filter):
+    """Deja pasar solo los registros de la aplicación (propios=True) o solo los de librerías."""
+
+    def __init__(self, propios: bool):
+        super().__init__()
+        self.propios = propios
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        es_propio = any(
+            record.name == nombre or record.name.startswith(f"{nombre}.")
+            for nombre in LOGGERS_PROPIOS
+        )
+        return es_propio == self.propios
+
+
+def configurar_logging(
+    archivo: str = "output.log",
+    archivo_librerias: str = "libraries.log",
+    nivel: int = logging.INFO,
+) -> None:
+    """
+    Configuración única del logging del proceso. Los loggers solo encolan los registros
+    (QueueHandler en el logger raíz) y un hilo aparte (QueueListener) los escribe en
+    `archivo` (aplicación) y `archivo_librerias` (librerías), de modo que la E/S de archivos
+    no ocurre en los hilos de carga. Cada archivo se abre una sola vez por proceso; las
+    llamadas siguientes no hacen nada.
+    """
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is not None:
+            return
+        formatter = logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+        handlers = []
+        for ruta, propios in ((archivo, True), (archivo_librerias, False)):
+            handler = logging.FileHandler(ruta, mode="w", encoding="utf-8")
+            handler.setFormatter(formatter)
+            handler.addFilter(_FiltroLoggersPropios(propios))
+            handlers.append(handler)
+        cola: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        _queue_handler = logging.handlers.QueueHandler(cola)
+        root = logging.getLogger()
+        root.addHandler(_queue_handler)
+        root.setLevel(nivel)
+        for nombre in LOGGERS_PROPIOS:
+            logging.getLogger(nombre).setLevel(nivel)
+        _listener = logging.handlers.QueueListener(
+            cola, *handlers, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(detener_logging)
+
+
+def detener_logging() -> None:
+    """Escribe los registros pendientes y cierra los archivos de log."""
+    global _listener, _queue_handler
+    with _lock:
+        if _listener is None:
+            return
+        logging.getLogger().removeHandler(_queue_handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+        _queue_handler = None
+
+
+def acortar_sql(sql: str, maximo: int = MAX_SQL_LOG_CHARS) -> str:
+    """Texto SQL para el log, recortado a `maximo` caracteres."""
+    texto = sql.strip()
+    if len(texto) <= maximo:
+        return texto
+    return f"{texto[:maximo]}... [{len(texto) - maximo} caracteres más]"
+
+
+class AvisosLimitados:
+    """
+    Limita avisos repetitivos (p. ej. uno por fila): registra los primeros `maximo` y,
+    con `resumen`, la cantidad de avisos omitidos.
+    """
+
+    def __init__(self, logger: logging.Logger, maximo: int = 20):
+        self.logger = logger
+        self.maximo = maximo
+        self.total = 0
+
+    def warning(self, mensaje: str) -> None:
+        self.total += 1
+        if self.total <= self.maximo:
+            self.logger.warning(mensaje)
+
+    def resumen(self) -> None:
+        if self.total > self.maximo:
+            self.logger.warning(
+                f"Se omitieron {self.total - self.maximo} avisos similares ({self.total} en total)."
+            )
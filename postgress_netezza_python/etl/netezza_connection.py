@@ -1,37 +1,45 @@
 import configparser
 import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Iterator, List, Optional, Tuple
 
 import nzpy
 
-# Configuración de logging
-logging.basicConfig(
-    level=logging.INFO,
-    filename="libraries.log",
-    filemode="w",
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+from .logging_config import acortar_sql
+
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
 
-file_handler = logging.FileHandler("output.log", mode="w", encoding="utf-8")
-formatter = logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-)
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
-logger.propagate = False
+
+@dataclass
+class Transaccion:
+    """Resultado de un bloque `with NetezzaConnection.transaccion()`."""
+
+    anidada: bool = False
+    confirmada: bool = False
 
 
 class NetezzaConnection:
     """Conexión a Netezza."""
 
     def __init__(self, config_file="config.ini"):
+        self.config_file = config_file
         self.config = self._load_config(config_file)
         self.conn: Optional[nzpy.core.Connection] = None
         self.cursor: Optional[nzpy.core.Cursor] = None
+        # Id de la sesión en el servidor (CURRENT_SID), para abortarla desde otra conexión
+        self.session_id: Optional[int] = None
+        # Serializa el uso de la conexión cuando varios pasos corren en hilos
+        self._lock = threading.RLock()
+        # Transacción explícita en curso: las sentencias no se confirman una a una
+        self._en_transaccion = False
+        self._transaccion_abortada = False
+        self._nivel_transaccion = 0
+        self.commits = 0
+        self.segundos_commit = 0.0
         logger.info(f"NetezzaConnection inicializado con config '{config_file}'")
 
     def _load_config(self, config_file):
@@ -76,6 +84,7 @@ class NetezzaConnection:
                 **self.config, logLevel=logging.INFO, logOptions=nzpy.LogOptions.Inherit
             )
             self.cursor = self.conn.cursor()
+            self.session_id = self._leer_session_id()
             logger.info("Conexión a Netezza establecida exitosamente.")
             return True
         except Exception as e:
@@ -84,52 +93,234 @@ class NetezzaConnection:
             self.cursor = None
             return False
 
+    def _leer_session_id(self) -> Optional[int]:
+        try:
+            self.cursor.execute("SELECT CURRENT_SID")
+            result = self.cursor.fetchall()
+            self.conn.commit()
+            return int(result[0][0]) if result else None
+        except Exception as e:
+            logger.warning(f"No se pudo leer el id de sesión de Netezza: {e}")
+            self._rollback()
+            return None
+
+    def abortar_sesion(self) -> bool:
+        """
+        Aborta desde una conexión aparte la transacción en curso de esta sesión, incluida la
+        sentencia que retiene la conexión (p. ej. un conteo que excedió su límite). La
+        sentencia abortada falla y la transacción queda abortada hasta cerrarla.
+        """
+        if self.session_id is None:
+            logger.warning(
+                "No se conoce el id de sesión de Netezza: no se puede abortar la sentencia en curso."
+            )
+            return False
+        control = NetezzaConnection(config_file=self.config_file)
+        try:
+            return control.execute_command(
+                f"ALTER SESSION {self.session_id} ROLLBACK TRANSACTION"
+            )
+        finally:
+            control.close()
+
     def close(self) -> None:
+        if self._en_transaccion:
+            logger.warning(
+                "Se cierra la conexión a Netezza con una transacción abierta: se deshace."
+            )
+            self.deshacer_transaccion()
         if self.cursor:
             self.cursor.close()
             self.cursor = None
         if self.conn:
             self.conn.close()
             self.conn = None
+        self.session_id = None
         logger.info("Conexión a Netezza cerrada.")
 
-    def execute_query(self, query: str) -> Optional[List[Tuple]]:
-        if not self.connect():
-            return None
-        assert self.cursor is not None, "Cursor no inicializado"
-        try:
-            logger.debug(f"Netezza ejecutando consulta: {query[:200]}...")
-            self.cursor.execute(query)
-            results = self.cursor.fetchall()
-            logger.debug(
-                f"Consulta Netezza devolvió {len(results) if results else 0} filas."
-            )
-            return results
-        except Exception as e:
+    def ping(self) -> bool:
+        """
+        Verifica que la conexión abierta siga utilizable, descartando cualquier
+        transacción pendiente. Devuelve False si no hay conexión o si falló.
+        """
+        with self._lock:
+            if not self.conn or not self.cursor:
+                return False
+            try:
+                if hasattr(self.conn, "rollback"):
+                    self.conn.rollback()
+                self._terminar_transaccion()
+                self.cursor.execute("SELECT 1")
+                self.cursor.fetchall()
+                return True
+            except Exception as e:
+                logger.warning(f"La conexión a Netezza no responde: {e}")
+                return False
+
+    @property
+    def en_transaccion(self) -> bool:
+        return self._en_transaccion
+
+    def _terminar_transaccion(self) -> None:
+        self._en_transaccion = False
+        self._transaccion_abortada = False
+        self._nivel_transaccion = 0
+
+    def _commit(self) -> None:
+        if self.conn and hasattr(self.conn, "commit"):
+            inicio = time.perf_counter()
+            self.conn.commit()
+            self.segundos_commit += time.perf_counter() - inicio
+            self.commits += 1
+
+    def _rollback(self) -> None:
+        if self.conn and hasattr(self.conn, "rollback"):
+            try:
+                self.conn.rollback()
+            except Exception as e:
+                logger.warning(f"Error al deshacer la transacción en Netezza: {e}")
+
+    def _confirmar_sentencia(self) -> None:
+        """Confirma la sentencia recién ejecutada, salvo dentro de una transacción explícita."""
+        if not self._en_transaccion:
+            self._commit()
+
+    def _sentencia_fallida(self) -> None:
+        """Deshace tras un error; dentro de una transacción, la deja abortada hasta su cierre."""
+        self._rollback()
+        if self._en_transaccion and not self._transaccion_abortada:
+            self._transaccion_abortada = True
             logger.error(
-                f"Error al ejecutar consulta Netezza: {e}\nQuery: {query}",
-                exc_info=True,
+                "La transacción de Netezza se deshizo por el error anterior; las sentencias siguientes se omiten hasta cerrarla."
             )
-            return None
 
-    def execute_command(self, command: str) -> bool:
-        if not self.connect():
-            return False
-        assert self.cursor is not None, "Cursor no inicializado"
-        try:
-            logger.info(f"Netezza ejecutando comando: {command[:200]}...")
-            self.cursor.execute(command)
-            if self.conn and hasattr(self.conn, "commit"):
-                self.conn.commit()
-            logger.info(
-                f"Comando Netezza ejecutado exitosamente. Filas afectadas: {self.cursor.rowcount if self.cursor.rowcount != -1 else 'N/A'}"
-            )
-            return True
-        except Exception as e:
+    def _transaccion_invalida(self, sql: str) -> bool:
+        if self._en_transaccion and self._transaccion_abortada:
             logger.error(
-                f"Error al ejecutar comando Netezza: {e}\nComando: {command}",
-                exc_info=True,
+                f"Se omite la sentencia: la transacción de Netezza está abortada. {acortar_sql(sql, 200)}"
             )
-            if self.conn and hasattr(self.conn, "rollback"):
-                self.conn.rollback()
-            return False
+            return True
+        return False
+
+    def iniciar_transaccion(self) -> bool:
+        """
+        Abre una transacción explícita: las sentencias siguientes (de cualquier hilo que use
+        esta conexión) se confirman juntas con `confirmar_transaccion` o se descartan con
+        `deshacer_transaccion`. GROOM TABLE y GENERATE STATISTICS no pueden ejecutarse dentro.
+        """
+        with self._lock:
+            if self._en_transaccion:
+                logger.error("Ya hay una transacción abierta en la conexión a Netezza.")
+                return False
+            if not self.connect():
+                return False
+            self._en_transaccion = True
+            self._transaccion_abortada = False
+            self._nivel_transaccion = 1
+            logger.debug("Transacción de Netezza iniciada.")
+            return True
+
+    def confirmar_transaccion(self) -> bool:
+        """Confirma la transacción abierta. Devuelve False si estaba abortada o falló el COMMIT."""
+        with self._lock:
+            if not self._en_transaccion:
+                return True
+            abortada = self._transaccion_abortada
+            self._terminar_transaccion()
+            if abortada:
+                return False
+            try:
+                self._commit()
+                logger.debug("Transacción de Netezza confirmada.")
+                return True
+            except Exception as e:
+                logger.error(
+                    f"Error al confirmar la transacción en Netezza: {e}", exc_info=True
+                )
+                self._rollback()
+                return False
+
+    def deshacer_transaccion(self) -> None:
+        with self._lock:
+            if not self._en_transaccion:
+                return
+            if not self._transaccion_abortada:
+                self._rollback()
+            self._terminar_transaccion()
+            logger.debug("Transacción de Netezza deshecha.")
+
+    @contextmanager
+    def transaccion(self) -> Iterator[Transaccion]:
+        """
+        Agrupa las sentencias del bloque en una transacción: se confirma al salir si ninguna
+        falló y se deshace ante un error o una excepción. Dentro de otra transacción el
+        bloque se suma a ella y la confirmación queda a cargo de la externa.
+        """
+        with self._lock:
+            if self._en_transaccion:
+                self._nivel_transaccion += 1
+                resultado = Transaccion(anidada=True)
+            elif self.iniciar_transaccion():
+                resultado = Transaccion()
+            else:
+                raise RuntimeError("No se pudo iniciar la transacción en Netezza.")
+        try:
+            yield resultado
+        except BaseException:
+            if resultado.anidada:
+                self._nivel_transaccion -= 1
+            else:
+                self.deshacer_transaccion()
+            raise
+        if resultado.anidada:
+            self._nivel_transaccion -= 1
+            resultado.confirmada = not self._transaccion_abortada
+        else:
+            resultado.confirmada = self.confirmar_transaccion()
+
+    def execute_query(self, query: str) -> Optional[List[Tuple]]:
+        with self._lock:
+            if not self.connect():
+                return None
+            assert self.cursor is not None, "Cursor no inicializado"
+            if self._transaccion_invalida(query):
+                return None
+            try:
+                logger.debug(f"Netezza ejecutando consulta: {query[:200]}...")
+                self.cursor.execute(query)
+                results = self.cursor.fetchall()
+                logger.debug(
+                    f"Consulta Netezza devolvió {len(results) if results else 0} filas."
+                )
+                return results
+            except Exception as e:
+                logger.error(
+                    f"Error al ejecutar consulta Netezza: {e}\nQuery: {acortar_sql(query)}",
+                    exc_info=True,
+                )
+                if self._en_transaccion:
+                    self._sentencia_fallida()
+                return None
+
+    def execute_command(self, command: str) -> bool:
+        with self._lock:
+            if not self.connect():
+                return False
+            assert self.cursor is not None, "Cursor no inicializado"
+            if self._transaccion_invalida(command):
+                return False
+            try:
+                logger.info(f"Netezza ejecutando comando: {command[:200]}...")
+                self.cursor.execute(command)
+                self._confirmar_sentencia()
+                logger.info(
+                    f"Comando Netezza ejecutado exitosamente. Filas afectadas: {self.cursor.rowcount if self.cursor.rowcount != -1 else 'N/A'}"
+                )
+                return True
+            except Exception as e:
+                logger.error(
+                    f"Error al ejecutar comando Netezza: {e}\nComando: {acortar_sql(command)}",
+                    exc_info=True,
+                )
+                self._sentencia_fallida()
+                return False
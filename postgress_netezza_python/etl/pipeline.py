@@ -0,0 +1,109 @@
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PasoETL:
+    """Un paso del proceso ETL: función que devuelve True/False y sus dependencias."""
+
+    nombre: str
+    funcion: Callable[[], bool]
+    observacion: str
+    error: str
+    estado: Optional[str] = (
+        None  # ESTADO de bitácora al iniciar el paso (None: no se registra)
+    )
+    depende_de: Tuple[str, ...] = ()
+
+
+class EjecutorPasos:
+    """
+    Ejecuta una lista de PasoETL.
+    En modo secuencial respeta el orden de la lista; en modo paralelo la trata como un grafo
+    de dependencias y lanza en hilos los pasos cuyas dependencias ya terminaron. Ante el
+    primer fallo no se lanzan más pasos, se activa cancel_event y se espera a los que están en curso.
+    """
+
+    def __init__(
+        self,
+        pasos: List[PasoETL],
+        paralelo: bool = False,
+        max_workers: int = 3,
+        al_iniciar: Optional[Callable[[PasoETL], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ):
+        self.pasos = pasos
+        self.paralelo = paralelo
+        self.max_workers = max(1, max_workers)
+        self.al_iniciar = al_iniciar
+        self.cancel_event = cancel_event or threading.Event()
+
+    def ejecutar(self) -> Optional[PasoETL]:
+        """Ejecuta los pasos y devuelve el primero que falló, o None si todos terminaron bien."""
+        if self.paralelo:
+            return self._ejecutar_paralelo()
+        return self._ejecutar_secuencial()
+
+    def _ejecutar_paso(self, paso: PasoETL) -> bool:
+        try:
+            return bool(paso.funcion())
+        except Exception as e:
+            logger.error(f"Excepción en el paso '{paso.nombre}': {e}", exc_info=True)
+            return False
+
+    def _iniciar(self, paso: PasoETL) -> None:
+        if self.al_iniciar:
+            self.al_iniciar(paso)
+
+    def _ejecutar_secuencial(self) -> Optional[PasoETL]:
+        for paso in self.pasos:
+            self._iniciar(paso)
+            if not self._ejecutar_paso(paso):
+                self.cancel_event.set()
+                return paso
+        return None
+
+    def _ejecutar_paralelo(self) -> Optional[PasoETL]:
+        pendientes: Dict[str, PasoETL] = {paso.nombre: paso for paso in self.pasos}
+        completados: Set[str] = set()
+        en_curso: Dict[Future, PasoETL] = {}
+        fallido: Optional[PasoETL] = None
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="etl-paso"
+        ) as pool:
+            while pendientes or en_curso:
+                if fallido is None:
+                    listos = [
+                        paso
+                        for paso in pendientes.values()
+                        if set(paso.depende_de) <= completados
+                    ]
+                    for paso in listos:
+                        del pendientes[paso.nombre]
+                        self._iniciar(paso)
+                        logger.debug(f"Paso '{paso.nombre}' lanzado en paralelo.")
+                        en_curso[pool.submit(self._ejecutar_paso, paso)] = paso
+                if not en_curso:
+                    if fallido is None and pendientes:
+                        fallido = next(iter(pendientes.values()))
+                        logger.error(
+                            f"Dependencias no satisfechas para los pasos {list(pendientes)}."
+                        )
+                    break
+                terminados, _ = wait(list(en_curso), return_when=FIRST_COMPLETED)
+                for future in terminados:
+                    paso = en_curso.pop(future)
+                    if future.result():
+                        completados.add(paso.nombre)
+                    elif fallido is None:
+                        fallido = paso
+                        self.cancel_event.set()
+                        logger.error(
+                            f"Falló el paso '{paso.nombre}'. Cancelando pasos pendientes: {list(pendientes)}; esperando en curso: {[p.nombre for p in en_curso.values()]}."
+                        )
+        return fallido
@@ -1,35 +1,43 @@
 import configparser
 import csv
+import json
 import logging
+import threading
+import time
+import uuid
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
 import psycopg2
 
-# Configuración de logging
-logging.basicConfig(
-    level=logging.INFO,
-    filename="libraries.log",
-    filemode="w",
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+from .utils import peak_rss_mb
+
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
 
-file_handler = logging.FileHandler("output.log", mode="w", encoding="utf-8")
-formatter = logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-)
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
-logger.propagate = False
+
+# Límites del tamaño de lote adaptativo para cursores del lado del servidor
+MIN_FETCH_BATCH = 100
+MAX_FETCH_BATCH = 100000
+
+# Retraso de replicación en segundos (0 si la réplica ya aplicó todo lo recibido).
+# clock_timestamp() y no now(): dentro de la transacción de extracción now() no avanza
+REPLICA_LAG_QUERY = """
+    SELECT pg_is_in_recovery(),
+           CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE COALESCE(EXTRACT(EPOCH FROM clock_timestamp() - pg_last_xact_replay_timestamp()), 0)
+           END
+"""
+# Sesiones activas en el primario como medida de su carga
+PRIMARY_LOAD_QUERY = """
+    SELECT COUNT(*) FROM pg_stat_activity
+    WHERE state = 'active' AND backend_type = 'client backend'
+"""
 
 
 class PostgresConnection:
     """Conexión a PostgreSQL para extracción de datos."""
 
-    def __init__(self, schema: str, config_file="config.ini"):
+    def __init__(self, schema: str, config_file="config.ini", use_replica=False):
         pg_settings = self._load_pg_config(config_file)
         self.config = {
             "host": pg_settings["host"],
@@ -39,8 +47,41 @@ class PostgresConnection:
             "password": pg_settings["password"],
             "options": f"-c search_path={schema},{pg_settings.get('search_path_default', '$user,public')}",
         }
+        self.streaming = {
+            "server_side_cursor": pg_settings["server_side_cursor"],
+            "itersize": pg_settings["itersize"],
+            "fetch_memory_mb": pg_settings["fetch_memory_mb"],
+        }
+        # Lecturas (extracción y conteos) en la réplica con menor retraso, si hay réplicas
+        self.use_replica = use_replica
+        self.replicas: List[Dict[str, object]] = pg_settings["replicas"]
+        self.max_replica_lag = pg_settings["max_replica_lag_seconds"]
+        self.throttle = {
+            "lag_seconds": pg_settings["throttle_lag_seconds"],
+            "max_active_sessions": pg_settings["throttle_max_active_sessions"],
+            "check_seconds": pg_settings["throttle_check_seconds"],
+            "max_sleep_seconds": pg_settings["throttle_max_sleep_seconds"],
+        }
+        # Con cursor del cliente, execute() trae todo el resultado: la pausa entre lotes no
+        # frenaría la lectura en el origen
+        if self.throttle_activo and not self.streaming["server_side_cursor"]:
+            logger.warning(
+                "El freno de la extracción (throttle_lag_seconds/throttle_max_active_sessions) requiere cursor del lado del servidor: se usa server_side_cursor = true."
+            )
+            self.streaming["server_side_cursor"] = True
+        self.connected_host: Optional[str] = None
+        self._on_replica = False
+        self._primary_monitor: Optional[psycopg2.extensions.connection] = None
+        self._throttle_delay = 0.0
+        self._throttle_last_check = 0.0
         self.conn: Optional[psycopg2.extensions.connection] = None
         self.cursor: Optional[psycopg2.extensions.cursor] = None
+        # Si se activa, la extracción en curso se interrumpe en el siguiente lote
+        self.cancel_event: Optional[threading.Event] = None
+        # Se invoca por lote exportado con (filas, bytes) para reportar progreso
+        self.progress: Optional[Callable[[int, int], None]] = None
+        # Filas exportadas por la última llamada a execute_query_to_csv
+        self.last_row_count: Optional[int] = None
         logger.info(
             f"PostgresConnection inicializado para esquema '{schema}' y config '{config_file}'"
         )
@@ -62,6 +103,15 @@ class PostgresConnection:
             "user": "default_user",
             "password": "default_password",
             "search_path_default": "$user,public",
+            "server_side_cursor": "false",
+            "itersize": "2000",
+            "fetch_memory_mb": "64",
+            "replicas": "",
+            "max_replica_lag_seconds": "300",
+            "throttle_lag_seconds": "0",
+            "throttle_max_active_sessions": "0",
+            "throttle_check_seconds": "10",
+            "throttle_max_sleep_seconds": "30",
         }
         parser.read_dict({"postgresql": defaults})
         parser.read(config_path)
@@ -74,16 +124,114 @@ class PostgresConnection:
             "search_path_default": parser.get(
                 "postgresql", "search_path_default", fallback="$user,public"
             ),
+            "server_side_cursor": parser.getboolean("postgresql", "server_side_cursor"),
+            "itersize": parser.getint("postgresql", "itersize"),
+            "fetch_memory_mb": parser.getfloat("postgresql", "fetch_memory_mb"),
+            "replicas": self._parse_replicas(
+                parser.get("postgresql", "replicas"),
+                parser.getint("postgresql", "port"),
+            ),
+            "max_replica_lag_seconds": parser.getfloat(
+                "postgresql", "max_replica_lag_seconds"
+            ),
+            "throttle_lag_seconds": parser.getfloat(
+                "postgresql", "throttle_lag_seconds"
+            ),
+            "throttle_max_active_sessions": parser.getint(
+                "postgresql", "throttle_max_active_sessions"
+            ),
+            "throttle_check_seconds": parser.getfloat(
+                "postgresql", "throttle_check_seconds"
+            ),
+            "throttle_max_sleep_seconds": parser.getfloat(
+                "postgresql", "throttle_max_sleep_seconds"
+            ),
         }
 
+    @staticmethod
+    def _parse_replicas(value: str, default_port: int) -> List[Dict[str, object]]:
+        """Lista "host[:puerto], host[:puerto]" de réplicas de lectura."""
+        replicas = []
+        for item in value.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            host, _, port = item.partition(":")
+            replicas.append({"host": host, "port": int(port) if port else default_port})
+        return replicas
+
+    @staticmethod
+    def _replica_lag(conn: psycopg2.extensions.connection) -> Optional[float]:
+        """Segundos de retraso de la réplica; None si el servidor no está en recuperación (primario)."""
+        with conn.cursor() as cursor:
+            cursor.execute(REPLICA_LAG_QUERY)
+            in_recovery, lag = cursor.fetchone()
+        return float(lag or 0) if in_recovery else None
+
+    def _connect_least_lagged_replica(
+        self,
+    ) -> Optional[psycopg2.extensions.connection]:
+        """
+        Conecta a todas las réplicas, mide su retraso con pg_last_xact_replay_timestamp y se
+        queda con la de menor retraso dentro de max_replica_lag_seconds. None si ninguna sirve.
+        """
+        candidatas = []
+        for replica in self.replicas:
+            destino = f"{replica['host']}:{replica['port']}"
+            try:
+                conn = psycopg2.connect(**{**self.config, **replica})
+                lag = self._replica_lag(conn)
+                conn.rollback()
+            except Exception as e:
+                logger.warning(f"Réplica PostgreSQL {destino} no disponible: {e}")
+                continue
+            if lag is None:
+                logger.warning(
+                    f"El servidor {destino} no es una réplica (no está en recuperación)."
+                )
+            elif lag > self.max_replica_lag:
+                logger.warning(
+                    f"Réplica PostgreSQL {destino} descartada: retraso {lag:.1f} s > {self.max_replica_lag:g} s."
+                )
+            else:
+                logger.info(f"Réplica PostgreSQL {destino}: retraso {lag:.1f} s.")
+                candidatas.append((lag, destino, conn))
+                continue
+            conn.close()
+        if not candidatas:
+            return None
+        candidatas.sort(key=lambda candidata: candidata[0])
+        for _, _, conn in candidatas[1:]:
+            conn.close()
+        lag, destino, conn = candidatas[0]
+        self.connected_host = destino
+        logger.info(
+            f"Lecturas de PostgreSQL enrutadas a la réplica {destino} (retraso {lag:.1f} s)."
+        )
+        return conn
+
+    @property
+    def on_replica(self) -> bool:
+        """Indica si la última conexión se hizo a una réplica (y no al primario)."""
+        return self._on_replica
+
     def connect(self) -> bool:
         if self.conn and not self.conn.closed:
             return True
         try:
-            logger.info(
-                f"Conectando a PostgreSQL: host={self.config['host']}, db={self.config['database']}, user={self.config['user']}"
-            )
-            self.conn = psycopg2.connect(**self.config)
+            if self.use_replica and self.replicas:
+                self.conn = self._connect_least_lagged_replica()
+                self._on_replica = self.conn is not None
+                if self.conn is None:
+                    logger.warning(
+                        "Ninguna réplica PostgreSQL disponible dentro del retraso máximo: se lee del primario."
+                    )
+            if self.conn is None:
+                logger.info(
+                    f"Conectando a PostgreSQL: host={self.config['host']}, db={self.config['database']}, user={self.config['user']}"
+                )
+                self.conn = psycopg2.connect(**self.config)
+                self.connected_host = f"{self.config['host']}:{self.config['port']}"
             self.cursor = self.conn.cursor()
             logger.info("Conexión a PostgreSQL establecida exitosamente.")
             return True
@@ -94,6 +242,10 @@ class PostgresConnection:
             return False
 
     def close(self) -> None:
+        if self._primary_monitor is not None:
+            if not self._primary_monitor.closed:
+                self._primary_monitor.close()
+            self._primary_monitor = None
         if self.cursor:
             self.cursor.close()
             self.cursor = None
@@ -103,32 +255,265 @@ class PostgresConnection:
             self.conn = None
         logger.info("Conexión a PostgreSQL cerrada.")
 
+    def _adapt_batch_size(self, rows: List[Tuple], current: int) -> int:
+        """
+        Ajusta el tamaño del siguiente lote al ancho observado de las filas para que
+        cada lote en memoria de Python quede dentro de fetch_memory_mb.
+        """
+        sample = rows[:50]
+        # Estimación aproximada del tamaño de la fila como tupla de objetos Python
+        row_bytes = sum(
+            56
+            + 8 * len(row)
+            + sum(49 + len(str(value)) for value in row if value is not None)
+            for row in sample
+        ) / max(len(sample), 1)
+        budget_bytes = self.streaming["fetch_memory_mb"] * 1024 * 1024
+        new_size = int(budget_bytes / max(row_bytes, 1))
+        new_size = max(MIN_FETCH_BATCH, min(MAX_FETCH_BATCH, new_size))
+        if new_size != current:
+            logger.debug(
+                f"Tamaño de lote ajustado de {current} a {new_size} filas (~{row_bytes:.0f} bytes/fila)."
+            )
+        return new_size
+
+    def iter_query_batches(self, query: str) -> Iterator[Tuple[List[str], List[Tuple]]]:
+        """
+        Ejecuta la query y devuelve lotes (nombres_columnas, filas).
+        Con server_side_cursor usa un cursor con nombre (del lado del servidor), de modo que el
+        resultado no se carga completo en memoria y el tamaño de lote se adapta al ancho de fila.
+        """
+        if not self.connect():
+            raise ConnectionError("No se pudo conectar a PostgreSQL.")
+        assert self.conn is not None, "Conexión no inicializada después de conectar"
+        server_side = self.streaming["server_side_cursor"]
+        if server_side:
+            cursor = self.conn.cursor(name=f"etl_extract_{uuid.uuid4().hex[:12]}")
+            cursor.itersize = self.streaming["itersize"]
+            batch_size = self.streaming["itersize"]
+        else:
+            cursor = self.cursor
+            batch_size = 1000
+        assert cursor is not None, "Cursor no inicializado después de conectar"
+        try:
+            cursor.execute(query)
+            column_names: Optional[List[str]] = None
+            while True:
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    raise RuntimeError("Extracción cancelada por fallo en otro paso.")
+                rows = cursor.fetchmany(batch_size)
+                if column_names is None:
+                    # En cursores con nombre la descripción existe tras el primer FETCH
+                    column_names = [desc[0] for desc in cursor.description or []]
+                    if not rows:
+                        yield column_names, []
+                if not rows:
+                    break
+                yield column_names, rows
+                if server_side:
+                    batch_size = self._adapt_batch_size(rows, batch_size)
+                self._throttle_source_load()
+        finally:
+            if server_side:
+                cursor.close()
+                if self.conn and not self.conn.closed:
+                    self.conn.rollback()
+
+    def _source_overloaded(self) -> Optional[str]:
+        """Motivo por el que conviene frenar la lectura (retraso de réplica o carga del primario), o None."""
+        lag_limit = self.throttle["lag_seconds"]
+        if lag_limit > 0 and self._on_replica and self.conn is not None:
+            lag = self._replica_lag(self.conn)
+            if lag is not None and lag > lag_limit:
+                return f"retraso de réplica {lag:.1f} s > {lag_limit:g} s"
+        max_active = self.throttle["max_active_sessions"]
+        if max_active > 0:
+            if self._primary_monitor is None or self._primary_monitor.closed:
+                self._primary_monitor = psycopg2.connect(**self.config)
+                self._primary_monitor.autocommit = True
+            with self._primary_monitor.cursor() as cursor:
+                cursor.execute(PRIMARY_LOAD_QUERY)
+                active = cursor.fetchone()[0]
+            if active > max_active:
+                return f"{active} sesiones activas en el primario > {max_active}"
+        return None
+
+    @property
+    def throttle_activo(self) -> bool:
+        return (
+            self.throttle["lag_seconds"] > 0 or self.throttle["max_active_sessions"] > 0
+        )
+
+    def _throttle_source_load(self) -> None:
+        """
+        Freno adaptativo entre lotes: cada throttle_check_seconds revisa el retraso de la réplica
+        y la carga del primario; si superan los umbrales duplica la pausa entre lotes (hasta
+        throttle_max_sleep_seconds) y, si no, la reduce a la mitad.
+        """
+        if not self.throttle_activo:
+            return
+        ahora = time.monotonic()
+        if ahora - self._throttle_last_check >= self.throttle["check_seconds"]:
+            self._throttle_last_check = ahora
+            try:
+                motivo = self._source_overloaded()
+            except Exception as e:
+                logger.warning(f"No se pudo medir la carga del origen: {e}")
+                motivo = None
+            if motivo:
+                delay_anterior = self._throttle_delay
+                self._throttle_delay = min(
+                    max(self._throttle_delay * 2, 0.5),
+                    self.throttle["max_sleep_seconds"],
+                )
+                if self._throttle_delay != delay_anterior:
+                    logger.warning(
+                        f"Extracción frenada ({motivo}): pausa de {self._throttle_delay:.1f} s entre lotes."
+                    )
+            elif self._throttle_delay:
+                self._throttle_delay = (
+                    self._throttle_delay / 2 if self._throttle_delay > 0.5 else 0.0
+                )
+                if not self._throttle_delay:
+                    logger.info("Carga del origen normal: extracción sin pausas.")
+        if self._throttle_delay:
+            if self.cancel_event is not None:
+                self.cancel_event.wait(self._throttle_delay)
+            else:
+                time.sleep(self._throttle_delay)
+
+    def estimate_row_count(self, query: str) -> Optional[int]:
+        """
+        Filas estimadas por el planificador para la query (EXPLAIN, sin ejecutarla), que
+        usa las estadísticas de pg_class.reltuples. Devuelve None si no se puede estimar.
+        """
+        try:
+            if not self.connect():
+                return None
+            clean_query = query.strip().rstrip(";")
+            self.cursor.execute(f"EXPLAIN (FORMAT JSON) {clean_query}")
+            plan = self.cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"])
+        except Exception as e:
+            logger.warning(f"No se pudo estimar la cantidad de filas de la query: {e}")
+            if self.conn and not self.conn.closed:
+                self.conn.rollback()
+            return None
+
+    def ensure_logical_slot(self, slot: str, plugin: str = "test_decoding") -> bool:
+        """Crea el slot de replicación lógica si no existe. Devuelve True si el slot quedó disponible."""
+        try:
+            if not self.connect():
+                return False
+            self.cursor.execute(
+                "SELECT plugin FROM pg_replication_slots WHERE slot_name = %s", (slot,)
+            )
+            row = self.cursor.fetchone()
+            if row:
+                if row[0] != plugin:
+                    logger.error(
+                        f"El slot '{slot}' usa el plugin '{row[0]}'; se esperaba '{plugin}'."
+                    )
+                    return False
+                return True
+            self.cursor.execute(
+                "SELECT pg_create_logical_replication_slot(%s, %s)", (slot, plugin)
+            )
+            self.conn.commit()
+            logger.info(f"Slot de replicación lógica '{slot}' ({plugin}) creado.")
+            return True
+        except Exception as e:
+            logger.error(
+                f"Error al verificar/crear el slot de replicación '{slot}': {e}",
+                exc_info=True,
+            )
+            if self.conn and not self.conn.closed:
+                self.conn.rollback()
+            return False
+
+    def peek_logical_changes(
+        self, slot: str, max_changes: int
+    ) -> Tuple[List[str], Optional[str]]:
+        """
+        Lee sin consumir hasta `max_changes` cambios del slot (test_decoding), completando la
+        última transacción. Devuelve las líneas decodificadas y el LSN del último cambio leído,
+        que se confirma con advance_logical_slot una vez aplicados en destino.
+        """
+        if not self.connect():
+            raise ConnectionError("No se pudo conectar a PostgreSQL.")
+        try:
+            self.cursor.execute(
+                """
+                SELECT lsn::text, data FROM pg_logical_slot_peek_changes(
+                    %s, NULL, %s, 'include-xids', '0', 'skip-empty-xacts', '1'
+                )
+                """,
+                (slot, max_changes if max_changes > 0 else None),
+            )
+            rows = self.cursor.fetchall()
+        finally:
+            # peek no deja la transacción abierta ni retiene el slot
+            if self.conn and not self.conn.closed:
+                self.conn.rollback()
+        ultimo_lsn = rows[-1][0] if rows else None
+        return [data for _, data in rows], ultimo_lsn
+
+    def advance_logical_slot(self, slot: str, lsn: str) -> bool:
+        """Confirma en el slot los cambios hasta `lsn`: el servidor puede liberar su WAL."""
+        try:
+            if not self.connect():
+                return False
+            self.cursor.execute(
+                "SELECT pg_replication_slot_advance(%s, %s::pg_lsn)", (slot, lsn)
+            )
+            self.conn.commit()
+            logger.info(f"Slot de replicación '{slot}' avanzado hasta LSN {lsn}.")
+            return True
+        except Exception as e:
+            logger.warning(
+                f"No se pudo avanzar el slot de replicación '{slot}' hasta {lsn}: {e}"
+            )
+            if self.conn and not self.conn.closed:
+                self.conn.rollback()
+            return False
+
     def execute_query_to_csv(
         self, query: str, output_file: str, separator: str
     ) -> bool:
-        if not self.connect():
-            return False
-        assert self.cursor is not None, "Cursor no inicializado después de conectar"
+        self.last_row_count = None
         try:
             logger.info(
                 f"Ejecutando query en PostgreSQL (primeros 100 chars): {query[:100]}..."
             )
-            self.cursor.execute(query)
-            column_names = [desc[0] for desc in self.cursor.description or []]
+            if self.streaming["server_side_cursor"]:
+                logger.info(
+                    f"Extracción en streaming con cursor del lado del servidor (itersize={self.streaming['itersize']}, presupuesto={self.streaming['fetch_memory_mb']} MB por lote)."
+                )
             Path(output_file).parent.mkdir(parents=True, exist_ok=True)
             with open(output_file, "w", newline="", encoding="utf-8") as f:
                 writer = csv.writer(f, delimiter=separator)
-                writer.writerow(column_names)
                 fetch_count = 0
-                while True:
-                    rows = self.cursor.fetchmany(1000)
-                    if not rows:
-                        break
+                bytes_escritos = 0
+                header_written = False
+                for column_names, rows in self.iter_query_batches(query):
+                    if not header_written:
+                        writer.writerow(column_names)
+                        header_written = True
                     writer.writerows(rows)
                     fetch_count += len(rows)
+                    if self.progress is not None:
+                        posicion = f.tell()
+                        self.progress(len(rows), posicion - bytes_escritos)
+                        bytes_escritos = posicion
+                self.last_row_count = fetch_count
                 logger.info(
                     f"Datos de PostgreSQL ({fetch_count} filas) exportados a '{output_file}' con separador '{separator}'."
                 )
+            rss = peak_rss_mb()
+            if rss is not None:
+                logger.info(f"RSS pico del proceso tras la extracción: {rss:.1f} MB.")
             return True
         except Exception as e:
             logger.error(
@@ -0,0 +1,80 @@
+import cProfile
+import functools
+import io
+import logging
+import pstats
+import tracemalloc
+from pathlib import Path
+from typing import Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+# Cantidad de funciones / líneas incluidas en los reportes de texto
+TOP_ENTRADAS = 30
+
+T = TypeVar("T")
+
+
+def _reporte_cpu(profiler: cProfile.Profile, ruta_base: Path) -> None:
+    profiler.dump_stats(f"{ruta_base}.pstats")
+    salida = io.StringIO()
+    stats = pstats.Stats(profiler, stream=salida)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_ENTRADAS)
+    Path(f"{ruta_base}_cpu.txt").write_text(salida.getvalue(), encoding="utf-8")
+
+
+def _reporte_memoria(
+    snapshot: tracemalloc.Snapshot, pico: int, ruta_base: Path
+) -> None:
+    lineas = [f"Pico de memoria trazada: {pico / 1024 / 1024:.1f} MB", ""]
+    for stat in snapshot.statistics("lineno")[:TOP_ENTRADAS]:
+        lineas.append(str(stat))
+    Path(f"{ruta_base}_memoria.txt").write_text(
+        "\n".join(lineas) + "\n", encoding="utf-8"
+    )
+
+
+def perfilar(
+    funcion: Callable[[], T],
+    ruta_base: Path,
+    cpu: bool = True,
+    memoria: bool = False,
+) -> Callable[[], T]:
+    """
+    Envuelve una función sin argumentos (un paso del proceso) para perfilarla con cProfile
+    y/o tracemalloc. Al terminar escribe `<ruta_base>.pstats` y `<ruta_base>_cpu.txt`
+    (funciones con mayor tiempo acumulado) y `<ruta_base>_memoria.txt` (líneas que más
+    memoria asignaron y el pico). Solo se usa si se pide el perfilado: sin él, los pasos
+    se ejecutan sin envoltorio.
+    """
+
+    @functools.wraps(funcion)
+    def envoltorio() -> T:
+        profiler = cProfile.Profile() if cpu else None
+        if memoria:
+            tracemalloc.start()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            return funcion()
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            if memoria:
+                # Antes de generar los reportes, que también asignan memoria
+                _, pico = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot()
+            try:
+                ruta_base.parent.mkdir(parents=True, exist_ok=True)
+                if profiler is not None:
+                    _reporte_cpu(profiler, ruta_base)
+                if memoria:
+                    _reporte_memoria(snapshot, pico, ruta_base)
+                logger.info(f"Perfil guardado en '{ruta_base}*'.")
+            except OSError as e:
+                logger.warning(f"No se pudo guardar el perfil '{ruta_base}': {e}")
+            finally:
+                if memoria:
+                    tracemalloc.stop()
+
+    return envoltorio
@@ -0,0 +1,159 @@
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def formatear_duracion(segundos: float) -> str:
+    segundos = int(max(segundos, 0))
+    return f"{segundos // 3600:02d}:{segundos % 3600 // 60:02d}:{segundos % 60:02d}"
+
+
+class ReporteProgreso:
+    """
+    Progreso de una etapa larga (extracción, conversión, carga). Los contadores se
+    actualizan con `avanzar` desde el bucle de trabajo y un hilo aparte emite un evento
+    cada `intervalo` segundos: al log, a un archivo de texto para el node_exporter de
+    Prometheus y, opcionalmente, a la bitácora mediante `al_reportar`. Como el hilo emite
+    aunque no haya avance, una etapa detenida se distingue de una lenta.
+    """
+
+    def __init__(
+        self,
+        tabla: str,
+        etapa: str,
+        total_estimado: Optional[int] = None,
+        intervalo: float = 30.0,
+        segundos_sin_avance: float = 600.0,
+        textfile_dir: Optional[str] = None,
+        al_reportar: Optional[Callable[[str], None]] = None,
+    ):
+        self.tabla = tabla
+        self.etapa = etapa
+        self.total_estimado = total_estimado
+        self.intervalo = intervalo
+        self.segundos_sin_avance = segundos_sin_avance
+        self.textfile = (
+            Path(textfile_dir) / f"etl_progreso_{tabla}.prom" if textfile_dir else None
+        )
+        self.al_reportar = al_reportar
+        self.filas = 0
+        self.bytes = 0
+        self.inicio = time.monotonic()
+        self._ultimo_avance = self.inicio
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def avanzar(self, filas: int, bytes_procesados: int = 0) -> None:
+        with self._lock:
+            self.filas += filas
+            self.bytes += bytes_procesados
+            if filas:
+                self._ultimo_avance = time.monotonic()
+
+    def iniciar(self) -> "ReporteProgreso":
+        if self.intervalo > 0:
+            self._hilo = threading.Thread(
+                target=self._emitir_periodicamente,
+                name=f"progreso-{self.etapa}",
+                daemon=True,
+            )
+            self._hilo.start()
+        return self
+
+    def finalizar(self) -> None:
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+        self.emitir(final=True)
+
+    def __enter__(self) -> "ReporteProgreso":
+        return self.iniciar()
+
+    def __exit__(self, *exc_info) -> None:
+        self.finalizar()
+
+    def _emitir_periodicamente(self) -> None:
+        while not self._detener.wait(self.intervalo):
+            self.emitir()
+
+    def emitir(self, final: bool = False) -> None:
+        """Emite un evento de progreso con filas, bytes, filas/s y tiempo restante estimado."""
+        with self._lock:
+            filas, bytes_procesados = self.filas, self.bytes
+            ultimo_avance = self._ultimo_avance
+        ahora = time.monotonic()
+        transcurrido = ahora - self.inicio
+        filas_por_segundo = filas / transcurrido if transcurrido > 0 else 0.0
+        partes = [
+            f"{filas:,} filas",
+            f"{bytes_procesados / 1024 / 1024:,.1f} MB",
+            f"{filas_por_segundo:,.0f} filas/s",
+            f"transcurrido {formatear_duracion(transcurrido)}",
+        ]
+        eta = None
+        if self.total_estimado and not final:
+            porcentaje = min(filas / self.total_estimado, 1.0) * 100
+            partes.append(f"{porcentaje:.0f}% de ~{self.total_estimado:,}")
+            if filas_por_segundo > 0 and filas < self.total_estimado:
+                eta = (self.total_estimado - filas) / filas_por_segundo
+                partes.append(f"ETA {formatear_duracion(eta)}")
+        estado = "terminado" if final else "en curso"
+        mensaje = (
+            f"Progreso {self.etapa} '{self.tabla}' ({estado}): {', '.join(partes)}."
+        )
+        sin_avance = ahora - ultimo_avance
+        if (
+            not final
+            and self.segundos_sin_avance
+            and sin_avance > self.segundos_sin_avance
+        ):
+            logger.warning(
+                f"{mensaje} Sin filas nuevas desde hace {formatear_duracion(sin_avance)}: posible bloqueo."
+            )
+        else:
+            logger.info(mensaje)
+        self._escribir_textfile(filas, bytes_procesados, filas_por_segundo, eta)
+        if self.al_reportar:
+            try:
+                self.al_reportar(mensaje)
+            except Exception as e:
+                logger.warning(f"No se pudo registrar el progreso en la bitácora: {e}")
+
+    def _escribir_textfile(
+        self,
+        filas: int,
+        bytes_procesados: int,
+        filas_por_segundo: float,
+        eta: Optional[float],
+    ) -> None:
+        if not self.textfile:
+            return
+        etiquetas = f'tabla="{self.tabla}",etapa="{self.etapa}"'
+        metricas = [
+            ("etl_progreso_filas", "gauge", filas),
+            ("etl_progreso_bytes", "gauge", bytes_procesados),
+            ("etl_progreso_filas_por_segundo", "gauge", round(filas_por_segundo, 3)),
+            ("etl_progreso_filas_estimadas", "gauge", self.total_estimado or 0),
+            ("etl_progreso_eta_segundos", "gauge", round(eta, 1) if eta else 0),
+            ("etl_progreso_actualizado_timestamp_segundos", "gauge", int(time.time())),
+        ]
+        lineas = []
+        for nombre, tipo, valor in metricas:
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            lineas.append(f"{nombre}{{{etiquetas}}} {valor}")
+        try:
+            self.textfile.parent.mkdir(parents=True, exist_ok=True)
+            # Escritura atómica: el node_exporter nunca lee un archivo a medias
+            tmp_path = self.textfile.with_suffix(".prom.tmp")
+            tmp_path.write_text("\n".join(lineas) + "\n", encoding="utf-8")
+            os.replace(tmp_path, self.textfile)
+        except OSError as e:
+            logger.warning(
+                f"No se pudo escribir el archivo de métricas '{self.textfile}': {e}"
+            )
@@ -0,0 +1,318 @@
+import configparser
+import logging
+import statistics
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .netezza_connection import NetezzaConnection
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EjecucionCarga:
+    """Una carga registrada en la bitácora."""
+
+    tabla: str
+    inicio: datetime
+    fin: Optional[datetime]
+    estado: str
+    filas: Optional[int] = None
+
+    @property
+    def segundos(self) -> Optional[float]:
+        if self.fin is None:
+            return None
+        return max((self.fin - self.inicio).total_seconds(), 0.0)
+
+    @property
+    def filas_s(self) -> Optional[float]:
+        if not self.filas or not self.segundos:
+            return None
+        return self.filas / self.segundos
+
+
+@dataclass
+class ResumenTabla:
+    """Percentiles de duración y filas/s de las cargas OK de una tabla."""
+
+    tabla: str
+    cargas: int
+    fallidas: int
+    p50: float
+    p90: float
+    p95: float
+    maximo: float
+    filas_s_p50: Optional[float]
+    # Variación (%) de la mediana de las últimas cargas respecto de las anteriores
+    tendencia: Optional[float]
+
+
+@dataclass
+class Regresion:
+    """Carga más lenta que su línea base (mediana de las cargas OK anteriores)."""
+
+    tabla: str
+    inicio: datetime
+    segundos: float
+    linea_base: float
+    factor: float
+    # "volumen" si las filas crecieron en la misma proporción, "rendimiento" si no
+    causa: str
+
+
+def _percentil(valores: List[float], percentil: int) -> float:
+    if len(valores) == 1:
+        return valores[0]
+    return statistics.quantiles(valores, n=100, method="inclusive")[percentil - 1]
+
+
+class ETLReport:
+    """
+    Analiza el historial de DWH_BITACORA_CARGA_MIGRACION (requiere la columna NOMBRE_TABLA):
+    percentiles y tendencia de duración y filas/s por tabla, cargas más lentas que una línea
+    base móvil y tablas que dominan la ventana de carga más reciente.
+    """
+
+    def __init__(
+        self,
+        config_file: str = "config.ini",
+        tablas: Optional[List[str]] = None,
+        history_days: Optional[int] = None,
+        regression_factor: Optional[float] = None,
+        netezza_db: Optional[NetezzaConnection] = None,
+    ):
+        self.config_file = config_file
+        self.tablas_filtro = set(tablas) if tablas else None
+        self.netezza_schema = "ADMIN"
+        self.settings = self._load_report_settings(config_file)
+        if history_days is not None:
+            self.settings["history_days"] = history_days
+        if regression_factor is not None:
+            self.settings["regression_factor"] = regression_factor
+        self._owns_netezza_db = netezza_db is None
+        self.netezza_db = netezza_db or NetezzaConnection(config_file=config_file)
+        self.ejecuciones: List[EjecucionCarga] = []
+
+    def _load_report_settings(self, config_file: str) -> Dict[str, float]:
+        parser = configparser.ConfigParser(interpolation=None)
+        parser.read(Path(config_file), encoding="utf-8")
+        return {
+            "history_days": parser.getint("report", "history_days", fallback=30),
+            "baseline_runs": parser.getint("report", "baseline_runs", fallback=10),
+            "min_baseline_runs": parser.getint(
+                "report", "min_baseline_runs", fallback=3
+            ),
+            "regression_factor": parser.getfloat(
+                "report", "regression_factor", fallback=1.5
+            ),
+            "window_hours": parser.getfloat("report", "window_hours", fallback=24.0),
+            "top_tables": parser.getint("report", "top_tables", fallback=10),
+        }
+
+    def cargar_historial(self) -> bool:
+        """Lee las cargas de los últimos history_days días, en orden cronológico."""
+        try:
+            result = self.netezza_db.execute_query(f"""
+                SELECT NOMBRE_TABLA, INICIO_CARGA, FIN_CARGA, ESTADO,
+                       COALESCE(CONTEO_BASE_ORIGEN, CONTEO_ARCHIVO)
+                FROM {self.netezza_schema}.DWH_BITACORA_CARGA_MIGRACION
+                WHERE NOMBRE_TABLA IS NOT NULL
+                AND INICIO_CARGA >= NOW() - INTERVAL '{int(self.settings["history_days"])} days'
+                ORDER BY INICIO_CARGA
+                """)
+        finally:
+            if self._owns_netezza_db:
+                self.netezza_db.close()
+        if result is None:
+            logger.error(
+                "No se pudo leer el historial de la bitácora (¿falta la columna NOMBRE_TABLA?)."
+            )
+            return False
+        self.ejecuciones = [
+            EjecucionCarga(
+                tabla=nombre,
+                inicio=inicio,
+                fin=fin,
+                estado=(estado or "").strip(),
+                filas=int(filas) if filas is not None else None,
+            )
+            for nombre, inicio, fin, estado, filas in result
+            if not self.tablas_filtro or nombre in self.tablas_filtro
+        ]
+        logger.info(
+            f"Historial de la bitácora: {len(self.ejecuciones)} cargas en {int(self.settings['history_days'])} días."
+        )
+        return True
+
+    def _cargas_ok(self) -> Dict[str, List[EjecucionCarga]]:
+        por_tabla: Dict[str, List[EjecucionCarga]] = {}
+        for ejecucion in self.ejecuciones:
+            if ejecucion.estado == "OK" and ejecucion.segundos is not None:
+                por_tabla.setdefault(ejecucion.tabla, []).append(ejecucion)
+        return por_tabla
+
+    def resumen_por_tabla(self) -> List[ResumenTabla]:
+        """Percentiles por tabla, de la más lenta (p95) a la más rápida."""
+        fallidas: Dict[str, int] = {}
+        for ejecucion in self.ejecuciones:
+            if ejecucion.estado == "ERROR":
+                fallidas[ejecucion.tabla] = fallidas.get(ejecucion.tabla, 0) + 1
+        ventana = int(self.settings["baseline_runs"])
+        resumenes = []
+        for tabla, cargas in self._cargas_ok().items():
+            duraciones = [c.segundos for c in cargas]
+            filas_s = [c.filas_s for c in cargas if c.filas_s is not None]
+            tendencia = None
+            mitad = min(ventana, len(duraciones) // 2)
+            if mitad >= self.settings["min_baseline_runs"]:
+                base = statistics.median(duraciones[-2 * mitad : -mitad])
+                if base > 0:
+                    tendencia = (
+                        statistics.median(duraciones[-mitad:]) / base - 1
+                    ) * 100
+            resumenes.append(
+                ResumenTabla(
+                    tabla=tabla,
+                    cargas=len(cargas),
+                    fallidas=fallidas.get(tabla, 0),
+                    p50=_percentil(duraciones, 50),
+                    p90=_percentil(duraciones, 90),
+                    p95=_percentil(duraciones, 95),
+                    maximo=max(duraciones),
+                    filas_s_p50=statistics.median(filas_s) if filas_s else None,
+                    tendencia=tendencia,
+                )
+            )
+        return sorted(resumenes, key=lambda r: (-r.p95, r.tabla))
+
+    def regresiones(self) -> List[Regresion]:
+        """
+        Cargas OK cuya duración supera regression_factor veces la mediana de las
+        baseline_runs cargas OK anteriores de la misma tabla (con al menos
+        min_baseline_runs cargas previas). Las más recientes primero.
+        """
+        factor_limite = self.settings["regression_factor"]
+        ventana = int(self.settings["baseline_runs"])
+        minimo = int(self.settings["min_baseline_runs"])
+        encontradas = []
+        for tabla, cargas in self._cargas_ok().items():
+            for i in range(minimo, len(cargas)):
+                previas = cargas[max(0, i - ventana) : i]
+                linea_base = statistics.median(c.segundos for c in previas)
+                carga = cargas[i]
+                if linea_base <= 0 or carga.segundos <= factor_limite * linea_base:
+                    continue
+                filas_previas = [c.filas for c in previas if c.filas]
+                causa = "rendimiento"
+                if carga.filas and filas_previas:
+                    crecimiento = carga.filas / statistics.median(filas_previas)
+                    if crecimiento >= factor_limite:
+                        causa = "volumen"
+                encontradas.append(
+                    Regresion(
+                        tabla=tabla,
+                        inicio=carga.inicio,
+                        segundos=carga.segundos,
+                        linea_base=linea_base,
+                        factor=carga.segundos / linea_base,
+                        causa=causa,
+                    )
+                )
+        return sorted(encontradas, key=lambda r: r.inicio, reverse=True)
+
+    def _inicio_ventana(self) -> Optional[datetime]:
+        inicios = [e.inicio for e in self.ejecuciones if e.segundos is not None]
+        if not inicios:
+            return None
+        return max(inicios) - timedelta(hours=self.settings["window_hours"])
+
+    def dominantes_ventana(
+        self,
+    ) -> Tuple[
+        Optional[datetime], Optional[datetime], List[Tuple[str, float, datetime]]
+    ]:
+        """
+        Ventana de carga más reciente: cargas iniciadas en las window_hours horas previas al
+        último inicio. Devuelve inicio y fin de la ventana y, por tabla, los segundos de
+        carga sumados y la hora en que terminó su última carga (de mayor a menor duración).
+        """
+        desde = self._inicio_ventana()
+        if desde is None:
+            return None, None, []
+        en_ventana = [
+            e for e in self.ejecuciones if e.segundos is not None and e.inicio >= desde
+        ]
+        inicio = min(e.inicio for e in en_ventana)
+        fin = max(e.fin for e in en_ventana)
+        por_tabla: Dict[str, Tuple[float, datetime]] = {}
+        for e in en_ventana:
+            segundos, termino = por_tabla.get(e.tabla, (0.0, e.fin))
+            por_tabla[e.tabla] = (segundos + e.segundos, max(termino, e.fin))
+        dominantes = sorted(
+            ((tabla, s, t) for tabla, (s, t) in por_tabla.items()),
+            key=lambda d: (-d[1], d[0]),
+        )
+        return inicio, fin, dominantes
+
+    def imprimir(self) -> List[Regresion]:
+        """
+        Imprime el reporte completo y devuelve las regresiones de la ventana de carga más
+        reciente (las que además se registran como advertencia en el log).
+        """
+        resumenes = self.resumen_por_tabla()
+        print(
+            f"\nCargas por tabla (últimos {int(self.settings['history_days'])} días, segundos)"
+        )
+        print(
+            f"{'tabla':<32}{'cargas':>8}{'errores':>9}{'p50':>10}{'p90':>10}{'p95':>10}{'máx':>10}{'filas/s':>12}{'tendencia':>11}"
+        )
+        for r in resumenes:
+            filas_s = f"{r.filas_s_p50:,.0f}" if r.filas_s_p50 is not None else "-"
+            tendencia = f"{r.tendencia:+.0f}%" if r.tendencia is not None else "-"
+            print(
+                f"{r.tabla:<32}{r.cargas:>8}{r.fallidas:>9}{r.p50:>10.0f}{r.p90:>10.0f}"
+                f"{r.p95:>10.0f}{r.maximo:>10.0f}{filas_s:>12}{tendencia:>11}"
+            )
+
+        regresiones = self.regresiones()
+        print(
+            f"\nCargas más lentas que {self.settings['regression_factor']:g}x su línea base "
+            f"(mediana de las {int(self.settings['baseline_runs'])} cargas anteriores): {len(regresiones)}"
+        )
+        desde = self._inicio_ventana()
+        recientes = [r for r in regresiones if desde is not None and r.inicio >= desde]
+        for r in regresiones:
+            marca = "*" if r in recientes else " "
+            print(
+                f"{marca} {r.inicio:%Y-%m-%d %H:%M}  {r.tabla:<32}{r.segundos:>8.0f} s vs {r.linea_base:.0f} s "
+                f"({r.factor:.1f}x, {r.causa})"
+            )
+        if recientes:
+            print("  (* en la ventana de carga más reciente)")
+
+        inicio, fin, dominantes = self.dominantes_ventana()
+        if inicio is not None:
+            duracion = max((fin - inicio).total_seconds(), 1.0)
+            total = sum(s for _, s, _ in dominantes) or 1.0
+            print(
+                f"\nVentana de carga {inicio:%Y-%m-%d %H:%M} - {fin:%Y-%m-%d %H:%M} "
+                f"({duracion / 60:.0f} min, {len(dominantes)} tablas)"
+            )
+            print(
+                f"{'tabla':<32}{'segundos':>10}{'% carga':>9}{'% ventana':>11}{'termina':>10}"
+            )
+            for tabla, segundos, termino in dominantes[
+                : int(self.settings["top_tables"])
+            ]:
+                print(
+                    f"{tabla:<32}{segundos:>10.0f}{segundos / total * 100:>8.0f}%"
+                    f"{segundos / duracion * 100:>10.0f}%{termino.strftime('%H:%M'):>10}"
+                )
+        for r in recientes:
+            logger.warning(
+                f"Regresión de '{r.tabla}' en la carga de {r.inicio}: {r.segundos:.0f} s vs línea base {r.linea_base:.0f} s ({r.factor:.1f}x, {r.causa})."
+            )
+        return recientes
@@ -0,0 +1,297 @@
+import configparser
+import logging
+import os
+import statistics
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set
+
+from .etl_loader import NetezzaETLLoader
+from .netezza_connection import NetezzaConnection
+
+logger = logging.getLogger(__name__)
+
+# Duración asumida (segundos) para tablas sin historial cuando ninguna tiene historial
+DEFAULT_DURATION_SECONDS = 60.0
+
+
+@dataclass
+class TablaProgramada:
+    """Una tabla del lote: esquema de origen, dependencias, prioridad y duración estimada."""
+
+    nombre: str
+    esquema_postgres: str
+    dependencias: Set[str] = field(default_factory=set)
+    prioridad: int = 0
+    duracion_estimada: float = DEFAULT_DURATION_SECONDS
+    ruta_critica: float = 0.0
+
+
+class ETLScheduler:
+    """
+    Ejecuta varias cargas NetezzaETLLoader respetando las dependencias entre tablas de
+    config_etl_cargas. Entre las tablas listas para iniciar, prioriza la columna PRIORIDAD
+    y luego la ruta crítica más larga (duración histórica propia más la de sus dependientes),
+    dentro de un máximo de cargas simultáneas global y por esquema de PostgreSQL.
+    """
+
+    def __init__(
+        self,
+        excel_config_path: str,
+        output_dir: str = "output",
+        config_file: str = "config.ini",
+        tablas: Optional[List[str]] = None,
+        loader_factory: Optional[Callable[[str], NetezzaETLLoader]] = None,
+    ):
+        self.excel_config_path = excel_config_path
+        self.output_dir = output_dir
+        self.config_file = config_file
+        self.tablas_filtro = set(tablas) if tablas else None
+        self.netezza_schema = "ADMIN"
+        self.settings = self._load_scheduler_settings(config_file)
+        self.loader_factory = loader_factory or self._crear_loader
+        self.netezza_db = NetezzaConnection(config_file=config_file)
+        self.tablas: Dict[str, TablaProgramada] = {}
+        self.resultados: Dict[str, str] = {}
+        # Vigencia de la caché de extracciones: solo se comparte dentro de este lote
+        self.batch_id = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+
+    def _load_scheduler_settings(self, config_file: str) -> Dict[str, object]:
+        parser = configparser.ConfigParser(interpolation=None)
+        parser.read(Path(config_file), encoding="utf-8")
+        limites = (
+            {k: int(v) for k, v in parser.items("scheduler.max_per_schema")}
+            if parser.has_section("scheduler.max_per_schema")
+            else {}
+        )
+        return {
+            "max_workers": parser.getint("scheduler", "max_workers", fallback=4),
+            "max_per_schema": parser.getint("scheduler", "max_per_schema", fallback=2),
+            "history_days": parser.getint("scheduler", "history_days", fallback=30),
+            "limites_esquema": limites,
+        }
+
+    def _crear_loader(self, tabla: str) -> NetezzaETLLoader:
+        return NetezzaETLLoader(
+            target_table=tabla,
+            excel_config_path=self.excel_config_path,
+            output_dir=self.output_dir,
+            config_file=self.config_file,
+            batch_id=self.batch_id,
+        )
+
+    def _columnas_config(self) -> Set[str]:
+        result = self.netezza_db.execute_query(f"""
+            SELECT ATTNAME FROM _V_RELATION_COLUMN
+            WHERE SCHEMA = '{self.netezza_schema}' AND NAME = 'CONFIG_ETL_CARGAS'
+            """)
+        return {row[0].upper() for row in result or []}
+
+    def cargar_tablas(self) -> bool:
+        """
+        Lee las tablas activas de config_etl_cargas. Las columnas opcionales DEPENDENCIAS
+        (nombres de tabla separados por coma) y PRIORIDAD (entero, mayor primero) se usan si existen.
+        """
+        columnas = self._columnas_config()
+        con_dependencias = "DEPENDENCIAS" in columnas
+        con_prioridad = "PRIORIDAD" in columnas
+        select = ["nombre_tabla", "esquema_postgres"]
+        select.append("dependencias" if con_dependencias else "NULL")
+        select.append("prioridad" if con_prioridad else "NULL")
+        result = self.netezza_db.execute_query(f"""
+            SELECT {", ".join(select)}
+            FROM {self.netezza_schema}.config_etl_cargas
+            WHERE activo = TRUE
+            """)
+        if not result:
+            logger.error(
+                f"No se encontraron tablas activas en '{self.netezza_schema}.config_etl_cargas'."
+            )
+            return False
+        for nombre, esquema, dependencias, prioridad in result:
+            if self.tablas_filtro and nombre not in self.tablas_filtro:
+                continue
+            self.tablas[nombre] = TablaProgramada(
+                nombre=nombre,
+                esquema_postgres=esquema,
+                dependencias={d.strip() for d in (dependencias or "").split(",")}
+                - {""},
+                prioridad=int(prioridad or 0),
+            )
+        if self.tablas_filtro:
+            faltantes = self.tablas_filtro - set(self.tablas)
+            if faltantes:
+                logger.warning(
+                    f"Tablas solicitadas sin configuración activa: {', '.join(sorted(faltantes))}."
+                )
+        for tabla in self.tablas.values():
+            ajenas = tabla.dependencias - set(self.tablas)
+            if ajenas:
+                # Dependencias fuera del lote (inactivas o filtradas) no bloquean la carga
+                logger.warning(
+                    f"'{tabla.nombre}' depende de tablas fuera del lote: {', '.join(sorted(ajenas))}. Se ignoran."
+                )
+                tabla.dependencias -= ajenas
+        logger.info(f"Tablas en el lote: {len(self.tablas)}.")
+        return bool(self.tablas)
+
+    def cargar_duraciones(self) -> None:
+        """
+        Estima la duración de cada tabla como la mediana de sus cargas OK recientes en la
+        bitácora (requiere la columna NOMBRE_TABLA). Sin historial se usa la mediana del lote.
+        """
+        result = self.netezza_db.execute_query(f"""
+            SELECT NOMBRE_TABLA, INICIO_CARGA, FIN_CARGA
+            FROM {self.netezza_schema}.DWH_BITACORA_CARGA_MIGRACION
+            WHERE ESTADO = 'OK' AND FIN_CARGA IS NOT NULL AND NOMBRE_TABLA IS NOT NULL
+            AND INICIO_CARGA >= NOW() - INTERVAL '{self.settings["history_days"]} days'
+            """)
+        if result is None:
+            logger.warning(
+                "No se pudo leer el historial de la bitácora (¿falta la columna NOMBRE_TABLA?). Se asume la misma duración para todas las tablas."
+            )
+            result = []
+        duraciones: Dict[str, List[float]] = {}
+        for nombre, inicio, fin in result:
+            if nombre in self.tablas:
+                duraciones.setdefault(nombre, []).append((fin - inicio).total_seconds())
+        medianas = {
+            nombre: statistics.median(valores) for nombre, valores in duraciones.items()
+        }
+        por_defecto = (
+            statistics.median(medianas.values())
+            if medianas
+            else DEFAULT_DURATION_SECONDS
+        )
+        for tabla in self.tablas.values():
+            tabla.duracion_estimada = medianas.get(tabla.nombre, por_defecto)
+
+    def calcular_rutas_criticas(self) -> bool:
+        """Ruta crítica de cada tabla: su duración más la ruta crítica más larga de sus dependientes."""
+        dependientes: Dict[str, List[str]] = {nombre: [] for nombre in self.tablas}
+        for tabla in self.tablas.values():
+            for dependencia in tabla.dependencias:
+                dependientes[dependencia].append(tabla.nombre)
+        calculadas: Dict[str, float] = {}
+        en_visita: Set[str] = set()
+
+        def ruta(nombre: str) -> float:
+            if nombre in calculadas:
+                return calculadas[nombre]
+            if nombre in en_visita:
+                raise ValueError(f"Dependencia circular que incluye a '{nombre}'.")
+            en_visita.add(nombre)
+            calculadas[nombre] = self.tablas[nombre].duracion_estimada + max(
+                (ruta(d) for d in dependientes[nombre]), default=0.0
+            )
+            en_visita.discard(nombre)
+            return calculadas[nombre]
+
+        try:
+            for nombre in self.tablas:
+                self.tablas[nombre].ruta_critica = ruta(nombre)
+        except ValueError as e:
+            logger.error(f"No se puede planificar el lote: {e}")
+            return False
+        return True
+
+    def _limite_esquema(self, esquema: str) -> int:
+        return self.settings["limites_esquema"].get(
+            esquema.lower(), self.settings["max_per_schema"]
+        )
+
+    def _orden(self, tabla: TablaProgramada):
+        return (-tabla.prioridad, -tabla.ruta_critica, tabla.nombre)
+
+    def plan(self) -> List[TablaProgramada]:
+        """Tablas en el orden en que se considerarían para iniciar (sin dependencias)."""
+        return sorted(self.tablas.values(), key=self._orden)
+
+    def _ejecutar_tabla(self, nombre: str) -> bool:
+        loader = self.loader_factory(nombre)
+        return loader.run()
+
+    def ejecutar(self) -> bool:
+        """Ejecuta el lote completo. Devuelve True si todas las tablas cargaron bien."""
+        try:
+            if not self.cargar_tablas():
+                return False
+            self.cargar_duraciones()
+            if not self.calcular_rutas_criticas():
+                return False
+        finally:
+            self.netezza_db.close()
+        for tabla in self.plan():
+            logger.info(
+                f"Plan: '{tabla.nombre}' (esquema {tabla.esquema_postgres}, prioridad {tabla.prioridad}, duración estimada {tabla.duracion_estimada:.0f} s, ruta crítica {tabla.ruta_critica:.0f} s, depende de: {', '.join(sorted(tabla.dependencias)) or '-'})"
+            )
+
+        pendientes = dict(self.tablas)
+        terminadas: Set[str] = set()
+        en_curso: Dict[Future, TablaProgramada] = {}
+        por_esquema: Dict[str, int] = {}
+        with ThreadPoolExecutor(
+            max_workers=self.settings["max_workers"], thread_name_prefix="etl-lote"
+        ) as pool:
+            while pendientes or en_curso:
+                # Las tablas cuyas dependencias fallaron no se ejecutan
+                for nombre, tabla in list(pendientes.items()):
+                    fallidas = [
+                        d
+                        for d in tabla.dependencias
+                        if self.resultados.get(d) in ("ERROR", "OMITIDA")
+                    ]
+                    if fallidas:
+                        self.resultados[nombre] = "OMITIDA"
+                        del pendientes[nombre]
+                        logger.error(
+                            f"'{nombre}' omitida: falló su dependencia {', '.join(sorted(fallidas))}."
+                        )
+                listas = sorted(
+                    (t for t in pendientes.values() if t.dependencias <= terminadas),
+                    key=self._orden,
+                )
+                for tabla in listas:
+                    if len(en_curso) >= self.settings["max_workers"]:
+                        break
+                    esquema = tabla.esquema_postgres.lower()
+                    if por_esquema.get(esquema, 0) >= self._limite_esquema(esquema):
+                        continue
+                    por_esquema[esquema] = por_esquema.get(esquema, 0) + 1
+                    del pendientes[tabla.nombre]
+                    logger.info(
+                        f"Iniciando carga de '{tabla.nombre}' (ruta crítica {tabla.ruta_critica:.0f} s)."
+                    )
+                    en_curso[pool.submit(self._ejecutar_tabla, tabla.nombre)] = tabla
+                if not en_curso:
+                    break
+                listos, _ = wait(list(en_curso), return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    tabla = en_curso.pop(futuro)
+                    esquema = tabla.esquema_postgres.lower()
+                    por_esquema[esquema] -= 1
+                    try:
+                        ok = futuro.result()
+                    except Exception as e:
+                        logger.error(
+                            f"Excepción en la carga de '{tabla.nombre}': {e}",
+                            exc_info=True,
+                        )
+                        ok = False
+                    self.resultados[tabla.nombre] = "OK" if ok else "ERROR"
+                    if ok:
+                        terminadas.add(tabla.nombre)
+                    logger.info(
+                        f"Carga de '{tabla.nombre}' terminada: {self.resultados[tabla.nombre]}."
+                    )
+        for nombre in pendientes:
+            # Solo ocurre si un límite por esquema es 0
+            self.resultados[nombre] = "OMITIDA"
+            logger.error(f"'{nombre}' omitida: no se pudo programar su carga.")
+        resumen = ", ".join(
+            f"{nombre}={estado}" for nombre, estado in sorted(self.resultados.items())
+        )
+        logger.info(f"Lote terminado: {resumen}")
+        return all(estado == "OK" for estado in self.resultados.values())
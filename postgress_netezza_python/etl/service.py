@@ -0,0 +1,275 @@
+import configparser
+import json
+import logging
+import queue
+import signal
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .config_reader import ExcelTableConfigReader
+from .etl_loader import NetezzaETLLoader
+from .netezza_connection import NetezzaConnection
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TrabajoETL:
+    """Una carga pendiente: programada por config_etl_cargas o pedida en la cola local."""
+
+    tabla: str
+    origen: str
+    parquet_source: Optional[str] = None
+    archivo_cola: Optional[Path] = None
+
+
+class ETLService:
+    """
+    Proceso de larga duración que ejecuta cargas NetezzaETLLoader sin pagar en cada una
+    el arranque del intérprete, la lectura del Excel y la conexión a Netezza. Toma trabajos
+    de config_etl_cargas (columna opcional FRECUENCIA_MINUTOS) y de un directorio de cola
+    local (archivos *.job), y termina ordenadamente con SIGTERM/SIGINT: deja de tomar
+    trabajos nuevos y espera a que terminen los que están en curso.
+    """
+
+    def __init__(
+        self,
+        excel_config_path: str,
+        output_dir: str = "output",
+        config_file: str = "config.ini",
+    ):
+        self.excel_config_path = Path(excel_config_path)
+        self.output_dir = output_dir
+        self.config_file = config_file
+        self.netezza_schema = "ADMIN"
+        self.settings = self._load_service_settings(config_file)
+        self.netezza_db = NetezzaConnection(config_file=config_file)
+        # Conexiones Netezza abiertas que se reutilizan entre cargas (una por worker)
+        self._conexiones: "queue.Queue[NetezzaConnection]" = queue.Queue()
+        for _ in range(self.settings["max_workers"]):
+            self._conexiones.put(NetezzaConnection(config_file=config_file))
+        self._excel_reader: Optional[ExcelTableConfigReader] = None
+        self._excel_mtime: Optional[float] = None
+        self._excel_lock = threading.Lock()
+        self._ultimo_inicio: Optional[Dict[str, datetime]] = None
+        self._en_curso: Dict[str, Future] = {}
+        self._detener = threading.Event()
+
+    def _load_service_settings(self, config_file: str) -> Dict[str, object]:
+        parser = configparser.ConfigParser(interpolation=None)
+        parser.read(Path(config_file), encoding="utf-8")
+        queue_dir = parser.get("servicio", "queue_dir", fallback="").strip()
+        return {
+            "poll_seconds": parser.getfloat("servicio", "poll_seconds", fallback=60.0),
+            "max_workers": parser.getint("servicio", "max_workers", fallback=2),
+            "queue_dir": Path(queue_dir) if queue_dir else None,
+            "schedule_from_config": parser.getboolean(
+                "servicio", "schedule_from_config", fallback=True
+            ),
+        }
+
+    def _get_excel_reader(self) -> ExcelTableConfigReader:
+        """Excel de configuración ya leído; se vuelve a leer solo si el archivo cambió."""
+        with self._excel_lock:
+            mtime = self.excel_config_path.stat().st_mtime
+            if self._excel_reader is None or mtime != self._excel_mtime:
+                if self._excel_reader is not None:
+                    logger.info(
+                        f"El Excel '{self.excel_config_path}' cambió. Recargando configuración."
+                    )
+                self._excel_reader = ExcelTableConfigReader(str(self.excel_config_path))
+                self._excel_mtime = mtime
+            return self._excel_reader
+
+    def _columnas(self, tabla: str) -> List[str]:
+        result = self.netezza_db.execute_query(f"""
+            SELECT ATTNAME FROM _V_RELATION_COLUMN
+            WHERE SCHEMA = '{self.netezza_schema}' AND NAME = '{tabla.upper()}'
+            """)
+        return [row[0].upper() for row in result or []]
+
+    def _cargar_ultimos_inicios(self) -> Dict[str, datetime]:
+        """Último inicio de carga por tabla según la bitácora (requiere NOMBRE_TABLA)."""
+        if "NOMBRE_TABLA" not in self._columnas("DWH_BITACORA_CARGA_MIGRACION"):
+            return {}
+        result = self.netezza_db.execute_query(f"""
+            SELECT NOMBRE_TABLA, MAX(INICIO_CARGA)
+            FROM {self.netezza_schema}.DWH_BITACORA_CARGA_MIGRACION
+            WHERE NOMBRE_TABLA IS NOT NULL
+            GROUP BY NOMBRE_TABLA
+            """)
+        return {nombre: inicio for nombre, inicio in result or []}
+
+    def _trabajos_programados(self, ahora: datetime) -> List[TrabajoETL]:
+        """Tablas activas cuya FRECUENCIA_MINUTOS ya transcurrió desde su último inicio."""
+        if not self.settings["schedule_from_config"]:
+            return []
+        if "FRECUENCIA_MINUTOS" not in self._columnas("CONFIG_ETL_CARGAS"):
+            return []
+        if self._ultimo_inicio is None:
+            self._ultimo_inicio = self._cargar_ultimos_inicios()
+        result = self.netezza_db.execute_query(f"""
+            SELECT nombre_tabla, frecuencia_minutos
+            FROM {self.netezza_schema}.config_etl_cargas
+            WHERE activo = TRUE AND frecuencia_minutos IS NOT NULL
+            """)
+        trabajos = []
+        for tabla, frecuencia in result or []:
+            ultimo = self._ultimo_inicio.get(tabla)
+            if ultimo is None or ahora - ultimo >= timedelta(minutes=int(frecuencia)):
+                trabajos.append(TrabajoETL(tabla=tabla, origen="programado"))
+        return trabajos
+
+    def _trabajos_en_cola(self) -> List[TrabajoETL]:
+        """
+        Archivos *.job del directorio de cola. Cada uno contiene el nombre de la tabla o un
+        JSON {"tabla": ..., "desde_parquet": ...}. Se procesan en orden de llegada.
+        """
+        queue_dir = self.settings["queue_dir"]
+        if queue_dir is None or not queue_dir.exists():
+            return []
+        trabajos = []
+        for archivo in sorted(queue_dir.glob("*.job"), key=lambda p: p.stat().st_mtime):
+            try:
+                contenido = archivo.read_text(encoding="utf-8").strip()
+            except OSError as e:
+                logger.warning(f"No se pudo leer el trabajo '{archivo}': {e}")
+                continue
+            try:
+                datos = json.loads(contenido)
+            except ValueError:
+                datos = {"tabla": contenido}
+            if not isinstance(datos, dict) or not datos.get("tabla"):
+                logger.error(f"Trabajo inválido en '{archivo}': {contenido[:200]}")
+                archivo.rename(archivo.with_suffix(".error"))
+                continue
+            trabajos.append(
+                TrabajoETL(
+                    tabla=datos["tabla"],
+                    origen="cola",
+                    parquet_source=datos.get("desde_parquet"),
+                    archivo_cola=archivo,
+                )
+            )
+        return trabajos
+
+    def _ejecutar_trabajo(self, trabajo: TrabajoETL) -> bool:
+        """Ejecuta una carga con una conexión del pool. Cada carga usa su propio loader."""
+        netezza_db = self._conexiones.get()
+        try:
+            if netezza_db.conn and not netezza_db.ping():
+                # Conexión rota por la carga anterior o por el servidor: se reabre
+                try:
+                    netezza_db.close()
+                except Exception:
+                    netezza_db.conn = None
+                    netezza_db.cursor = None
+            loader = NetezzaETLLoader(
+                target_table=trabajo.tabla,
+                excel_config_path=str(self.excel_config_path),
+                output_dir=self.output_dir,
+                config_file=self.config_file,
+                parquet_source=trabajo.parquet_source,
+                excel_reader=self._get_excel_reader(),
+                netezza_db=netezza_db,
+                # La conexión de control del servicio confirma cada sentencia: sirve para
+                # los avances de bitácora mientras la carga tiene su transacción abierta
+                bitacora_db=self.netezza_db,
+            )
+            return loader.run()
+        except Exception as e:
+            logger.error(
+                f"Excepción en la carga de '{trabajo.tabla}': {e}", exc_info=True
+            )
+            return False
+        finally:
+            self._conexiones.put(netezza_db)
+
+    def _al_terminar(self, trabajo: TrabajoETL, futuro: Future) -> None:
+        ok = not futuro.cancelled() and futuro.exception() is None and futuro.result()
+        logger.info(
+            f"Carga {trabajo.origen} de '{trabajo.tabla}' terminada: {'OK' if ok else 'ERROR'}."
+        )
+        if trabajo.archivo_cola is not None:
+            procesando = trabajo.archivo_cola.with_suffix(".procesando")
+            try:
+                procesando.rename(
+                    trabajo.archivo_cola.with_suffix(".ok" if ok else ".error")
+                )
+            except OSError as e:
+                logger.warning(f"No se pudo marcar el trabajo '{procesando}': {e}")
+
+    def _despachar(self, pool: ThreadPoolExecutor) -> None:
+        """Toma los trabajos pendientes y los envía al pool, una carga por tabla a la vez."""
+        self._en_curso = {
+            tabla: futuro
+            for tabla, futuro in self._en_curso.items()
+            if not futuro.done()
+        }
+        ahora = datetime.now()
+        trabajos = self._trabajos_en_cola() + self._trabajos_programados(ahora)
+        for trabajo in trabajos:
+            if self._detener.is_set():
+                break
+            if trabajo.tabla in self._en_curso:
+                continue
+            if trabajo.archivo_cola is not None:
+                # Se reclama el archivo antes de ejecutar para no tomarlo dos veces
+                try:
+                    trabajo.archivo_cola.rename(
+                        trabajo.archivo_cola.with_suffix(".procesando")
+                    )
+                except OSError:
+                    continue
+            if self._ultimo_inicio is not None:
+                self._ultimo_inicio[trabajo.tabla] = ahora
+            logger.info(f"Iniciando carga {trabajo.origen} de '{trabajo.tabla}'.")
+            futuro = pool.submit(self._ejecutar_trabajo, trabajo)
+            futuro.add_done_callback(
+                lambda f, trabajo=trabajo: self._al_terminar(trabajo, f)
+            )
+            self._en_curso[trabajo.tabla] = futuro
+
+    def detener(self, *_args) -> None:
+        """Pide un cierre ordenado: no se toman trabajos nuevos y se esperan los en curso."""
+        if not self._detener.is_set():
+            logger.info(
+                "Cierre solicitado: esperando a que terminen las cargas en curso."
+            )
+        self._detener.set()
+
+    def ejecutar(self, una_vez: bool = False) -> None:
+        """Bucle principal del servicio. Con `una_vez`, despacha un solo ciclo y espera sus cargas."""
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.detener)
+            signal.signal(signal.SIGINT, self.detener)
+        logger.info(
+            f"Servicio ETL iniciado (workers={self.settings['max_workers']}, intervalo={self.settings['poll_seconds']} s, cola={self.settings['queue_dir'] or '-'})."
+        )
+        self._get_excel_reader()
+        try:
+            with ThreadPoolExecutor(
+                max_workers=self.settings["max_workers"],
+                thread_name_prefix="etl-servicio",
+            ) as pool:
+                while not self._detener.is_set():
+                    try:
+                        self._despachar(pool)
+                    except Exception as e:
+                        logger.error(
+                            f"Error al buscar trabajos pendientes: {e}", exc_info=True
+                        )
+                    if una_vez:
+                        break
+                    self._detener.wait(self.settings["poll_seconds"])
+        finally:
+            self.netezza_db.close()
+            while not self._conexiones.empty():
+                netezza_db = self._conexiones.get_nowait()
+                if netezza_db.conn:
+                    netezza_db.close()
+            logger.info("Servicio ETL detenido.")
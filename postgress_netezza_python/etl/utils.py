@@ -1,31 +1,78 @@
 import csv
 import logging
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
 
-# Configuración de logging
-logging.basicConfig(
-    level=logging.INFO,
-    filename="libraries.log",
-    filemode="w",
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
+try:
+    import resource
+except ImportError:  # Windows no dispone del módulo resource
+    resource = None
 
-file_handler = logging.FileHandler("output.log", mode="w", encoding="utf-8")
-formatter = logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-)
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
-logger.propagate = False
+from .logging_config import AvisosLimitados
+
+logger = logging.getLogger(__name__)
 
 
-def validar_csv(file_path, expected_columns, delimiter):
+def validar_csv(file_path, expected_columns, delimiter, max_avisos=20):
+    avisos = AvisosLimitados(logger, max_avisos)
     with open(file_path, encoding="utf-8") as f:
         reader = csv.reader(f, delimiter=delimiter)
         for i, row in enumerate(reader, 1):
             if len(row) != expected_columns:
-                logger.warning(
+                avisos.warning(
                     f"Fila {i} tiene {len(row)} columnas, se esperaban {expected_columns}: {row}"
                 )
+    avisos.resumen()
+
+
+def peak_rss_mb() -> Optional[float]:
+    """RSS pico del proceso en MB, o None si la plataforma no lo expone."""
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss viene en bytes en macOS y en kilobytes en Linux
+    if sys.platform == "darwin":
+        return maxrss / 1024 / 1024
+    return maxrss / 1024
+
+
+# Línea de detalle de un .nzlog de Netezza:
+# bad #: input row #(byte offset) [field #, declaration] diagnostic, "text consumed"[last char examined]
+NZLOG_REJECT_PATTERN = re.compile(
+    r'^\s*(\d+):\s*(\d+)\((\d+)\)\s*\[(\d+),\s*([^\]]*)\]\s*(.*?)(?:,\s*"(.*)"\[(.*)\])?\s*$'
+)
+
+
+def parsear_log_rechazos(
+    log_path, column_names: Optional[List[str]] = None
+) -> List[Dict[str, object]]:
+    """
+    Parsea un archivo .nzlog de una carga por tabla externa y devuelve un registro por fila rechazada
+    (fila del archivo, número y nombre de columna, tipo declarado, motivo y texto leído).
+    """
+    rechazos = []
+    with open(log_path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            match = NZLOG_REJECT_PATTERN.match(line)
+            if not match:
+                continue
+            field_number = int(match.group(4))
+            column_name = None
+            if column_names and 0 < field_number <= len(column_names):
+                column_name = column_names[field_number - 1]
+            rechazos.append(
+                {
+                    "archivo_log": Path(log_path).name,
+                    "rechazo": int(match.group(1)),
+                    "fila": int(match.group(2)),
+                    "offset": int(match.group(3)),
+                    "campo": field_number,
+                    "columna": column_name,
+                    "tipo": match.group(5).strip(),
+                    "motivo": match.group(6).strip(),
+                    "texto": match.group(7),
+                }
+            )
+    return rechazos
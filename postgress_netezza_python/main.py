@@ -4,28 +4,270 @@ import sys
 
 from pathlib import Path
 from etl.etl_loader import NetezzaETLLoader
+from etl.logging_config import configurar_logging
 
-# Configuración de logging (igual que en migracion.py)
-logging.basicConfig(
-    level=logging.INFO,
-    filename="libraries.log",
-    filemode="w",
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
 
-file_handler = logging.FileHandler("output.log", mode="w", encoding="utf-8")
-formatter = logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-)
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
-logger.propagate = False
+
+def main_batch(argv):
+    """Subcomando `batch`: carga varias tablas de config_etl_cargas respetando dependencias."""
+    from etl.scheduler import ETLScheduler
+
+    parser = argparse.ArgumentParser(
+        prog="main.py batch",
+        description="Carga en lote las tablas activas de config_etl_cargas, respetando sus dependencias y priorizando la ruta crítica más larga.",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "excel_config_path",
+        help="Ruta al archivo Excel que contiene la configuración de las tablas y columnas.",
+    )
+    parser.add_argument(
+        "-o",
+        "--output_dir",
+        default="output",
+        help='Directorio para archivos CSV intermedios y finales (default: "output").',
+    )
+    parser.add_argument(
+        "-c",
+        "--config_file",
+        default="config.ini",
+        help='Ruta al archivo de configuración .ini (default: "config.ini").',
+    )
+    parser.add_argument(
+        "-t",
+        "--tablas",
+        nargs="+",
+        default=None,
+        help="Limita el lote a estas tablas (default: todas las activas).",
+    )
+    args = parser.parse_args(argv)
+
+    if not Path(args.config_file).exists():
+        print(
+            f"Error: El archivo de configuración de base de datos '{args.config_file}' no fue encontrado."
+        )
+        sys.exit(2)
+    if not Path(args.excel_config_path).exists():
+        print(
+            f"Error: El archivo de configuración Excel '{args.excel_config_path}' no fue encontrado."
+        )
+        sys.exit(2)
+
+    try:
+        scheduler = ETLScheduler(
+            excel_config_path=args.excel_config_path,
+            output_dir=args.output_dir,
+            config_file=args.config_file,
+            tablas=args.tablas,
+        )
+        success = scheduler.ejecutar()
+        sys.exit(0 if success else 1)
+    except Exception as e_main:
+        logger.critical(
+            f"Excepción no controlada en main_batch(): {e_main}", exc_info=True
+        )
+        sys.exit(3)
+
+
+def main_servicio(argv):
+    """Subcomando `servicio`: proceso residente que ejecuta cargas programadas o encoladas."""
+    from etl.service import ETLService
+
+    parser = argparse.ArgumentParser(
+        prog="main.py servicio",
+        description="Ejecuta cargas en un proceso residente, reutilizando el Excel leído y las conexiones a Netezza. Se detiene con SIGTERM/SIGINT.",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "excel_config_path",
+        help="Ruta al archivo Excel que contiene la configuración de las tablas y columnas.",
+    )
+    parser.add_argument(
+        "-o",
+        "--output_dir",
+        default="output",
+        help='Directorio para archivos CSV intermedios y finales (default: "output").',
+    )
+    parser.add_argument(
+        "-c",
+        "--config_file",
+        default="config.ini",
+        help='Ruta al archivo de configuración .ini (default: "config.ini").',
+    )
+    parser.add_argument(
+        "--una_vez",
+        action="store_true",
+        help="Despacha un solo ciclo de trabajos pendientes, espera que terminen y sale.",
+    )
+    args = parser.parse_args(argv)
+
+    if not Path(args.config_file).exists():
+        print(
+            f"Error: El archivo de configuración de base de datos '{args.config_file}' no fue encontrado."
+        )
+        sys.exit(2)
+    if not Path(args.excel_config_path).exists():
+        print(
+            f"Error: El archivo de configuración Excel '{args.excel_config_path}' no fue encontrado."
+        )
+        sys.exit(2)
+
+    try:
+        servicio = ETLService(
+            excel_config_path=args.excel_config_path,
+            output_dir=args.output_dir,
+            config_file=args.config_file,
+        )
+        servicio.ejecutar(una_vez=args.una_vez)
+        sys.exit(0)
+    except Exception as e_main:
+        logger.critical(
+            f"Excepción no controlada en main_servicio(): {e_main}", exc_info=True
+        )
+        sys.exit(3)
+
+
+def main_fanout(argv):
+    """Subcomando `fanout`: una extracción de PostgreSQL cargada en varias tablas destino."""
+    from etl.fanout import ETLFanOut
+
+    parser = argparse.ArgumentParser(
+        prog="main.py fanout",
+        description="Extrae una vez la query de una tabla de config_etl_cargas y la carga a la vez en varias tablas destino de Netezza, cada una con su hoja del Excel y su conexión.",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "tabla_origen",
+        help="Tabla de config_etl_cargas cuya query de extracción se reparte.",
+    )
+    parser.add_argument(
+        "excel_config_path",
+        help="Ruta al archivo Excel que contiene la configuración de las tablas y columnas.",
+    )
+    parser.add_argument(
+        "-d",
+        "--destinos",
+        nargs="+",
+        default=None,
+        help='Tablas destino, "tabla" o "tabla:otro.ini" para otra base (default: targets de [fanout.<tabla_origen>]).',
+    )
+    parser.add_argument(
+        "-o",
+        "--output_dir",
+        default="output",
+        help='Directorio para archivos CSV intermedios y finales (default: "output").',
+    )
+    parser.add_argument(
+        "-c",
+        "--config_file",
+        default="config.ini",
+        help='Ruta al archivo de configuración .ini (default: "config.ini").',
+    )
+    args = parser.parse_args(argv)
+
+    if not Path(args.config_file).exists():
+        print(
+            f"Error: El archivo de configuración de base de datos '{args.config_file}' no fue encontrado."
+        )
+        sys.exit(2)
+    if not Path(args.excel_config_path).exists():
+        print(
+            f"Error: El archivo de configuración Excel '{args.excel_config_path}' no fue encontrado."
+        )
+        sys.exit(2)
+
+    try:
+        fanout = ETLFanOut(
+            tabla_origen=args.tabla_origen,
+            excel_config_path=args.excel_config_path,
+            output_dir=args.output_dir,
+            config_file=args.config_file,
+            destinos=args.destinos,
+        )
+        success = fanout.ejecutar()
+        sys.exit(0 if success else 1)
+    except Exception as e_main:
+        logger.critical(
+            f"Excepción no controlada en main_fanout(): {e_main}", exc_info=True
+        )
+        sys.exit(3)
+
+
+def main_report(argv):
+    """Subcomando `report`: analiza el historial de la bitácora y detecta regresiones."""
+    from etl.report import ETLReport
+
+    parser = argparse.ArgumentParser(
+        prog="main.py report",
+        description="Percentiles y tendencia de duración y filas/s por tabla, cargas más lentas que su línea base y tablas que dominan la ventana de carga, según la bitácora.",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "-c",
+        "--config_file",
+        default="config.ini",
+        help='Ruta al archivo de configuración .ini (default: "config.ini").',
+    )
+    parser.add_argument(
+        "-t",
+        "--tablas",
+        nargs="+",
+        default=None,
+        help="Limita el reporte a estas tablas (default: todas).",
+    )
+    parser.add_argument(
+        "--dias",
+        type=int,
+        default=None,
+        help="Días de historial a analizar (default: history_days de [report], 30).",
+    )
+    parser.add_argument(
+        "--factor",
+        type=float,
+        default=None,
+        help="Factor sobre la línea base a partir del cual una carga es una regresión (default: regression_factor de [report], 1.5).",
+    )
+    args = parser.parse_args(argv)
+
+    if not Path(args.config_file).exists():
+        print(
+            f"Error: El archivo de configuración de base de datos '{args.config_file}' no fue encontrado."
+        )
+        sys.exit(2)
+
+    try:
+        reporte = ETLReport(
+            config_file=args.config_file,
+            tablas=args.tablas,
+            history_days=args.dias,
+            regression_factor=args.factor,
+        )
+        if not reporte.cargar_historial():
+            sys.exit(1)
+        regresiones = reporte.imprimir()
+        # Código 1 si la ventana de carga más reciente tiene regresiones (para alertas)
+        sys.exit(1 if regresiones else 0)
+    except Exception as e_main:
+        logger.critical(
+            f"Excepción no controlada en main_report(): {e_main}", exc_info=True
+        )
+        sys.exit(3)
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        main_batch(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "servicio":
+        main_servicio(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "fanout":
+        main_fanout(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "report":
+        main_report(sys.argv[2:])
+        return
     parser = argparse.ArgumentParser(
         description="Extrae datos de PostgreSQL, los transforma y los carga/actualiza en Netezza usando MERGE.",
         formatter_class=argparse.RawTextHelpFormatter,
@@ -50,6 +292,21 @@ def main():
         default="config.ini",
         help='Ruta al archivo de configuración .ini para las conexiones de base de datos (default: "config.ini").',
     )
+    parser.add_argument(
+        "--desde_parquet",
+        default=None,
+        help="Re-carga la tabla desde un extracto archivado en Parquet, sin consultar PostgreSQL.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Perfila cada paso con cProfile (.pstats y resumen en output_dir).",
+    )
+    parser.add_argument(
+        "--profile_memory",
+        action="store_true",
+        help="Perfila la memoria de cada paso con tracemalloc (reporte en output_dir).",
+    )
     parser.add_argument(
         "-v",
         "--verbose",
@@ -61,6 +318,7 @@ def main():
 
     if args.verbose:
         logger.setLevel(logging.DEBUG)
+        logging.getLogger("etl").setLevel(logging.DEBUG)
         logging.getLogger("nzpy").setLevel(logging.DEBUG)
         logging.getLogger("psycopg2").setLevel(logging.INFO)
         logger.info("Modo verboso activado.")
@@ -82,6 +340,9 @@ def main():
             excel_config_path=args.excel_config_path,
             output_dir=args.output_dir,
             config_file=args.config_file,
+            parquet_source=args.desde_parquet,
+            profile=args.profile,
+            profile_memory=args.profile_memory,
         )
         success = loader.run()
         sys.exit(0 if success else 1)
@@ -95,4 +356,5 @@ def main():
 
 
 if __name__ == "__main__":
+    configurar_logging()
     main()
@@ -0,0 +1,106 @@
+import csv
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+from etl import arrow_transform
+from etl.arrow_transform import DelimitedArrowWriter, choose_separator
+
+if arrow_transform.pyarrow_available():
+    import pyarrow as pa
+
+
+def csv_writer_text(rows, separator):
+    """Salida de referencia: csv.writer, como la etapa de transformación csv."""
+    salida = io.StringIO(newline="")
+    csv.writer(salida, delimiter=separator).writerows(rows)
+    return salida.getvalue()
+
+
+@unittest.skipUnless(arrow_transform.pyarrow_available(), "requiere pyarrow")
+class DelimitedArrowWriterTest(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.path = Path(directorio.name) / "final.csv"
+
+    def escribir(self, separator, column_names, *batches):
+        writer = DelimitedArrowWriter(self.path, separator, column_names)
+        try:
+            for batch in batches:
+                writer.write_batch(batch)
+        finally:
+            writer.close()
+        return writer, self.path.read_bytes().decode("utf-8")
+
+    def test_comillas_iguales_a_csv_writer(self):
+        textos = [
+            "simple",
+            "con|separador",
+            'con "comillas"',
+            "salto\nde línea",
+            "retorno\r",
+            "",
+            None,
+            "ñandú ✓",
+        ]
+        batch = pa.RecordBatch.from_arrays(
+            [
+                pa.array(textos, pa.string()),
+                pa.array(range(len(textos)), pa.int64()),
+                pa.array([True, False, None, True, False, True, None, False]),
+            ],
+            names=["texto", "numero", "activo"],
+        )
+
+        _, contenido = self.escribir("|", ["texto", "numero", "activo"], batch)
+
+        esperado = csv_writer_text(
+            [["texto", "numero", "activo"]]
+            + [
+                [texto, numero, activo]
+                for texto, numero, activo in zip(
+                    textos, range(len(textos)), batch.column(2).to_pylist()
+                )
+            ],
+            "|",
+        )
+        self.assertEqual(contenido, esperado)
+
+    def test_separador_no_ascii_y_cabecera_con_comillas(self):
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(["a¦b", "c"]), pa.array(["d", "e"])], names=["x", "y"]
+        )
+
+        _, contenido = self.escribir("¦", ["col¦1", "col2"], batch)
+
+        self.assertEqual(contenido, '"col¦1"¦col2\r\n"a¦b"¦d\r\nc¦e\r\n')
+
+    def test_lotes_recortados_y_vacios(self):
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array([f"fila{i}" for i in range(10)]), pa.array(range(10))],
+            names=["texto", "numero"],
+        )
+
+        writer, contenido = self.escribir(
+            ",", ["texto", "numero"], batch.slice(3, 4), batch.slice(0, 0)
+        )
+
+        self.assertEqual(
+            contenido,
+            "texto,numero\r\nfila3,3\r\nfila4,4\r\nfila5,5\r\nfila6,6\r\n",
+        )
+        self.assertEqual(writer.rows_written, 4)
+
+    def test_choose_separator_omite_los_que_aparecen_en_el_texto(self):
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(["a|b", "c"]), pa.array([1.5, 2.5])], names=["texto", "monto"]
+        )
+
+        self.assertEqual(choose_separator(batch, ["|", "¦", ";"]), "¦")
+        self.assertIsNone(choose_separator(batch, ["|"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import unittest
+
+from etl.cdc import (
+    OP_DELETE,
+    OP_UPSERT,
+    CambioCDC,
+    consolidar_cambios,
+    parsear_cambio_test_decoding,
+)
+
+COLUMNAS = ["id", "nombre", "notas"]
+CLAVES = ["id"]
+
+
+def consolidar(*lineas, columnas=COLUMNAS, claves=CLAVES):
+    cambios = [parsear_cambio_test_decoding(linea) for linea in lineas]
+    return consolidar_cambios(
+        [c for c in cambios if c], "public.clientes", columnas, claves
+    )
+
+
+class ParsearCambioTest(unittest.TestCase):
+    def test_begin_y_commit_no_son_cambios(self):
+        self.assertIsNone(parsear_cambio_test_decoding("BEGIN 1234"))
+        self.assertIsNone(parsear_cambio_test_decoding("COMMIT 1234"))
+
+    def test_insert_con_textos_nulos_y_columnas_entre_comillas(self):
+        cambio = parsear_cambio_test_decoding(
+            "table public.clientes: INSERT: id[integer]:1 nombre[text]:'O''Brien, Ana'"
+            " notas[text]:null \"Fecha Alta\"[date]:'2024-01-31'"
+        )
+
+        self.assertEqual(cambio.tabla, "public.clientes")
+        self.assertEqual(cambio.operacion, "INSERT")
+        self.assertEqual(
+            cambio.valores,
+            {
+                "id": "1",
+                "nombre": "O'Brien, Ana",
+                "notas": None,
+                "Fecha Alta": "2024-01-31",
+            },
+        )
+        self.assertEqual(cambio.anteriores, {})
+
+    def test_update_con_clave_anterior(self):
+        cambio = parsear_cambio_test_decoding(
+            "table public.clientes: UPDATE: old-key: id[integer]:1"
+            " new-tuple: id[integer]:2 nombre[text]:'Ana'"
+        )
+
+        self.assertEqual(cambio.anteriores, {"id": "1"})
+        self.assertEqual(cambio.valores, {"id": "2", "nombre": "Ana"})
+
+    def test_delete_trae_la_clave(self):
+        cambio = parsear_cambio_test_decoding(
+            "table public.clientes: DELETE: id[integer]:7"
+        )
+
+        self.assertEqual(cambio.operacion, "DELETE")
+        self.assertEqual(cambio.valores, {"id": "7"})
+
+
+class ConsolidarCambiosTest(unittest.TestCase):
+    def test_el_ultimo_cambio_de_cada_clave_gana(self):
+        filas, altas, bajas = consolidar(
+            "table public.clientes: INSERT: id[integer]:1 nombre[text]:'a' notas[text]:null",
+            "table public.clientes: UPDATE: id[integer]:1 nombre[text]:'b' notas[text]:null",
+            "table public.clientes: INSERT: id[integer]:2 nombre[text]:'c' notas[text]:'x'",
+            "table public.clientes: DELETE: id[integer]:2",
+        )
+
+        self.assertEqual(
+            filas,
+            [["1", "b", None, OP_UPSERT], ["2", None, None, OP_DELETE]],
+        )
+        self.assertEqual((altas, bajas), (1, 1))
+
+    def test_cambio_de_clave_es_baja_de_la_anterior_y_alta_de_la_nueva(self):
+        filas, altas, bajas = consolidar(
+            "table public.clientes: UPDATE: old-key: id[integer]:1"
+            " new-tuple: id[integer]:5 nombre[text]:'a' notas[text]:null",
+        )
+
+        self.assertEqual(
+            filas,
+            [["1", None, None, OP_DELETE], ["5", "a", None, OP_UPSERT]],
+        )
+        self.assertEqual((altas, bajas), (1, 1))
+
+    def test_ignora_otras_tablas_y_columnas_fuera_del_excel(self):
+        filas, altas, bajas = consolidar(
+            "table public.pedidos: INSERT: id[integer]:1 total[numeric]:10",
+            'table "public"."Clientes": INSERT: id[integer]:3 nombre[text]:\'a\''
+            " notas[text]:null extra[text]:'z'",
+        )
+
+        self.assertEqual(filas, [["3", "a", None, OP_UPSERT]])
+        self.assertEqual((altas, bajas), (1, 0))
+
+    def test_toast_sin_modificar_se_completa_con_el_cambio_previo_del_lote(self):
+        filas, _, _ = consolidar(
+            "table public.clientes: INSERT: id[integer]:1 nombre[text]:'a' notas[text]:'largo'",
+            "table public.clientes: UPDATE: id[integer]:1 nombre[text]:'b'"
+            " notas[text]:unchanged-toast-datum",
+        )
+
+        self.assertEqual(filas, [["1", "b", "largo", OP_UPSERT]])
+
+    def test_toast_sin_modificar_se_completa_con_replica_identity_full(self):
+        filas, _, _ = consolidar(
+            "table public.clientes: UPDATE: old-key: id[integer]:1 nombre[text]:'a'"
+            " notas[text]:'largo' new-tuple: id[integer]:1 nombre[text]:'b'"
+            " notas[text]:unchanged-toast-datum",
+        )
+
+        self.assertEqual(filas, [["1", "b", "largo", OP_UPSERT]])
+
+    def test_toast_sin_modificar_y_sin_fila_anterior_es_un_error(self):
+        with self.assertRaisesRegex(ValueError, "REPLICA IDENTITY FULL"):
+            consolidar(
+                "table public.clientes: UPDATE: id[integer]:1 nombre[text]:'b'"
+                " notas[text]:unchanged-toast-datum",
+            )
+
+    def test_clave_compuesta(self):
+        cambios = [
+            CambioCDC(
+                "public.clientes", "INSERT", {"suc": "1", "num": "9", "nombre": "a"}
+            ),
+            CambioCDC(
+                "public.clientes", "INSERT", {"suc": "2", "num": "9", "nombre": "b"}
+            ),
+            CambioCDC("public.clientes", "DELETE", {"suc": "1", "num": "9"}),
+        ]
+
+        filas, altas, bajas = consolidar_cambios(
+            cambios, "public.clientes", ["suc", "num", "nombre"], ["suc", "num"]
+        )
+
+        self.assertEqual(
+            filas, [["1", "9", None, OP_DELETE], ["2", "9", "b", OP_UPSERT]]
+        )
+        self.assertEqual((altas, bajas), (1, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import sqlite3
+import unittest
+
+from etl.delete_detection import DetectorBajas
+
+
+class DetectorBajasTest(unittest.TestCase):
+    """Ejecuta las consultas generadas sobre SQLite en memoria, con origen y destino en tablas."""
+
+    def setUp(self):
+        self.db = sqlite3.connect(":memory:")
+        self.addCleanup(self.db.close)
+        self.db.create_function("MOD", 2, lambda a, b: a % b, deterministic=True)
+        self.db.execute("CREATE TABLE origen (id INTEGER)")
+        self.db.execute("CREATE TABLE destino (id INTEGER)")
+        self.consultas = []
+
+    def cargar(self, origen, destino):
+        self.db.executemany("INSERT INTO origen VALUES (?)", [(i,) for i in origen])
+        self.db.executemany("INSERT INTO destino VALUES (?)", [(i,) for i in destino])
+
+    def consultar(self, sql):
+        self.consultas.append(sql)
+        return self.db.execute(sql).fetchall()
+
+    def detector(self, buckets=16, niveles=2):
+        return DetectorBajas(
+            consultar_origen=self.consultar,
+            consultar_destino=self.consultar,
+            from_origen="origen",
+            from_destino="destino",
+            hash_origen="id",
+            hash_destino="id",
+            buckets=buckets,
+            niveles=niveles,
+        )
+
+    def test_sin_diferencias_no_hay_buckets_distintos(self):
+        self.cargar(range(1000), range(1000))
+        detector = self.detector()
+
+        with self.assertLogs("etl.delete_detection", level="INFO"):
+            self.assertEqual(detector.buckets_distintos(), [])
+        self.assertEqual(detector.filas_destino, 1000)
+        # Sin diferencias en el primer nivel no se baja al segundo
+        self.assertEqual(len(self.consultas), 2)
+
+    def test_encuentra_los_huerfanos_y_los_elimina(self):
+        huerfanos = [17, 530, 531, 999]
+        self.cargar(
+            [i for i in range(1000) if i not in huerfanos] + [5000], range(1000)
+        )
+        detector = self.detector()
+
+        with self.assertLogs("etl.delete_detection", level="INFO"):
+            hojas = detector.buckets_distintos()
+        # Las hojas son buckets del último nivel (MOD 16^2) que contienen diferencias
+        self.assertEqual(hojas, sorted({h % 256 for h in huerfanos + [5000]}))
+        self.assertEqual(detector.hashes_huerfanos(hojas), huerfanos)
+
+        for sentencia in detector.sentencias_delete("destino", huerfanos):
+            self.db.execute(sentencia)
+        restantes = {fila[0] for fila in self.db.execute("SELECT id FROM destino")}
+        self.assertEqual(restantes, set(range(1000)) - set(huerfanos))
+
+    def test_misma_cantidad_con_claves_distintas_se_detecta_por_la_suma(self):
+        self.cargar([0, 1, 2, 35], [0, 1, 2, 3])
+        detector = self.detector()
+
+        with self.assertLogs("etl.delete_detection", level="INFO"):
+            hojas = detector.buckets_distintos()
+        self.assertEqual(detector.hashes_huerfanos(hojas), [3])
+
+    def test_los_delete_se_parten_en_bloques(self):
+        detector = self.detector()
+
+        sentencias = detector.sentencias_delete('"ADMIN"."T"', list(range(2500)))
+
+        self.assertEqual(len(sentencias), 3)
+        self.assertTrue(
+            sentencias[0].startswith('DELETE FROM "ADMIN"."T" WHERE ABS(id) IN (0, 1,')
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
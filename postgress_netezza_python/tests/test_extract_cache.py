@@ -0,0 +1,128 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+from etl.extract_cache import ExtractCache, normalizar_query
+
+
+class NormalizarQueryTest(unittest.TestCase):
+    def test_quita_comentarios_espacios_y_punto_y_coma(self):
+        self.assertEqual(
+            normalizar_query(
+                "SELECT id,\n   nombre -- columnas\nFROM /* origen */ clientes ;;"
+            ),
+            "SELECT id, nombre FROM clientes",
+        )
+
+    def test_no_modifica_los_literales(self):
+        self.assertEqual(
+            normalizar_query("SELECT * FROM t WHERE a = 'x  -- y'  ;"),
+            "SELECT * FROM t WHERE a = 'x  -- y'",
+        )
+
+
+class ExtractCacheTest(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.base = Path(directorio.name)
+        self.cache = ExtractCache(self.base / "cache", max_bytes=1000)
+
+    def extracto(self, nombre: str, contenido: str) -> Path:
+        ruta = self.base / nombre
+        ruta.write_text(contenido, encoding="utf-8")
+        return ruta
+
+    def test_la_clave_depende_de_query_normalizada_esquema_y_vigencia(self):
+        clave = self.cache.key("SELECT * FROM t;", "public", "lote 1")
+
+        self.assertEqual(clave, self.cache.key("SELECT *\n FROM t", "public", "lote 1"))
+        self.assertNotEqual(
+            clave, self.cache.key("SELECT * FROM t", "ventas", "lote 1")
+        )
+        self.assertNotEqual(
+            clave, self.cache.key("SELECT * FROM t", "public", "lote 2")
+        )
+
+    def test_lookup_sin_entrada(self):
+        self.assertIsNone(self.cache.lookup(self.cache.key("SELECT 1", "public", "w")))
+
+    def test_store_lookup_y_materialize(self):
+        clave = self.cache.key("SELECT * FROM t", "public", "w")
+        self.cache.store(clave, self.extracto("raw.tsv", "id\n1\n"), {"filas": 1})
+
+        meta = self.cache.lookup(clave)
+        self.assertEqual(meta["filas"], 1)
+        self.assertIn("creado", meta)
+        destino = self.base / "salida" / "raw.tsv"
+        destino.parent.mkdir()
+        self.assertTrue(self.cache.materialize(clave, destino))
+        self.assertEqual(destino.read_text(encoding="utf-8"), "id\n1\n")
+
+    def test_metadatos_ilegibles_no_son_un_acierto(self):
+        clave = self.cache.key("SELECT * FROM t", "public", "w")
+        self.cache.store(clave, self.extracto("raw.tsv", "id\n"), {})
+        (self.cache.directory / f"{clave}.json").write_text("{", encoding="utf-8")
+
+        with self.assertLogs("etl.extract_cache", level="WARNING"):
+            self.assertIsNone(self.cache.lookup(clave))
+
+    def test_evict_elimina_las_menos_usadas_y_conserva_la_nueva(self):
+        claves = [self.cache.key(f"SELECT {i}", "public", "w") for i in range(3)]
+        for i, clave in enumerate(claves[:2]):
+            self.cache.store(clave, self.extracto(f"raw{i}.tsv", "x" * 400), {})
+            # Fechas de uso distintas: la primera queda como la menos usada
+            os.utime(self.cache.directory / f"{clave}.tsv", (1000 + i, 1000 + i))
+        # Un lookup marca la entrada como usada recientemente
+        self.cache.lookup(claves[0])
+
+        self.cache.store(claves[2], self.extracto("raw2.tsv", "x" * 400), {})
+
+        self.assertIsNotNone(self.cache.lookup(claves[0]))
+        self.assertIsNone(self.cache.lookup(claves[1]))
+        self.assertFalse((self.cache.directory / f"{claves[1]}.json").exists())
+        self.assertIsNotNone(self.cache.lookup(claves[2]))
+
+    def test_evict_no_elimina_la_entrada_recien_guardada(self):
+        clave = self.cache.key("SELECT grande", "public", "w")
+        self.cache.store(clave, self.extracto("raw.tsv", "x" * 2000), {})
+
+        self.assertIsNotNone(self.cache.lookup(clave))
+
+    def test_lock_serializa_la_misma_clave(self):
+        clave = self.cache.key("SELECT * FROM t", "public", "w")
+        eventos = []
+
+        def segundo():
+            with self.cache.lock(clave, poll_seconds=0.01):
+                eventos.append("segundo")
+
+        with self.assertLogs("etl.extract_cache", level="INFO"):
+            with self.cache.lock(clave):
+                hilo = threading.Thread(target=segundo)
+                hilo.start()
+                time.sleep(0.05)
+                eventos.append("primero")
+            hilo.join(5)
+
+        self.assertEqual(eventos, ["primero", "segundo"])
+        self.assertFalse((self.cache.directory / f"{clave}.lock").exists())
+
+    def test_lock_abandonado_se_elimina(self):
+        clave = self.cache.key("SELECT * FROM t", "public", "w")
+        lock_path = self.cache.directory / f"{clave}.lock"
+        lock_path.write_text("99999", encoding="ascii")
+        os.utime(lock_path, (0, 0))
+        self.cache.lock_timeout = 60
+
+        with self.assertLogs("etl.extract_cache", level="WARNING"):
+            with self.cache.lock(clave):
+                self.assertTrue(lock_path.exists())
+        self.assertFalse(lock_path.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import threading
+import time
+import unittest
+
+from etl.pipeline import EjecutorPasos, PasoETL
+
+
+def paso(nombre, funcion, depende_de=()):
+    return PasoETL(
+        nombre=nombre,
+        funcion=funcion,
+        observacion=f"Paso {nombre}",
+        error=f"Falló {nombre}",
+        depende_de=depende_de,
+    )
+
+
+class EjecutorPasosSecuencialTest(unittest.TestCase):
+    def test_respeta_el_orden_de_la_lista(self):
+        orden = []
+        pasos = [
+            paso(nombre, lambda n=nombre: orden.append(n) or True)
+            for nombre in ("a", "b", "c")
+        ]
+        iniciados = []
+        ejecutor = EjecutorPasos(pasos, al_iniciar=lambda p: iniciados.append(p.nombre))
+
+        self.assertIsNone(ejecutor.ejecutar())
+        self.assertEqual(orden, ["a", "b", "c"])
+        self.assertEqual(iniciados, ["a", "b", "c"])
+
+    def test_se_detiene_en_el_primer_fallo(self):
+        orden = []
+        pasos = [
+            paso("a", lambda: orden.append("a") or True),
+            paso("b", lambda: orden.append("b") and False),
+            paso("c", lambda: orden.append("c") or True),
+        ]
+        ejecutor = EjecutorPasos(pasos)
+
+        fallido = ejecutor.ejecutar()
+        self.assertEqual(fallido.nombre, "b")
+        self.assertEqual(orden, ["a", "b"])
+        self.assertTrue(ejecutor.cancel_event.is_set())
+
+    def test_una_excepcion_cuenta_como_fallo(self):
+        def explota():
+            raise RuntimeError("sin conexión")
+
+        with self.assertLogs("etl.pipeline", level="ERROR"):
+            fallido = EjecutorPasos([paso("a", explota)]).ejecutar()
+        self.assertEqual(fallido.nombre, "a")
+
+
+class EjecutorPasosParaleloTest(unittest.TestCase):
+    def test_respeta_las_dependencias(self):
+        terminados = []
+        lock = threading.Lock()
+
+        def registrar(nombre, espera=0.0):
+            def funcion():
+                time.sleep(espera)
+                with lock:
+                    terminados.append(nombre)
+                return True
+
+            return funcion
+
+        pasos = [
+            paso("extraccion", registrar("extraccion", 0.05)),
+            paso("tabla_tmp", registrar("tabla_tmp")),
+            paso("conversion", registrar("conversion"), ("extraccion",)),
+            paso("carga", registrar("carga"), ("conversion", "tabla_tmp")),
+        ]
+
+        self.assertIsNone(EjecutorPasos(pasos, paralelo=True).ejecutar())
+        self.assertEqual(len(terminados), 4)
+        for anterior, posterior in (
+            ("extraccion", "conversion"),
+            ("conversion", "carga"),
+            ("tabla_tmp", "carga"),
+        ):
+            self.assertLess(terminados.index(anterior), terminados.index(posterior))
+
+    def test_los_pasos_independientes_corren_a_la_vez(self):
+        barrera = threading.Barrier(2, timeout=5)
+
+        def esperar_al_otro():
+            barrera.wait()
+            return True
+
+        pasos = [paso("a", esperar_al_otro), paso("b", esperar_al_otro)]
+
+        self.assertIsNone(EjecutorPasos(pasos, paralelo=True, max_workers=2).ejecutar())
+
+    def test_un_fallo_cancela_y_espera_a_los_pasos_en_curso(self):
+        cancel_event = threading.Event()
+        lanzados = []
+        terminado_b = threading.Event()
+
+        def falla():
+            time.sleep(0.05)
+            return False
+
+        def lento():
+            # Como la extracción: termina en cuanto ve la cancelación
+            cancel_event.wait(5)
+            terminado_b.set()
+            return False
+
+        pasos = [
+            paso("a", falla),
+            paso("b", lento),
+            paso("c", lambda: True, ("a",)),
+        ]
+        ejecutor = EjecutorPasos(
+            pasos,
+            paralelo=True,
+            al_iniciar=lambda p: lanzados.append(p.nombre),
+            cancel_event=cancel_event,
+        )
+
+        with self.assertLogs("etl.pipeline", level="ERROR"):
+            fallido = ejecutor.ejecutar()
+        self.assertEqual(fallido.nombre, "a")
+        self.assertTrue(cancel_event.is_set())
+        self.assertTrue(terminado_b.is_set())
+        self.assertNotIn("c", lanzados)
+
+    def test_dependencia_inexistente_es_un_fallo(self):
+        pasos = [paso("a", lambda: True), paso("b", lambda: True, ("no_existe",))]
+
+        with self.assertLogs("etl.pipeline", level="ERROR"):
+            fallido = EjecutorPasos(pasos, paralelo=True).ejecutar()
+        self.assertEqual(fallido.nombre, "b")
+
+
+if __name__ == "__main__":
+    unittest.main()
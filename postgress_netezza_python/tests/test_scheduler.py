@@ -0,0 +1,116 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from etl.scheduler import ETLScheduler, TablaProgramada
+
+
+class LoaderFalso:
+    def __init__(self, nombre, resultados, orden, lock):
+        self.nombre = nombre
+        self.resultados = resultados
+        self.orden = orden
+        self.lock = lock
+
+    def run(self):
+        with self.lock:
+            self.orden.append(self.nombre)
+        return self.resultados.get(self.nombre, True)
+
+
+class ETLSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+        self.config_file = Path(self.directorio.name) / "config.ini"
+        self.config_file.write_text(
+            "[netezza]\ndatabase = DW\n[scheduler]\nmax_workers = 1\n",
+            encoding="utf-8",
+        )
+        self.orden = []
+        self.resultados_loader = {}
+        lock = threading.Lock()
+        self.scheduler = ETLScheduler(
+            excel_config_path="config.xlsx",
+            config_file=str(self.config_file),
+            loader_factory=lambda nombre: LoaderFalso(
+                nombre, self.resultados_loader, self.orden, lock
+            ),
+        )
+
+    def programar(self, nombre, duracion, dependencias=(), prioridad=0):
+        self.scheduler.tablas[nombre] = TablaProgramada(
+            nombre=nombre,
+            esquema_postgres="public",
+            dependencias=set(dependencias),
+            prioridad=prioridad,
+            duracion_estimada=duracion,
+        )
+
+    def test_ruta_critica_suma_la_rama_dependiente_mas_larga(self):
+        # a -> b -> d y a -> c: la ruta de a sigue la rama más larga (b, d)
+        self.programar("a", 10)
+        self.programar("b", 20, ["a"])
+        self.programar("c", 5, ["a"])
+        self.programar("d", 30, ["b"])
+
+        self.assertTrue(self.scheduler.calcular_rutas_criticas())
+        rutas = {n: t.ruta_critica for n, t in self.scheduler.tablas.items()}
+        self.assertEqual(rutas, {"a": 60, "b": 50, "c": 5, "d": 30})
+
+    def test_dependencia_circular_impide_planificar(self):
+        self.programar("a", 10, ["c"])
+        self.programar("b", 10, ["a"])
+        self.programar("c", 10, ["b"])
+
+        with self.assertLogs("etl.scheduler", level="ERROR") as logs:
+            self.assertFalse(self.scheduler.calcular_rutas_criticas())
+        self.assertIn("Dependencia circular", logs.output[0])
+
+    def test_plan_prioriza_prioridad_y_luego_ruta_critica(self):
+        self.programar("corta", 10)
+        self.programar("larga", 100)
+        self.programar("urgente", 1, prioridad=5)
+        self.scheduler.calcular_rutas_criticas()
+
+        plan = [t.nombre for t in self.scheduler.plan()]
+        self.assertEqual(plan, ["urgente", "larga", "corta"])
+
+    def _ejecutar_lote(self):
+        self.scheduler.cargar_tablas = lambda: True
+        self.scheduler.cargar_duraciones = lambda: None
+        return self.scheduler.ejecutar()
+
+    def test_ejecutar_respeta_dependencias_y_ruta_critica(self):
+        self.programar("dimension", 10)
+        self.programar("hechos", 50, ["dimension"])
+        self.programar("aislada", 30)
+
+        self.assertTrue(self._ejecutar_lote())
+        # dimension (ruta 60) antes que aislada (30); al terminar, hechos (50) pasa adelante
+        self.assertEqual(self.orden, ["dimension", "hechos", "aislada"])
+
+    def test_ejecutar_omite_las_dependientes_de_una_carga_fallida(self):
+        self.programar("dimension", 10)
+        self.programar("hechos", 50, ["dimension"])
+        self.programar("resumen", 5, ["hechos"])
+        self.programar("aislada", 30)
+        self.resultados_loader["dimension"] = False
+
+        with self.assertLogs("etl.scheduler", level="ERROR"):
+            self.assertFalse(self._ejecutar_lote())
+        self.assertEqual(
+            self.scheduler.resultados,
+            {
+                "dimension": "ERROR",
+                "hechos": "OMITIDA",
+                "resumen": "OMITIDA",
+                "aislada": "OK",
+            },
+        )
+        self.assertNotIn("hechos", self.orden)
+
+
+if __name__ == "__main__":
+    unittest.main()